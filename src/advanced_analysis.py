@@ -11,6 +11,154 @@ from config import OUTPUT_DIR
 
 warnings.filterwarnings('ignore')
 
+ROLLING_STATISTICS = ('basis_mean', 'basis_std', 'basis_zscore', 'basis_momentum', 'spot_volatility')
+
+def _prefix_sums(values, squares=True):
+    """
+    窓和を差分で得るための累積和 (先頭に0を付けた長さn+1)
+
+    行は (和, 二乗和, 前の値からの変化回数)。二乗和の桁落ちを避けるため有効値の平均を引いてから累積する。
+    非有限値は欠損として扱い、先頭に連続する欠損 (リターンの1本目など) は本数だけを記録し、
+    途中にも欠損がある場合に限り欠損数の累積和を最終行に加える。
+    戻り値は (累積和, 先頭欠損数, 引いた平均, 平均を引いた系列)。
+    """
+    missing = ~np.isfinite(values)
+    centered = np.where(missing, 0.0, values)
+    count = len(values) - missing.sum()
+    center = centered.sum() / count if count else 0.0
+    centered -= center
+    centered[missing] = 0.0
+    lead = int(np.argmin(missing)) if count else len(values)
+    scattered = count and missing[lead:].any()
+    prefixes = np.zeros((1 + 2 * squares + bool(scattered), len(values) + 1))
+    np.cumsum(centered, out=prefixes[0, 1:])
+    if squares:
+        np.cumsum(np.square(centered), out=prefixes[1, 1:])
+        np.cumsum(values[1:] != values[:-1], out=prefixes[2, 2:])
+    if scattered:
+        np.cumsum(missing, out=prefixes[-1, 1:])
+    return prefixes, lead, center, centered
+
+def _window_sums(prefix, window, squares=True):
+    """窓毎の累積和の差分と、途中の欠損を含む窓のmask (欠損が先頭だけならNone)"""
+    sums = prefix[:, window:] - prefix[:, :-window]
+    incomplete = sums[-1] > 0 if len(sums) > 1 + 2 * squares else None
+    return sums, incomplete
+
+def _window_std(prefix, lead, window, out):
+    """窓毎の標準偏差をoutへ書き、窓平均 (中心化済み) を返す。欠損を含む窓はNaN"""
+    (total, total_sq, *_), incomplete = _window_sums(prefix, window)
+    mean = np.divide(total, window)
+    np.multiply(total, mean, out=total)
+    np.subtract(total_sq, total, out=out)
+    out /= window - 1
+    np.maximum(out, 0.0, out=out)
+    np.sqrt(out, out=out)
+    # 値が変化しない窓は累積和の丸め誤差を残さずpandasと同じく0にする
+    out[prefix[2, window:] == prefix[2, 1:len(out) + 1]] = 0.0
+    if incomplete is not None:
+        out[incomplete] = np.nan
+        mean[incomplete] = np.nan
+    out[:lead] = np.nan
+    mean[:lead] = np.nan
+    return mean
+
+def rolling_statistics(basis_percent, spot_price, windows, periods_per_year=252, columns=None):
+    """
+    複数の窓長のローリング統計量を累積和から一括計算
+
+    ベーシス・ベーシス変化率・現物リターンの累積和を1回だけ作り、窓長毎にはその差分だけで
+    平均・標準偏差・和を求める。pandasの ``rolling(window)`` と同じく、窓内に欠損値がある位置は
+    NaN (非有限値も欠損として扱う)。
+
+    Parameters:
+    -----------
+    basis_percent : array-like
+        ベーシス (%)
+    spot_price : array-like
+        現物価格
+    windows : iterable of int
+        窓長
+    periods_per_year : float
+        実現ボラティリティの年率換算に使う年間観測数
+    columns : iterable of str, optional
+        計算する列名 (例: 'basis_zscore_30')。既定は全窓長の全統計量
+
+    Returns:
+    --------
+    DataFrame
+        窓長w毎の basis_mean_w, basis_std_w, basis_zscore_w, basis_momentum_w, spot_volatility_w
+    """
+    basis = np.asarray(basis_percent, dtype=np.float64)
+    spot = np.asarray(spot_price, dtype=np.float64)
+    windows = sorted(set(int(window) for window in windows))
+    if windows and windows[0] < 2:
+        raise ValueError(f"Rolling window must be at least 2: {windows[0]}")
+    names = [f'{name}_{window}' for window in windows for name in ROLLING_STATISTICS]
+    if columns is not None:
+        unknown = set(columns) - set(names)
+        if unknown:
+            raise ValueError(f"Unknown rolling statistics: {sorted(unknown)}")
+        names = [name for name in names if name in set(columns)]
+    length = len(basis)
+    block = np.empty((len(names), length))
+    rows = {name: block[n] for n, name in enumerate(names)}
+
+    def wanted(window, *stats):
+        return any(f'{stat}_{window}' in rows for stat in stats)
+
+    def row(stat, window, start):
+        """出力行 (無ければ一時領域) の窓が揃う部分。先頭はNaN"""
+        out = rows.get(f'{stat}_{window}')
+        if out is None:
+            return np.empty(length - start)
+        out[:start] = np.nan
+        return out[start:]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if any(wanted(window, 'basis_mean', 'basis_std', 'basis_zscore') for window in windows):
+            basis_prefix, basis_lead, basis_center, basis_centered = _prefix_sums(basis)
+        if any(wanted(window, 'basis_momentum') for window in windows):
+            momentum_input = np.empty(length)
+            momentum_input[:1] = np.nan
+            np.divide(basis[1:], basis[:-1], out=momentum_input[1:])
+            momentum_input -= 1
+            momentum_prefix, momentum_lead, momentum_center, _ = _prefix_sums(momentum_input, squares=False)
+        if any(wanted(window, 'spot_volatility') for window in windows):
+            returns = np.empty(length)
+            returns[:1] = np.nan
+            np.divide(spot[1:], spot[:-1], out=returns[1:])
+            returns -= 1
+            returns_prefix, returns_lead, _, _ = _prefix_sums(returns)
+
+        for window in windows:
+            start = min(window - 1, length)
+            if window > length:
+                for stat in ROLLING_STATISTICS:
+                    row(stat, window, start)
+                continue
+            if wanted(window, 'basis_mean', 'basis_std', 'basis_zscore'):
+                std = row('basis_std', window, start)
+                mean = _window_std(basis_prefix, basis_lead, window, std)
+                if wanted(window, 'basis_zscore'):
+                    zscore = row('basis_zscore', window, start)
+                    np.subtract(basis_centered[window - 1:], mean, out=zscore)
+                    zscore /= std
+                if wanted(window, 'basis_mean'):
+                    np.add(mean, basis_center, out=row('basis_mean', window, start))
+            if wanted(window, 'basis_momentum'):
+                momentum = row('basis_momentum', window, start)
+                (total, *_), incomplete = _window_sums(momentum_prefix, window, squares=False)
+                np.add(total, momentum_center * window, out=momentum)
+                if incomplete is not None:
+                    momentum[incomplete] = np.nan
+                momentum[:momentum_lead] = np.nan
+            if wanted(window, 'spot_volatility'):
+                volatility = row('spot_volatility', window, start)
+                _window_std(returns_prefix, returns_lead, window, volatility)
+                volatility *= np.sqrt(periods_per_year)
+    return pd.DataFrame(block.T, index=getattr(basis_percent, 'index', None), columns=names)
+
 # ベーシス分析のための基本クラス
 class BitcoinBasisAnalyzer:
     def __init__(self, spot_df, futures_df):
@@ -121,6 +269,55 @@ class BitcoinBasisAnalyzer:
         self.basis_df['vol_adjusted_basis'] = self.basis_df['basis_percent'] / self.basis_df['spot_volatility']
         return self.basis_df['vol_adjusted_basis']
 
+    def calculate_rolling_features(self, zscore_window=30, momentum_window=14, vol_window=30, windows=(),
+                                   periods_per_year=252):
+        """
+        Zスコア・モメンタム・ボラティリティ調整済みベーシスをまとめて算出
+
+        calculate_basis_zscore / calculate_basis_momentum / calculate_volatility_adjusted_basis
+        と同じ列を書き込む。windowsを渡すと、その窓長毎の統計量ブロックも basis_df に追加し、
+        全窓長を rolling_statistics の1回の計算で求める。windowsが無い既定の3指標だけなら
+        累積和による一括計算はpandasの rolling と速度が変わらないため、pandasで計算する。
+
+        Parameters:
+        -----------
+        zscore_window, momentum_window, vol_window : int
+            各指標の計算ウィンドウ
+        windows : iterable of int
+            追加で統計量ブロックを出力する窓長
+        periods_per_year : float
+            ボラティリティの年率換算に使う年間観測数
+
+        Returns:
+        --------
+        DataFrame
+            計算した統計量ブロック
+        """
+        windows = list(windows)
+        features = {
+            'basis_zscore': f'basis_zscore_{zscore_window}',
+            'basis_momentum': f'basis_momentum_{momentum_window}',
+            'spot_volatility': f'spot_volatility_{vol_window}',
+        }
+        if windows:
+            extra = [f'{name}_{window}' for window in windows for name in ROLLING_STATISTICS]
+            block = rolling_statistics(
+                self.basis_df['basis_percent'], self.basis_df['spot_price'],
+                [zscore_window, momentum_window, vol_window, *windows], periods_per_year,
+                columns=[*features.values(), *extra],
+            )
+            for column, source in features.items():
+                self.basis_df[column] = block[source]
+            self.basis_df[extra] = block[extra]
+        else:
+            self.calculate_basis_zscore(zscore_window)
+            self.calculate_basis_momentum(momentum_window)
+            spot_returns = self.basis_df['spot_price'].pct_change()
+            self.basis_df['spot_volatility'] = spot_returns.rolling(window=vol_window).std() * np.sqrt(periods_per_year)
+            block = self.basis_df[list(features)].set_axis(list(features.values()), axis=1)
+        self.basis_df['vol_adjusted_basis'] = self.basis_df['basis_percent'] / self.basis_df['spot_volatility']
+        return block
+
     def detect_market_regime(self, n_states=3):
         """
         簡易的な市場レジーム検出（HMMの代わりに閾値ベース）
@@ -260,12 +457,42 @@ class BitcoinBasisAnalyzer:
 
         return self.basis_df[['signal', 'strategy_return', 'net_return', 'cumulative_return', 'equity']]
 
-    def plot_basis_analysis(self, interval, figsize=(15, 12)):
-        """ベーシス分析の結果をプロットし、ファイルに保存"""
+    def sweep_basis_strategy(self, zscore_thresholds, zscore_windows=(30,), transaction_costs=(0.001,),
+                             periods_per_year=252, max_workers=None):
+        """
+        backtest_basis_strategyと同じ規則で、パラメータの全組み合わせを一括バックテスト
+
+        basis_dfは変更しない。計算はbacktest_engine.sweepを参照。
+
+        Parameters:
+        -----------
+        zscore_thresholds : iterable of float
+            Zスコア閾値
+        zscore_windows : iterable of int
+            Zスコアの計算ウィンドウ
+        transaction_costs : iterable of float
+            取引コスト（割合）
+        periods_per_year : float
+            シャープレシオの年率換算に使う年間観測数
+        max_workers : int, optional
+            大きなグリッドを分割するプロセス数 (1で単一プロセス)
+
+        Returns:
+        --------
+        DataFrame
+            組み合わせ毎のトータルリターン、トレード回数、勝率、シャープレシオ、最大ドローダウン
+        """
+        from backtest_engine import sweep
+
+        return sweep(self.basis_df, zscore_thresholds, zscore_windows, transaction_costs,
+                     periods_per_year=periods_per_year, max_workers=max_workers)
+
+    def plot_basis_analysis(self, interval, figsize=(15, 12), label=None):
+        """ベーシス分析の結果をプロットし、ファイルに保存 (labelはファイル名・タイトルの識別子、既定はinterval)"""
         if self.basis_df is None:
             raise ValueError("先にベーシス計算を実行してください")
 
-        interval_str = interval.replace('m', 'min').replace('h', 'hour').replace('d', 'day').replace('w', 'week')
+        interval_str = label or interval.replace('m', 'min').replace('h', 'hour').replace('d', 'day').replace('w', 'week')
         plot_dir = os.path.join(OUTPUT_DIR, "plots")
         os.makedirs(plot_dir, exist_ok=True)
 
@@ -1,17 +1,32 @@
+import time
+
 import pandas as pd
 
 from contract_analysis import ContractAwareBitcoinBasisAnalyzer
 from utils import save_data
 
 
-def run_advanced_analysis(spot_df, futures_df, interval):
-    """Run contract-aware basis analysis for one kline interval."""
+def output_stem(symbol, interval):
+    """File-name suffix of one (symbol, interval) task; BTCUSDT keeps the historical unprefixed names."""
     interval_str = (
         interval.replace("m", "min")
         .replace("h", "hour")
         .replace("d", "day")
         .replace("w", "week")
     )
+    return interval_str if symbol.upper() == "BTCUSDT" else f"{symbol.lower()}_{interval_str}"
+
+
+def run_advanced_analysis(spot_df, futures_df, interval, metadata_history=None, symbol="BTCUSDT", timings=None):
+    """Run contract-aware basis analysis for one kline interval.
+
+    ``metadata_history`` (a ``MetadataHistory``) labels each bar with the contract
+    type that was active at that time instead of the current exchangeInfo type.
+    Seconds spent in the analyze, save and plot stages are recorded into ``timings``.
+    """
+    interval_str = output_stem(symbol, interval)
+    timings = {} if timings is None else timings
+    clock = time.perf_counter()
 
     if spot_df is None or spot_df.empty or futures_df is None or futures_df.empty:
         print("Error: Input DataFrames for analysis are invalid.")
@@ -23,19 +38,19 @@ def run_advanced_analysis(spot_df, futures_df, interval):
             spot_df,
             futures_df,
             interval=interval,
+            metadata_history=metadata_history,
         )
 
         print("Calculating contract-aware metrics...")
         analyzer.calculate_annualized_basis()
-        analyzer.calculate_basis_zscore()
-        analyzer.calculate_basis_momentum()
-        analyzer.calculate_volatility_adjusted_basis()
+        analyzer.calculate_rolling_features()
         analyzer.detect_market_regime()
 
         analysis_df = analyzer.basis_df
         if analysis_df is None or analysis_df.empty:
             print("Advanced analysis resulted in an empty DataFrame.")
             return None, None
+        timings["analyze"], clock = time.perf_counter() - clock, time.perf_counter()
 
         numeric_cols = analysis_df.select_dtypes(include="number").columns.tolist()
         if not numeric_cols:
@@ -48,15 +63,17 @@ def run_advanced_analysis(spot_df, futures_df, interval):
         stats_filename = f"advanced_basis_stats_{interval_str}"
         save_data(analysis_df, "analysis", analysis_filename)
         save_data(stats_df, "analysis", stats_filename)
+        timings["save"], clock = time.perf_counter() - clock, time.perf_counter()
 
         print(f"Advanced analysis complete. Data saved for {interval_str}.")
         print(f"Contract type: {analyzer.contract_metadata.contract_type}")
         print(f"Annualization method: {analysis_df['annualization_method'].iloc[-1]}")
 
         try:
-            analyzer.plot_basis_analysis(interval=interval)
+            analyzer.plot_basis_analysis(interval=interval, label=interval_str)
         except Exception as plot_error:
             print(f"Error generating plots for {interval_str}: {plot_error}")
+        timings["plot"] = time.perf_counter() - clock
 
         return stats_df, analysis_df
     except Exception as exc:
@@ -65,3 +82,25 @@ def run_advanced_analysis(spot_df, futures_df, interval):
 
         traceback.print_exc()
         return None, None
+
+
+def init_worker():
+    """Process-pool initializer: workers only write figures to files."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def analysis_task(symbol, interval, spot_df, futures_df, metadata_history=None):
+    """Process-pool entry point: analyze, save and plot one (symbol, interval) task."""
+    timings = {}
+    stats_df, analysis_df = run_advanced_analysis(
+        spot_df, futures_df, interval, metadata_history, symbol=symbol, timings=timings
+    )
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "ok": analysis_df is not None,
+        "rows": 0 if analysis_df is None else len(analysis_df),
+        "timings": timings,
+    }
@@ -0,0 +1,120 @@
+"""Vectorized parameter sweeps of the basis z-score strategy in ``BitcoinBasisAnalyzer.backtest_basis_strategy``."""
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from advanced_analysis import rolling_statistics
+
+RESULT_COLUMNS = [
+    "zscore_window", "zscore_threshold", "transaction_cost",
+    "total_return", "trade_count", "win_rate", "sharpe", "max_drawdown",
+]
+# Upper bound on (thresholds x costs x bars) cells evaluated per chunk, so a grid over minute bars stays in memory.
+CHUNK_CELLS = 1 << 22
+# Below this many cells the pool's pickling overhead outweighs the parallel speedup.
+POOL_MIN_CELLS = 1 << 25
+
+
+def evaluate(
+    zscore: np.ndarray, basis_returns: np.ndarray, thresholds: np.ndarray, costs: np.ndarray, periods_per_year: float
+) -> dict[str, np.ndarray]:
+    """Metrics for every (threshold, cost) pair on one z-score series, as (thresholds, costs) arrays.
+
+    Same rules as backtest_basis_strategy: short the basis above +threshold, long below -threshold,
+    hold the previous bar's signal over the next basis return, and pay `cost` on every signal change.
+    """
+    z = zscore[None, :]
+    signal = np.where(z > thresholds[:, None], -1, np.where(z < -thresholds[:, None], 1, 0)).astype(np.int8)
+    held = np.zeros_like(signal)
+    held[:, 1:] = signal[:, :-1]
+    trades = np.zeros(signal.shape, dtype=bool)
+    trades[:, 1:] = signal[:, 1:] != signal[:, :-1]
+    with np.errstate(invalid="ignore", over="ignore"):
+        strategy = held * basis_returns[None, :]
+        strategy[np.isnan(strategy)] = 0.0
+        net = strategy[:, None, :] - trades[:, None, :] * costs[None, :, None]
+        mean = net.mean(axis=-1)
+        std = net.std(axis=-1, ddof=1) if net.shape[-1] > 1 else np.full(net.shape[:-1], np.nan)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan)
+        wins = ((net > 0) & trades[:, None, :]).sum(axis=-1)
+        equity = np.add(net, 1, out=net)
+        np.cumprod(equity, axis=-1, out=equity)
+        total_return = equity[..., -1] - 1 if equity.shape[-1] else np.zeros(equity.shape[:-1])
+        peak = np.maximum.accumulate(equity, axis=-1)
+        np.divide(equity, peak, out=peak)
+        drawdown = 1 - peak.min(axis=-1) if equity.shape[-1] else np.zeros(equity.shape[:-1])
+    trade_count = np.broadcast_to(trades.sum(axis=-1)[:, None], wins.shape)
+    return {
+        "total_return": total_return,
+        "trade_count": trade_count,
+        "win_rate": np.divide(wins, trade_count, out=np.zeros(wins.shape), where=trade_count > 0),
+        "sharpe": sharpe,
+        "max_drawdown": drawdown,
+    }
+
+
+def _chunk(task: tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray, float]) -> list[dict[str, Any]]:
+    window, zscore, basis_returns, thresholds, costs, periods_per_year = task
+    metrics = evaluate(zscore, basis_returns, thresholds, costs, periods_per_year)
+    return [
+        {"zscore_window": window, "zscore_threshold": float(threshold), "transaction_cost": float(cost),
+         **{name: values[i, j].item() for name, values in metrics.items()}}
+        for (i, threshold), (j, cost) in product(enumerate(thresholds), enumerate(costs))
+    ]
+
+
+def sweep(
+    basis_df: pd.DataFrame,
+    zscore_thresholds: Iterable[float],
+    zscore_windows: Iterable[int] = (30,),
+    transaction_costs: Iterable[float] = (0.001,),
+    *,
+    periods_per_year: float = 252,
+    max_workers: int | None = None,
+) -> pd.DataFrame:
+    """Backtest every (window, threshold, cost) combination on `basis_df` (basis_percent, spot_price columns).
+
+    Z-scores for several windows come from one rolling_statistics pass (a single window uses pandas rolling,
+    which is as fast and matches backtest_basis_strategy bit for bit); each window's thresholds x costs grid is
+    evaluated with broadcast arrays in chunks of at most CHUNK_CELLS cells. Large grids are spread over a
+    process pool (max_workers=1 forces a single process). `periods_per_year` annualizes the Sharpe ratio.
+    Returns one row per combination with RESULT_COLUMNS; basis_df is not modified.
+    """
+    windows = sorted({int(window) for window in zscore_windows})
+    thresholds = np.asarray(sorted({float(value) for value in zscore_thresholds}), dtype=np.float64)
+    costs = np.asarray(sorted({float(value) for value in transaction_costs}), dtype=np.float64)
+    if not windows or not len(thresholds) or not len(costs):
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    basis = basis_df["basis_percent"].to_numpy(dtype=np.float64)
+    if len(windows) == 1:
+        rolling = basis_df["basis_percent"].rolling(windows[0])
+        zscores = ((basis_df["basis_percent"] - rolling.mean()) / rolling.std()).to_numpy(dtype=np.float64)[:, None]
+    else:
+        zscores = rolling_statistics(
+            basis, basis_df["spot_price"].to_numpy(dtype=np.float64), windows,
+            columns=[f"basis_zscore_{window}" for window in windows],
+        ).to_numpy()
+    basis_returns = np.full(len(basis), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(basis[1:], basis[:-1], out=basis_returns[1:])
+    basis_returns[1:] -= 1
+
+    step = max(1, CHUNK_CELLS // max(1, len(costs) * len(basis)))
+    tasks = [
+        (window, zscores[:, n], basis_returns, thresholds[start:start + step], costs, periods_per_year)
+        for n, window in enumerate(windows) for start in range(0, len(thresholds), step)
+    ]
+    cells = len(windows) * len(thresholds) * len(costs) * len(basis)
+    workers = max_workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1 and (max_workers is not None or cells >= POOL_MIN_CELLS):
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            chunks = list(pool.map(_chunk, tasks))
+    else:
+        chunks = [_chunk(task) for task in tasks]
+    return pd.DataFrame([row for chunk in chunks for row in chunk], columns=RESULT_COLUMNS)
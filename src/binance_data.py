@@ -2,7 +2,8 @@ import os
 import pandas as pd
 from datetime import datetime, timedelta
 from binance.client import Client
-from config import BASE_DIR
+from config import BASE_DIR, KLINE_CACHE_DIR
+from kline_cache import INTERVAL_MS, KlineCache
 from utils import save_data
 
 def get_binance_client():
@@ -27,17 +28,20 @@ def get_historical_data(months=3, interval=Client.KLINE_INTERVAL_1HOUR):
     start_date = end_date - timedelta(hours=30*24*months)  # 時間ベースで正確に計算
 
     # 現物と先物で同一パラメータを適用
-    params = {
-        'symbol': "BTCUSDT",
-        'interval': interval,
-        'start_str': start_date.strftime("%Y-%m-%d %H:%M:%S"),
-        'end_str': end_date.strftime("%Y-%m-%d %H:%M:%S"),
-        'limit': 1000  # 最大取得数を明示的に指定
-    }
+    # 確定済みbarはローカルキャッシュから読み、未取得の範囲と未確定の最新barだけAPIから取得
+    # (開始・終了はBinanceと同じくUTCとして解釈)
+    start_ms = int(pd.Timestamp(start_date, tz="UTC").timestamp() * 1000)
+    end_ms = int(pd.Timestamp(end_date, tz="UTC").timestamp() * 1000)
+    cache = KlineCache(KLINE_CACHE_DIR)
+
+    def reader(fetch):
+        return lambda lo, hi: fetch(symbol="BTCUSDT", interval=interval, start_str=lo, end_str=hi, limit=1000)
 
     try:
-        spot_klines = client.get_historical_klines(**params)
-        futures_klines = client.futures_historical_klines(**params)
+        spot_klines = cache.get("spot", "BTCUSDT", interval, start_ms, end_ms, INTERVAL_MS[interval],
+                                reader(client.get_historical_klines))
+        futures_klines = cache.get("futures", "BTCUSDT", interval, start_ms, end_ms, INTERVAL_MS[interval],
+                                   reader(client.futures_historical_klines))
     except Exception as e:
         print(f"Binance APIからのデータ取得中にエラーが発生しました: {e}")
         return None, None
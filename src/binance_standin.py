@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Local Binance stand-in that replays recorded raw objects for offline, deterministic collector runs."""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit
+
+from collect_market_structure import DAY_MS, DEPTH_ENCODING, ObjectStore, merge_segments, unpack_depth
+
+SERIES_PATHS = {
+    "/api/v3/klines": "klines", "/fapi/v1/klines": "klines", "/fapi/v1/markPriceKlines": "klines",
+    "/fapi/v1/indexPriceKlines": "klines", "/fapi/v1/fundingRate": "funding",
+}
+WINDOW_PARAMS = {"startTime", "endTime", "limit"}
+
+
+def query_key(path: str, params: dict[str, str], drop: set[str] = frozenset()) -> tuple[str, tuple[tuple[str, str], ...]]:
+    return path, tuple(sorted((key, value) for key, value in params.items() if key not in drop))
+
+
+def row_time(kind: str, row: Any) -> int:
+    return int(row[0]) if kind == "klines" else int(row["fundingTime"])
+
+
+def depth_json(raw: bytes) -> bytes:
+    """A packed depth object as the JSON body Binance would have returned."""
+    book = unpack_depth(raw)
+    sides = {side: [[str(price), str(qty)] for price, qty in book[side].tolist()] for side in ("bids", "asks")}
+    return json.dumps({"lastUpdateId": book["lastUpdateId"], "E": book["E"], "T": book["T"], **sides}).encode()
+
+
+def scale_series(kind: str, rows: list[Any], years: float) -> list[Any]:
+    """Prepend shifted copies of the recorded rows until the series covers `years` of history."""
+    if years <= 0 or len(rows) < 2:
+        return rows
+    first, last = row_time(kind, rows[0]), row_time(kind, rows[-1])
+    span = last - first + (row_time(kind, rows[1]) - first)
+    floor = first - int(years * 365 * DAY_MS)
+    out: list[Any] = []
+    shift = span
+    while first - shift + span > floor:
+        for row in rows:
+            if row_time(kind, row) - shift < floor:
+                continue
+            if kind == "klines":
+                out.append([int(row[0]) - shift, *row[1:6], int(row[6]) - shift, *row[7:]])
+            else:
+                out.append({**row, "fundingTime": int(row["fundingTime"]) - shift})
+        shift += span
+    return merge_segments(kind, [out, rows])
+
+
+class Recording:
+    """Recorded responses indexed by endpoint and query, plus merged series for windowed replays."""
+
+    def __init__(self, root: Path, scale_years: float = 0.0) -> None:
+        objects = ObjectStore(root)
+        manifests = [json.loads(objects.get(sha, "manifests")) for sha in objects.shas("manifests")]
+        latest = root / "raw" / "latest-manifest.json"
+        if latest.exists():
+            manifests.append(json.loads(latest.read_text()))
+        manifests.sort(key=lambda manifest: manifest.get("retrieved_at", ""))
+        self.exact: dict[Any, bytes] = {}
+        self.latest: dict[Any, bytes] = {}
+        parts: dict[Any, list[list[Any]]] = {}
+        for manifest in manifests:
+            items = list(manifest["evidence"].values())
+            items += [item for chain in manifest.get("segments", {}).values() for item in chain]
+            for item in items:
+                url = urlsplit(item["source_url"])
+                params = dict(parse_qsl(url.query))
+                raw = objects.get(item["sha256"], Path(item["path"]).parent.name)
+                if item.get("encoding") == DEPTH_ENCODING:
+                    raw = depth_json(raw)
+                self.exact[query_key(url.path, params)] = raw
+                self.latest[query_key(url.path, params, WINDOW_PARAMS)] = raw
+                if url.path in SERIES_PATHS:
+                    parts.setdefault(query_key(url.path, params, WINDOW_PARAMS), []).append(json.loads(raw))
+        self.series = {key: scale_series(SERIES_PATHS[key[0]], merge_segments(SERIES_PATHS[key[0]], chunks), scale_years)
+                       for key, chunks in parts.items()}
+
+    def respond(self, path: str, params: dict[str, str]) -> bytes | None:
+        identity = query_key(path, params, WINDOW_PARAMS)
+        if identity in self.series:
+            kind, rows = SERIES_PATHS[path], self.series[identity]
+            start, end = int(params.get("startTime", 0)), int(params.get("endTime", 2**63 - 1))
+            limit = int(params.get("limit", 500))
+            window = [row for row in rows if start <= row_time(kind, row) <= end]
+            return json.dumps(window[:limit] if "startTime" in params else window[-limit:]).encode()
+        return self.exact.get(query_key(path, params)) or self.latest.get(identity)
+
+
+def make_server(recording: Recording, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                rate_limit_every: int = 0, retry_after_s: int = 0) -> ThreadingHTTPServer:
+    """Serve `recording`; every `rate_limit_every`-th request answers 429 with Retry-After."""
+    state = {"count": 0, "minute": 0, "weight": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            with lock:
+                state["count"] += 1
+                minute = int(time.time() // 60)
+                state["weight"] = state["weight"] + 1 if state["minute"] == minute else 1
+                state["minute"], count, weight = minute, state["count"], state["weight"]
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            if rate_limit_every and count % rate_limit_every == 0:
+                self._send(429, b'{"code":-1003,"msg":"Too many requests."}', {"Retry-After": str(retry_after_s)}, weight)
+                return
+            body = recording.respond(url.path, dict(parse_qsl(url.query)))
+            if body is None:
+                self._send(404, b'{"code":-1,"msg":"no recorded response."}', {}, weight)
+                return
+            self._send(200, body, {}, weight)
+
+        def _send(self, status: int, body: bytes, headers: dict[str, str], weight: int) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-MBX-USED-WEIGHT-1M", str(weight))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-root", type=Path, default=Path("data/derivatives"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=int, default=0)
+    parser.add_argument("--scale-years", type=float, default=0.0)
+    args = parser.parse_args()
+    server = make_server(Recording(args.data_root, args.scale_years), args.host, args.port,
+                         args.latency_ms, args.rate_limit_every, args.retry_after)
+    host, port = server.server_address[:2]
+    print(json.dumps({"spot_base": f"http://{host}:{port}", "futures_base": f"http://{host}:{port}"}, sort_keys=True), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
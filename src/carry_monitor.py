@@ -271,7 +271,7 @@ def dataframe_latest_rows(frame: pd.DataFrame) -> list[dict[str, Any]]:
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Generate a fail-closed carry monitor from analyzed parquet data")
-    parser.add_argument("--analysis-parquet", required=True)
+    parser.add_argument("--analysis-parquet", required=True, help="analysis parquet file or partitioned store directory")
     parser.add_argument("--watchlist", required=True)
     parser.add_argument("--output-json", required=True)
     parser.add_argument("--output-html", required=True)
@@ -283,7 +283,9 @@ def main() -> None:
 
     watchlist = json.loads(Path(args.watchlist).read_text(encoding="utf-8"))
     previous = json.loads(Path(args.previous).read_text(encoding="utf-8")) if args.previous else None
-    frame = pd.read_parquet(args.analysis_parquet)
+    from utils import read_latest
+
+    frame = read_latest(args.analysis_parquet)
     monitor = build_monitor(
         dataframe_latest_rows(frame),
         watchlist,
@@ -3,130 +3,754 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import hashlib
 import json
+import os
+import random
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import UTC, datetime, timedelta
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
 from pathlib import Path
-from typing import Any
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+from typing import Any, Iterator, Mapping
+from urllib.parse import urlencode, urlsplit
 
-SPOT_BASE = "https://data-api.binance.vision"
-FUTURES_BASE = "https://www.binance.com"
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SPOT_BASE = os.environ.get("BINANCE_SPOT_BASE", "https://data-api.binance.vision")
+FUTURES_BASE = os.environ.get("BINANCE_FUTURES_BASE", "https://www.binance.com")
 PAIR = "BTCUSDT"
 SUPPORTED = {"PERPETUAL", "CURRENT_MONTH", "NEXT_MONTH", "CURRENT_QUARTER", "NEXT_QUARTER"}
 OI_NOTE = "Binance Open Interest Statistics exposes only the latest 1 month."
+USER_AGENT = "KAFKA2306/bitcoin-derivatives"
+RETRY_STATUS = {418, 429, 500, 502, 503, 504}
+WEIGHT_LIMITS = {"data-api.binance.vision": 6000, "www.binance.com": 2400}
+PAGE_LIMIT = 1000
+DAY_MS = 86_400_000
+HASH_CHUNK = 1 << 20
+OUTPUT_MODES = ("pretty", "compact", "orjson")
+INTRADAY_RETENTION_DAYS = 7
+DELIVERY_COLUMNS = [("days_to_maturity", "float"), ("delivery_basis_pct", "float"),
+                    ("annualized_delivery_basis_pct", "float")]
+COLUMNAR_SCHEMAS = {
+    "daily": [("date_ms", "int"), ("symbol", "dict"), ("contract_type", "dict"), ("spot_close", "float"),
+              ("contract_close", "float"), ("mark_close", "float"), ("index_close", "float"), ("volume", "float"),
+              ("quote_volume", "float"), ("mark_index_premium_pct", "float"), ("raw_price_gap_pct", "float"),
+              ("perpetual_premium_pct", "float"), ("funding_event_count", "int"), ("funding_rate_sum", "float"),
+              *DELIVERY_COLUMNS],
+    "funding": [("symbol", "dict"), ("funding_time_ms", "int"), ("funding_rate", "float"), ("mark_price", "float")],
+    "open_interest": [("symbol", "dict"), ("timestamp_ms", "int"), ("open_interest", "float"),
+                      ("open_interest_value", "float")],
+    "term_structure": [("observed_at_ms", "int"), ("symbol", "dict"), ("contract_type", "dict"), ("status", "dict"),
+                       ("onboard_date_ms", "int"), ("delivery_date_ms", "int"), ("spot_mid", "float"),
+                       ("contract_last_price", "float"), ("mark_price", "float"), ("index_price", "float"),
+                       ("mark_index_premium_pct", "float"), ("raw_price_gap_pct", "float"), ("open_interest", "float"),
+                       ("volume_24h", "float"), ("quote_volume_24h", "float"), ("best_bid", "float"),
+                       ("best_ask", "float"), ("perpetual_premium_pct", "float"), ("last_funding_rate", "float"),
+                       ("next_funding_time_ms", "int"), *DELIVERY_COLUMNS, ("depth_level_count", "int"),
+                       ("execution_notional", "float"), ("bid_vwap", "float"), ("ask_vwap", "float"),
+                       ("slippage_adjusted_basis_pct", "float"), ("annualized_slippage_adjusted_basis_pct", "float")],
+    "delivery_series": [("date_ms", "int"), ("series", "dict"), ("symbol", "dict"), ("delivery_date_ms", "int"),
+                        ("spot_close", "float"), ("contract_close", "float"), *DELIVERY_COLUMNS, ("roll", "bool"),
+                        ("rolled_from", "dict")],
+}
+ARROW_TYPES = {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "dict": pa.dictionary(pa.int32(), pa.string())}
+QUARTER_SERIES = ("CURRENT_QUARTER", "NEXT_QUARTER")
+OBJECT_KINDS = {"objects": ".json", "manifests": ".json", "depth": ".f64"}
+DEPTH_LIMIT = 5
+DEPTH_ENCODING = "depth-f64"
+DEPTH_HEADER = struct.Struct("<4sIIqqq4x")
+EXECUTION_NOTIONAL = 100_000.0
+PAGE_SPAN_MS = {"klines": (PAGE_LIMIT - 1) * 86_400_000, "funding": (PAGE_LIMIT - 1) * 4 * 3_600_000}
 
 
-def dump(value: object) -> bytes:
-    return (json.dumps(value, ensure_ascii=False, indent=2, sort_keys=True) + "\n").encode()
+def dump(value: object, mode: str = "pretty") -> bytes:
+    """Canonical sorted-key JSON. Evidence, manifests and hashes always use "pretty"; views may use a compact mode."""
+    if mode == "pretty":
+        return (json.dumps(value, ensure_ascii=False, indent=2, sort_keys=True) + "\n").encode()
+    if mode == "compact":
+        return (json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True) + "\n").encode()
+    if mode == "orjson":
+        if orjson is None:
+            raise RuntimeError("orjson output mode requires the orjson package")
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+    raise ValueError(f"unsupported output mode: {mode!r}")
 
 
 def digest(raw: bytes) -> str:
     return hashlib.sha256(raw).hexdigest()
 
 
-def get_json(base: str, path: str, params: dict[str, object] | None = None) -> tuple[object, bytes, str]:
+class HttpClient:
+    """Keep-alive connection pool per host with jittered retries and X-MBX-USED-WEIGHT throttling."""
+
+    def __init__(self, pool_size: int = 8, max_retries: int = 4, backoff_s: float = 0.5,
+                 timeout: float = 60, weight_ratio: float = 0.8, max_retry_after_s: float = 120) -> None:
+        self.pool_size, self.max_retries, self.backoff_s = max(1, pool_size), max_retries, backoff_s
+        self.timeout, self.weight_ratio, self.max_retry_after_s = timeout, weight_ratio, max_retry_after_s
+        self._lock = threading.Lock()
+        self._idle: dict[str, list[HTTPConnection]] = {}
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._weight: dict[str, tuple[int, int]] = {}
+
+    def _slot(self, netloc: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            return self._slots.setdefault(netloc, threading.BoundedSemaphore(self.pool_size))
+
+    def _acquire(self, scheme: str, netloc: str) -> HTTPConnection:
+        with self._lock:
+            idle = self._idle.setdefault(netloc, [])
+            if idle:
+                return idle.pop()
+        cls = HTTPSConnection if scheme == "https" else HTTPConnection
+        return cls(netloc, timeout=self.timeout)
+
+    def _release(self, netloc: str, conn: HTTPConnection) -> None:
+        with self._lock:
+            self._idle.setdefault(netloc, []).append(conn)
+
+    def _throttle(self, host: str) -> None:
+        limit = WEIGHT_LIMITS.get(host)
+        with self._lock:
+            used, minute = self._weight.get(host, (0, 0))
+        now = time.time()
+        if limit and minute == int(now // 60) and used >= limit * self.weight_ratio:
+            time.sleep(60 - now % 60)
+
+    def _observe_weight(self, host: str, headers: Any) -> int | None:
+        value = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("X-MBX-USED-WEIGHT")
+        if value is None:
+            return None
+        with self._lock:
+            self._weight[host] = (int(value), int(time.time() // 60))
+        return int(value)
+
+    def close(self) -> None:
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+    def get(self, url: str) -> tuple[bytes, dict[str, Any]]:
+        parts = urlsplit(url)
+        target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        started, attempt = time.monotonic(), 0
+        while True:
+            self._throttle(parts.hostname or "")
+            status, retry_after, weight = None, None, None
+            with self._slot(parts.netloc):
+                conn = self._acquire(parts.scheme, parts.netloc)
+                try:
+                    conn.request("GET", target, headers={"User-Agent": USER_AGENT, "Connection": "keep-alive"})
+                    response = conn.getresponse()
+                    raw = response.read()
+                except (OSError, HTTPException) as exc:
+                    conn.close()
+                    error: Exception = exc
+                else:
+                    status = response.status
+                    weight = self._observe_weight(parts.hostname or "", response.headers)
+                    retry_after = response.headers.get("Retry-After")
+                    if response.will_close:
+                        conn.close()
+                    else:
+                        self._release(parts.netloc, conn)
+                    if status == 200:
+                        stats = {"attempts": attempt + 1, "retries": attempt, "status": status, "used_weight_1m": weight,
+                                 "bytes": len(raw), "latency_ms": round((time.monotonic() - started) * 1000, 3)}
+                        return raw, stats
+                    error = RuntimeError(f"Binance HTTP {status}: {url}")
+            if (status is not None and status not in RETRY_STATUS) or attempt >= self.max_retries:
+                raise error
+            delay = float(retry_after) if retry_after else random.uniform(0, self.backoff_s * 2 ** attempt)
+            if delay > self.max_retry_after_s:
+                raise RuntimeError(f"Binance Retry-After {delay:.0f}s exceeds limit: {url}") from error
+            attempt += 1
+            time.sleep(delay)
+
+
+HTTP = HttpClient()
+
+
+def fetch_json(base: str, path: str, params: dict[str, object] | None = None,
+               client: HttpClient | None = None) -> tuple[object, bytes, str, dict[str, Any]]:
     query = f"?{urlencode(params)}" if params else ""
     url = f"{base}{path}{query}"
-    req = Request(url, headers={"User-Agent": "KAFKA2306/bitcoin-derivatives"})
-    with urlopen(req, timeout=60) as response:
-        raw = response.read()
+    raw, stats = (client or HTTP).get(url)
     if not raw:
         raise RuntimeError(f"empty Binance response: {url}")
-    return json.loads(raw), raw, url
+    return json.loads(raw), raw, url, stats
 
 
-def capture(evidence: dict[str, Any], payloads: dict[str, Any], root: Path, key: str,
-            base: str, path: str, params: dict[str, object] | None = None) -> Any:
-    payload, raw, url = get_json(base, path, params)
-    sha = digest(raw)
-    dst = root / "raw" / "objects" / f"{sha}.json"
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    if not dst.exists():
-        dst.write_bytes(raw)
-    evidence[key] = {"source_url": url, "sha256": sha, "path": dst.as_posix()}
+def get_json(base: str, path: str, params: dict[str, object] | None = None) -> tuple[object, bytes, str]:
+    payload, raw, url, _ = fetch_json(base, path, params)
+    return payload, raw, url
+
+
+class ObjectStore:
+    """Loose <sha256> files per kind plus an optional append-only pack indexed by sha256 -> (offset, length)."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root / "raw"
+        self.pack_dir = self.root / "pack"
+        self.pack_path, self.index_path = self.pack_dir / "objects.pack", self.pack_dir / "objects.idx"
+        config = self.pack_dir / "config.json"
+        self.compression = json.loads(config.read_text())["compression"] if config.exists() else None
+        self.index: dict[str, dict[str, Any]] = {}
+        if self.index_path.exists():
+            for line in self.index_path.read_text().splitlines():
+                entry = json.loads(line)
+                self.index[entry["sha256"]] = entry
+        self._lock = threading.Lock()
+
+    @property
+    def packed(self) -> bool:
+        return self.compression is not None
+
+    def init_pack(self, compression: str) -> None:
+        if compression not in {"none", "zstd"}:
+            raise ValueError(f"unsupported pack compression: {compression!r}")
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        (self.pack_dir / "config.json").write_bytes(dump({"compression": compression}))
+        self.compression = compression
+
+    def loose_path(self, sha: str, kind: str = "objects") -> Path:
+        return self.root / kind / f"{sha}{OBJECT_KINDS[kind]}"
+
+    def put(self, raw: bytes, kind: str = "objects") -> str:
+        sha = digest(raw)
+        loose = self.loose_path(sha, kind)
+        with self._lock:
+            if sha in self.index or loose.exists():
+                return sha
+            if not self.packed:
+                loose.parent.mkdir(parents=True, exist_ok=True)
+                loose.write_bytes(raw)
+                return sha
+            self._append(raw, sha, kind)
+        return sha
+
+    def _append(self, raw: bytes, sha: str, kind: str, *, sync: bool = False) -> None:
+        """Append one object to the pack and index (caller holds the lock); `sync` fsyncs both before returning."""
+        data = pa.Codec("zstd").compress(raw, asbytes=True) if self.compression == "zstd" else raw
+        with self.pack_path.open("ab") as handle:
+            offset = handle.tell()
+            handle.write(data)
+            if sync:
+                handle.flush()
+                os.fsync(handle.fileno())
+        entry = {"sha256": sha, "kind": kind, "offset": offset, "length": len(data), "size": len(raw), "codec": self.compression}
+        with self.index_path.open("a") as handle:
+            handle.write(json.dumps(entry, sort_keys=True) + "\n")
+            if sync:
+                handle.flush()
+                os.fsync(handle.fileno())
+        self.index[sha] = entry
+
+    def shas(self, kind: str = "objects") -> list[str]:
+        loose = {path.stem for path in (self.root / kind).glob(f"*{OBJECT_KINDS[kind]}")}
+        return sorted(loose | {sha for sha, entry in self.index.items() if entry.get("kind") == kind})
+
+    def chunks(self, sha: str, kind: str = "objects") -> Iterator[bytes]:
+        loose = self.loose_path(sha, kind)
+        if loose.exists():
+            with loose.open("rb") as handle:
+                while chunk := handle.read(HASH_CHUNK):
+                    yield chunk
+            return
+        entry = self.index.get(sha)
+        if entry is None:
+            raise FileNotFoundError(f"raw object not found: {sha}")
+        with self.pack_path.open("rb") as handle:
+            handle.seek(entry["offset"])
+            if entry["codec"] == "zstd":
+                yield pa.Codec("zstd").decompress(handle.read(entry["length"]), entry["size"], asbytes=True)
+                return
+            remaining = entry["length"]
+            while remaining:
+                chunk = handle.read(min(HASH_CHUNK, remaining))
+                remaining -= len(chunk)
+                yield chunk
+
+    def get(self, sha: str, kind: str = "objects") -> bytes:
+        return b"".join(self.chunks(sha, kind))
+
+    def repack(self, compression: str = "none") -> dict[str, int]:
+        """Fold loose objects and manifests into the pack; their sha256 references stay valid.
+
+        Each loose file is removed only after its pack and index entries are on disk, so an interrupted repack
+        leaves every object readable (at worst both loose and packed).
+        """
+        if not self.packed:
+            self.init_pack(compression)
+        moved = 0
+        for kind, suffix in OBJECT_KINDS.items():
+            for path in sorted((self.root / kind).glob(f"*{suffix}")):
+                raw = path.read_bytes()
+                if digest(raw) != path.stem:
+                    raise ValueError(f"raw object hash mismatch: {path}")
+                with self._lock:
+                    if path.stem not in self.index:
+                        self._append(raw, path.stem, kind, sync=True)
+                path.unlink()
+                moved += 1
+        return {"repacked_object_count": moved, "packed_object_count": len(self.index)}
+
+
+def open_store(root: Path) -> ObjectStore:
+    return _open_store(Path(root).resolve())
+
+
+@functools.lru_cache(maxsize=None)
+def _open_store(root: Path) -> ObjectStore:
+    return ObjectStore(root)
+
+
+def book_levels(depth: Mapping[str, Any]) -> tuple[np.ndarray, np.ndarray]:
+    """(price, qty) float64 rows of each side, from either a JSON depth response or an unpacked depth object."""
+    bids, asks = (np.asarray(depth.get(side, []), dtype=np.float64).reshape(-1, 2) for side in ("bids", "asks"))
+    return bids, asks
+
+
+def pack_depth(payload: Mapping[str, Any]) -> bytes:
+    """Order book as a fixed header plus little-endian float64 (price, qty) rows, bids first."""
+    bids, asks = book_levels(payload)
+    head = DEPTH_HEADER.pack(b"DPF1", len(bids), len(asks), int(payload.get("lastUpdateId") or 0),
+                             int(payload.get("E") or 0), int(payload.get("T") or 0))
+    return head + np.concatenate([bids, asks]).astype("<f8").tobytes()
+
+
+def unpack_depth(raw: bytes) -> dict[str, Any]:
+    magic, bid_count, ask_count, update_id, event_ms, transact_ms = DEPTH_HEADER.unpack_from(raw)
+    levels = np.frombuffer(raw, "<f8", offset=DEPTH_HEADER.size).reshape(-1, 2)
+    if magic != b"DPF1" or len(levels) != bid_count + ask_count:
+        raise ValueError("malformed packed depth object")
+    return {"lastUpdateId": update_id, "E": event_ms, "T": transact_ms, "bids": levels[:bid_count], "asks": levels[bid_count:]}
+
+
+def decode(item: dict[str, Any], raw: bytes) -> Any:
+    return unpack_depth(raw) if item.get("encoding") == DEPTH_ENCODING else json.loads(raw)
+
+
+def job_encoding(path: str, params: dict[str, object] | None) -> str | None:
+    """Deep books (--depth-limit above the default) are stored packed instead of as JSON."""
+    return DEPTH_ENCODING if path == "/fapi/v1/depth" and int((params or {}).get("limit") or 0) > DEPTH_LIMIT else None
+
+
+def store(evidence: dict[str, Any], payloads: dict[str, Any], root: Path, key: str,
+          payload: Any, raw: bytes, url: str, encoding: str | None = None) -> Any:
+    kind = "objects"
+    if encoding == DEPTH_ENCODING:
+        kind, raw = "depth", pack_depth(payload)
+        payload = unpack_depth(raw)
+    sha = open_store(root).put(raw, kind)
+    dst = root / "raw" / kind / f"{sha}{OBJECT_KINDS[kind]}"
+    evidence[key] = {"source_url": url, "sha256": sha, "path": dst.as_posix(), **({"encoding": encoding} if encoding else {})}
     payloads[key] = payload
     return payload
 
 
-def active_contracts(exchange: dict[str, Any]) -> list[dict[str, Any]]:
+def capture(evidence: dict[str, Any], payloads: dict[str, Any], root: Path, key: str,
+            base: str, path: str, params: dict[str, object] | None = None, *,
+            client: HttpClient | None = None, network: dict[str, Any] | None = None) -> Any:
+    payload, raw, url, stats = fetch_json(base, path, params, client)
+    if network is not None:
+        network[key] = stats
+    return store(evidence, payloads, root, key, payload, raw, url)
+
+
+def capture_many(evidence: dict[str, Any], payloads: dict[str, Any], root: Path,
+                 jobs: list[tuple[str, str, str, dict[str, object] | None]], max_concurrency: int = 1, *,
+                 client: HttpClient | None = None, network: dict[str, Any] | None = None) -> None:
+    """Fetch jobs with bounded concurrency, then store them in job order so evidence is order-independent."""
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(jobs) or 1))) as pool:
+        results = list(pool.map(lambda job: fetch_json(job[1], job[2], job[3], client), jobs))
+    for (key, _, path, params), (payload, raw, url, stats) in zip(jobs, results):
+        if network is not None:
+            network[key] = stats
+        store(evidence, payloads, root, key, payload, raw, url, job_encoding(path, params))
+
+
+def network_summary(requests: dict[str, Any], wall_ms: float) -> dict[str, Any]:
+    return {
+        "request_count": len(requests), "retry_count": sum(item["retries"] for item in requests.values()),
+        "response_bytes_total": sum(item.get("bytes", 0) for item in requests.values()),
+        "request_latency_ms_total": round(sum(item["latency_ms"] for item in requests.values()), 3),
+        "request_latency_ms_max": max((item["latency_ms"] for item in requests.values()), default=0.0),
+        "collect_wall_ms": round(wall_ms, 3), "requests": requests,
+    }
+
+
+def object_store_for(path: Path) -> ObjectStore:
+    return open_store(path.parents[2])
+
+
+def read_object(item: dict[str, Any], key: str, verify: bool = True) -> bytes:
+    path = Path(item["path"])
+    raw = path.read_bytes() if path.exists() else object_store_for(path).get(item["sha256"])
+    if verify and digest(raw) != item["sha256"]:
+        raise ValueError(f"raw evidence hash mismatch: {key}")
+    return raw
+
+
+def stream_digest(path: Path, sha: str) -> str:
+    hasher = hashlib.sha256()
+    for chunk in object_store_for(path).chunks(sha, path.parent.name):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def verify_objects(items: dict[str, tuple[str, Path]], max_workers: int = 8) -> int:
+    """Hash objects in chunks on a thread pool; items maps sha256 to (evidence key, path)."""
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        actual = dict(zip(items, pool.map(lambda sha: stream_digest(items[sha][1], sha), items)))
+    for sha, (key, _) in items.items():
+        if actual[sha] != sha:
+            raise ValueError(f"raw evidence hash mismatch: {key}")
+    return len(items)
+
+
+def series_kind(key: str) -> str | None:
+    key = split_pair(key)[1]
+    if key in {"spot_klines", "index_klines"} or key.endswith((":klines", ":mark")):
+        return "klines"
+    return "funding" if key == "funding" else None
+
+
+def merge_segments(kind: str, parts: list[list[Any]]) -> list[Any]:
+    """Merge series segments oldest first; a later segment replaces rows with the same open/funding time."""
+    merged: dict[int, Any] = {}
+    for rows in parts:
+        for row in rows:
+            merged[int(row[0]) if kind == "klines" else int(row["fundingTime"])] = row
+    return [merged[ms] for ms in sorted(merged)]
+
+
+def series_cursor(kind: str, rows: list[Any], now_ms: int) -> int | None:
+    if kind == "klines":
+        closed = [int(row[0]) for row in rows if int(row[6]) < now_ms]
+    else:
+        closed = [int(row["fundingTime"]) for row in rows]
+    return max(closed) if closed else None
+
+
+def previous_chains(previous: dict[str, Any] | None) -> dict[str, list[dict[str, Any]]]:
+    if not previous:
+        return {}
+    chains = {key: list(items) for key, items in previous.get("segments", {}).items()}
+    for key, item in previous.get("evidence", {}).items():
+        if series_kind(key) and key not in chains:
+            chains[key] = [item]
+    return chains
+
+
+def load_chain(key: str, chain: list[dict[str, Any]], verify: bool = True) -> list[Any]:
+    return merge_segments(str(series_kind(key)), [json.loads(read_object(item, key, verify)) for item in chain])
+
+
+def write_manifest(root: Path, manifest: dict[str, Any]) -> None:
+    raw_root = root / "raw"
+    raw_root.mkdir(parents=True, exist_ok=True)
+    raw = dump(manifest)
+    open_store(root).put(raw, "manifests")
+    (raw_root / "latest-manifest.json").write_bytes(raw)
+
+
+def backfill_pages(jobs: list[tuple[str, str, str, dict[str, object] | None]],
+                   now_ms: int) -> list[tuple[str, str, str, str, dict[str, object]]]:
+    pages = []
+    for key, base, path, params in jobs:
+        kind = str(series_kind(key))
+        stop = min(now_ms, int((params or {}).get("endTime") or now_ms) + 1)
+        for start in range(int((params or {}).get("startTime") or 0), stop, PAGE_SPAN_MS[kind]):
+            end = min(start + PAGE_SPAN_MS[kind], stop) - 1
+            query = {**(params or {}), "startTime": start, "endTime": end, "limit": PAGE_LIMIT}
+            pages.append((f"{key}@{start}", key, base, path, query))
+    return pages
+
+
+def backfill_series(root: Path, jobs: list[tuple[str, str, str, dict[str, object] | None]], since_ms: int, now_ms: int,
+                    max_concurrency: int, client: HttpClient, network: dict[str, Any]) -> dict[str, list[dict[str, Any]]]:
+    """Fetch every page since since_ms concurrently, checkpointing each stored page so a rerun resumes.
+
+    A page that comes back full (e.g. funding more often than every 4h) is split in half and refetched until no
+    response is truncated; its checkpoint entry is then the list of the stored halves, oldest first.
+    """
+    checkpoint_path = root / "raw" / "backfill-checkpoint.json"
+    checkpoint = json.loads(checkpoint_path.read_text()) if checkpoint_path.exists() else {}
+    if checkpoint.get("since_ms") != since_ms:
+        checkpoint = {"since_ms": since_ms, "pages": {}}
+    pages = backfill_pages(jobs, now_ms)
+    last = {key: page_id for page_id, key, *_ in pages}
+    todo = [page for page in pages if page[0] not in checkpoint["pages"] or last[page[1]] == page[0]]
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def fetch_page(base: str, path: str, query: dict[str, object]) -> list[tuple[Any, bytes, str, dict[str, Any]]]:
+        payload, raw, url, stats = fetch_json(base, path, query, client)
+        if len(payload) < PAGE_LIMIT:
+            return [(payload, raw, url, stats)]
+        lo, hi = int(query["startTime"]), int(query["endTime"])
+        if hi - lo < 2:
+            raise RuntimeError(f"backfill page is full and cannot be split, history may be truncated: {url}")
+        middle = (lo + hi) // 2
+        return fetch_page(base, path, {**query, "endTime": middle}) + fetch_page(base, path, {**query, "startTime": middle + 1})
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        futures = {pool.submit(fetch_page, base, path, query): (page_id, key)
+                   for page_id, key, base, path, query in todo}
+        for future in as_completed(futures):
+            page_id, key = futures[future]
+            parts = []
+            for n, (payload, raw, url, stats) in enumerate(future.result()):
+                evidence: dict[str, Any] = {}
+                store(evidence, {}, root, key, payload, raw, url)
+                network[page_id if n == 0 else f"{page_id}#{n}"] = stats
+                parts.append(evidence[key])
+            checkpoint["pages"][page_id] = parts[0] if len(parts) == 1 else parts
+            checkpoint_path.write_bytes(dump(checkpoint))
+    chains: dict[str, list[dict[str, Any]]] = {}
+    for page_id, key, *_ in pages:
+        item = checkpoint["pages"][page_id]
+        chains.setdefault(key, []).extend(item if isinstance(item, list) else [item])
+    return chains
+
+
+def pair_key(pair: str, key: str) -> str:
+    """Evidence key of a pair; the original BTCUSDT keys stay un-prefixed."""
+    return key if pair == PAIR else f"{pair}:{key}"
+
+
+def split_pair(key: str) -> tuple[str, str]:
+    head, sep, rest = key.partition(":")
+    return (head, rest) if sep and head != "contract" else (PAIR, key)
+
+
+def pair_api_dir(api_dir: Path, pair: str) -> Path:
+    return api_dir if pair == PAIR else api_dir.parent / f"{pair.lower()}-derivatives"
+
+
+def pair_root(root: Path, pair: str) -> Path:
+    return root if pair == PAIR else root / "pairs" / pair.lower()
+
+
+class PairPayloads(Mapping[str, Any]):
+    """One pair's payloads under the un-prefixed keys the builders expect; exchangeInfo is shared."""
+
+    def __init__(self, payloads: Mapping[str, Any], pair: str) -> None:
+        self._payloads, self.pair = payloads, pair
+
+    def __getitem__(self, key: str) -> Any:
+        return self._payloads[key if key == "exchange" else pair_key(self.pair, key)]
+
+    def __iter__(self) -> Iterator[str]:
+        return (key if key == "exchange" else split_pair(key)[1] for key in self._payloads
+                if key == "exchange" or split_pair(key)[0] == self.pair)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def active_contracts(exchange: dict[str, Any], pair: str = PAIR) -> list[dict[str, Any]]:
     out = []
     for meta in exchange.get("symbols", []):
-        if meta.get("pair") != PAIR or meta.get("status") != "TRADING":
+        if meta.get("pair") != pair or meta.get("status") != "TRADING":
             continue
         contract_type = str(meta.get("contractType") or "")
         if contract_type not in SUPPORTED:
-            raise ValueError(f"unsupported active BTC contract type: {meta.get('symbol')} {contract_type!r}")
+            raise ValueError(f"unsupported active {pair.removesuffix('USDT')} contract type: {meta.get('symbol')} {contract_type!r}")
         out.append(meta)
     if not out:
-        raise RuntimeError("no active BTCUSDT futures contracts returned")
+        raise RuntimeError(f"no active {pair} futures contracts returned")
     if sum(str(row["contractType"]) == "PERPETUAL" for row in out) != 1:
-        raise RuntimeError("expected exactly one active BTCUSDT perpetual contract")
+        raise RuntimeError(f"expected exactly one active {pair} perpetual contract")
     return sorted(out, key=lambda row: (str(row["contractType"]), str(row["symbol"])))
 
 
-def collect(root: Path, lookback_days: int) -> tuple[dict[str, Any], dict[str, Any]]:
-    now = datetime.now(UTC)
-    start_ms = int((now - timedelta(days=lookback_days)).timestamp() * 1000)
-    oi_start_ms = int((now - timedelta(days=29)).timestamp() * 1000)
-    evidence: dict[str, Any] = {}
-    payloads: dict[str, Any] = {}
-    exchange = capture(evidence, payloads, root, "exchange", FUTURES_BASE, "/fapi/v1/exchangeInfo")
-    contracts = active_contracts(exchange)
-    perpetual = next(row for row in contracts if row["contractType"] == "PERPETUAL")
-    capture(evidence, payloads, root, "spot_book", SPOT_BASE, "/api/v3/ticker/bookTicker", {"symbol": PAIR})
-    capture(evidence, payloads, root, "spot_klines", SPOT_BASE, "/api/v3/klines",
-            {"symbol": PAIR, "interval": "1d", "startTime": start_ms, "limit": 200})
-    capture(evidence, payloads, root, "index_klines", FUTURES_BASE, "/fapi/v1/indexPriceKlines",
-            {"pair": PAIR, "interval": "1d", "startTime": start_ms, "limit": 200})
-    capture(evidence, payloads, root, "funding", FUTURES_BASE, "/fapi/v1/fundingRate",
-            {"symbol": perpetual["symbol"], "startTime": start_ms, "limit": 1000})
-    capture(evidence, payloads, root, "oi_history", FUTURES_BASE, "/futures/data/openInterestHist",
-            {"symbol": perpetual["symbol"], "period": "1d", "startTime": oi_start_ms, "limit": 500})
+def fast_jobs(contracts: list[dict[str, Any]], pair: str = PAIR,
+              depth_limit: int = DEPTH_LIMIT) -> list[tuple[str, str, str, dict[str, object] | None]]:
+    """Endpoints that move intraday; everything else only changes with a new bar or new metadata."""
+    jobs: list[tuple[str, str, str, dict[str, object] | None]] = [
+        (pair_key(pair, "spot_book"), SPOT_BASE, "/api/v3/ticker/bookTicker", {"symbol": pair})]
     for meta in contracts:
         symbol = str(meta["symbol"])
-        prefix = f"contract:{symbol}"
-        capture(evidence, payloads, root, f"{prefix}:premium", FUTURES_BASE, "/fapi/v1/premiumIndex", {"symbol": symbol})
-        capture(evidence, payloads, root, f"{prefix}:oi", FUTURES_BASE, "/fapi/v1/openInterest", {"symbol": symbol})
-        capture(evidence, payloads, root, f"{prefix}:ticker", FUTURES_BASE, "/fapi/v1/ticker/24hr", {"symbol": symbol})
-        capture(evidence, payloads, root, f"{prefix}:depth", FUTURES_BASE, "/fapi/v1/depth", {"symbol": symbol, "limit": 5})
+        prefix = pair_key(pair, f"contract:{symbol}")
+        jobs += [
+            (f"{prefix}:premium", FUTURES_BASE, "/fapi/v1/premiumIndex", {"symbol": symbol}),
+            (f"{prefix}:oi", FUTURES_BASE, "/fapi/v1/openInterest", {"symbol": symbol}),
+            (f"{prefix}:ticker", FUTURES_BASE, "/fapi/v1/ticker/24hr", {"symbol": symbol}),
+            (f"{prefix}:depth", FUTURES_BASE, "/fapi/v1/depth", {"symbol": symbol, "limit": depth_limit}),
+        ]
+    return jobs
+
+
+def pair_jobs(pair: str, contracts: list[dict[str, Any]], start_ms: int, oi_start_ms: int,
+              delivered: list[dict[str, Any]] | None = None,
+              depth_limit: int = DEPTH_LIMIT) -> list[tuple[str, str, str, dict[str, object] | None]]:
+    """Every endpoint of one pair; delivered contracts only get klines up to their deliveryDate."""
+    perpetual = next(row for row in contracts if row["contractType"] == "PERPETUAL")
+    jobs = fast_jobs(contracts, pair, depth_limit) + [
+        (pair_key(pair, "spot_klines"), SPOT_BASE, "/api/v3/klines", {"symbol": pair, "interval": "1d", "startTime": start_ms, "limit": 200}),
+        (pair_key(pair, "index_klines"), FUTURES_BASE, "/fapi/v1/indexPriceKlines",
+         {"pair": pair, "interval": "1d", "startTime": start_ms, "limit": 200}),
+        (pair_key(pair, "funding"), FUTURES_BASE, "/fapi/v1/fundingRate", {"symbol": perpetual["symbol"], "startTime": start_ms, "limit": 1000}),
+        (pair_key(pair, "oi_history"), FUTURES_BASE, "/futures/data/openInterestHist",
+         {"symbol": perpetual["symbol"], "period": "1d", "startTime": oi_start_ms, "limit": 500}),
+    ]
+    for meta in [*contracts, *(delivered or [])]:
+        symbol = str(meta["symbol"])
+        prefix = pair_key(pair, f"contract:{symbol}")
         contract_start = max(start_ms, int(meta.get("onboardDate") or 0))
         common = {"symbol": symbol, "interval": "1d", "startTime": contract_start, "limit": 200}
-        capture(evidence, payloads, root, f"{prefix}:klines", FUTURES_BASE, "/fapi/v1/klines", common)
-        capture(evidence, payloads, root, f"{prefix}:mark", FUTURES_BASE, "/fapi/v1/markPriceKlines", common)
+        if meta.get("status") == "DELIVERED":
+            common["endTime"] = int(meta["deliveryDate"])
+        jobs += [
+            (f"{prefix}:klines", FUTURES_BASE, "/fapi/v1/klines", common),
+            (f"{prefix}:mark", FUTURES_BASE, "/fapi/v1/markPriceKlines", common),
+        ]
+    return jobs
+
+
+def collect(root: Path, lookback_days: int, max_concurrency: int = 1,
+            client: HttpClient | None = None, incremental: bool = False,
+            backfill_since: datetime | None = None, pairs: tuple[str, ...] = (PAIR,),
+            depth_limit: int = DEPTH_LIMIT) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Capture every pair's evidence from one shared exchangeInfo over the same pooled client."""
+    now = datetime.now(UTC)
+    now_ms = int(now.timestamp() * 1000)
+    started = time.monotonic()
+    client = client or HTTP
+    start_ms = int((backfill_since or now - timedelta(days=lookback_days)).timestamp() * 1000)
+    oi_start_ms = int((now - timedelta(days=29)).timestamp() * 1000)
+    evidence: dict[str, Any] = {}
+    payloads: dict[str, Any] = {}
+    network: dict[str, Any] = {}
+    exchange = capture(evidence, payloads, root, "exchange", FUTURES_BASE, "/fapi/v1/exchangeInfo",
+                       client=client, network=network)
+    jobs = []
+    for pair in pairs:
+        contracts = active_contracts(exchange, pair)
+        delivered = MetadataHistory(pair_root(root, pair)).delivered(contracts, now_ms, start_ms)
+        jobs += pair_jobs(pair, contracts, start_ms, oi_start_ms, delivered, depth_limit)
+    latest = root / "raw" / "latest-manifest.json"
+    chains = previous_chains(json.loads(latest.read_text())) if incremental and latest.exists() else {}
+    carried: dict[str, list[dict[str, Any]]] = {}
+    for key, _, _, params in jobs:
+        if "endTime" in (params or {}) and key in chains:
+            rows = load_chain(key, chains[key])
+            if rows and int(rows[-1][6]) >= int(params["endTime"]):
+                carried[key], evidence[key], payloads[key] = chains[key], chains[key][-1], rows
+    jobs = [job for job in jobs if job[0] not in carried]
+    history: dict[str, list[Any]] = {}
+    if backfill_since is not None:
+        series = [job for job in jobs if series_kind(job[0])]
+        jobs = [job for job in jobs if not series_kind(job[0])]
+        for key, chain in backfill_series(root, series, start_ms, now_ms, max_concurrency, client, network).items():
+            evidence[key] = chain[-1]
+            payloads[key] = load_chain(key, chain)
+            chains[key] = chain
+    for n, (key, base, path, params) in enumerate(jobs):
+        kind = series_kind(key)
+        if kind and key in chains:
+            rows = load_chain(key, chains[key])
+            cursor = series_cursor(kind, rows, now_ms)
+            if cursor is not None:
+                history[key] = rows
+                jobs[n] = (key, base, path, {**(params or {}), "startTime": cursor + 1})
+    capture_many(evidence, payloads, root, jobs, max_concurrency, client=client, network=network)
+    segments: dict[str, list[dict[str, Any]]] = {key: chains[key] for key in evidence if backfill_since and series_kind(key)}
+    segments.update(carried)
+    for key, base, path, params in jobs:
+        if not series_kind(key):
+            continue
+        if key in history and len(payloads[key]) >= int((params or {}).get("limit") or 0):
+            raise RuntimeError(f"incremental delta fills a whole page, run --backfill-since first: {key}")
+        chain = chains[key] if key in history else []
+        segments[key] = chain + ([evidence[key]] if not chain or chain[-1]["sha256"] != evidence[key]["sha256"] else [])
+        if key in history:
+            payloads[key] = merge_segments(str(series_kind(key)), [history[key], payloads[key]])
     manifest = {
         "schema_version": 1,
         "retrieved_at": now.isoformat(),
         "venue": "Binance",
-        "pair": PAIR,
+        "pair": pairs[0],
         "lookback_days_requested": lookback_days,
         "evidence": evidence,
+        "network": network_summary(network, (time.monotonic() - started) * 1000),
     }
-    raw_root = root / "raw"
-    raw_root.mkdir(parents=True, exist_ok=True)
-    raw = dump(manifest)
-    sha = digest(raw)
-    manifest_path = raw_root / "manifests" / f"{sha}.json"
-    manifest_path.parent.mkdir(parents=True, exist_ok=True)
-    if not manifest_path.exists():
-        manifest_path.write_bytes(raw)
-    (raw_root / "latest-manifest.json").write_bytes(raw)
+    if tuple(pairs) != (PAIR,):
+        manifest["pairs"] = list(pairs)
+    if depth_limit != DEPTH_LIMIT:
+        manifest["depth_limit"] = depth_limit
+    if incremental or backfill_since is not None:
+        manifest["segments"] = segments
+    if backfill_since is not None:
+        manifest["backfill_since"] = backfill_since.isoformat()
+    write_manifest(root, manifest)
+    if backfill_since is not None:
+        (root / "raw" / "backfill-checkpoint.json").unlink(missing_ok=True)
     return manifest, payloads
 
 
-def load(root: Path) -> tuple[dict[str, Any], dict[str, Any]]:
+class LazyPayloads(Mapping[str, Any]):
+    """Evidence payloads decoded on first access; hashes are verified before any decoding."""
+
+    def __init__(self, manifest: dict[str, Any]) -> None:
+        self._chains = {key: [item] for key, item in manifest["evidence"].items()}
+        self._segmented = set(manifest.get("segments", {}))
+        self._chains.update({key: list(chain) for key, chain in manifest.get("segments", {}).items()})
+        self._decoded: dict[str, Any] = {}
+
+    def objects(self) -> dict[str, tuple[str, Path]]:
+        return {item["sha256"]: (key, Path(item["path"])) for key, chain in self._chains.items() for item in chain}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._decoded:
+            chain = self._chains[key]
+            self._decoded[key] = (load_chain(key, chain, verify=False) if key in self._segmented
+                                  else decode(chain[0], read_object(chain[0], key, verify=False)))
+        return self._decoded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._chains)
+
+    def __len__(self) -> int:
+        return len(self._chains)
+
+
+def load(root: Path, max_workers: int = 8) -> tuple[dict[str, Any], LazyPayloads]:
     manifest = json.loads((root / "raw" / "latest-manifest.json").read_text())
-    payloads: dict[str, Any] = {}
-    for key, item in manifest["evidence"].items():
-        path = Path(item["path"])
-        raw = path.read_bytes()
-        if digest(raw) != item["sha256"]:
-            raise ValueError(f"raw evidence hash mismatch: {key}")
-        payloads[key] = json.loads(raw)
+    payloads = LazyPayloads(manifest)
+    verify_objects(payloads.objects(), max_workers)
     return manifest, payloads
 
 
+def verify_store(root: Path, max_workers: int = 8) -> dict[str, Any]:
+    """Check every loose and packed object against its content address and every manifest reference, decoding nothing."""
+    objects = open_store(root)
+    items = {path.stem: (path.name, path) for kind, suffix in OBJECT_KINDS.items()
+             for path in sorted((root / "raw" / kind).glob(f"*{suffix}"))}
+    items.update({sha: (f"pack:{sha}", objects.loose_path(sha)) for sha in objects.index if sha not in items})
+    verified = verify_objects(items, max_workers)
+    referenced = LazyPayloads(json.loads((root / "raw" / "latest-manifest.json").read_text())).objects()
+    missing = sorted(key for sha, (key, path) in referenced.items() if sha not in items and not path.exists())
+    if missing:
+        raise ValueError(f"raw evidence missing: {', '.join(missing)}")
+    verify_objects({sha: item for sha, item in referenced.items() if sha not in items}, max_workers)
+    return {"verified_object_count": verified, "referenced_object_count": len(referenced),
+            "packed_object_count": len(objects.index)}
+
+
 def klines(rows: list[list[Any]]) -> dict[str, dict[str, Any]]:
     out: dict[str, dict[str, Any]] = {}
     for row in rows:
@@ -140,34 +764,50 @@ def klines(rows: list[list[Any]]) -> dict[str, dict[str, Any]]:
     return out
 
 
+def kline_arrays(rows: list[list[Any]]) -> dict[str, np.ndarray]:
+    """Parse a kline payload once into columns keyed by UTC day; a later row for the same day wins."""
+    if any(len(row) < 8 for row in rows):
+        raise ValueError("unexpected kline schema")
+    table = np.array([row[:8] for row in rows], dtype=object).reshape(len(rows), 8)
+    open_ms = table[:, 0].astype(np.int64)
+    day = open_ms // DAY_MS
+    order = np.argsort(day, kind="stable")
+    day = day[order]
+    keep = order[np.r_[day[1:] != day[:-1], True]] if len(day) else order
+    return {"day": open_ms[keep] // DAY_MS, "close_time_ms": table[keep, 6].astype(np.int64),
+            "close": table[keep, 4].astype(np.float64), "volume": table[keep, 5].astype(np.float64),
+            "quote_volume": table[keep, 7].astype(np.float64)}
+
+
+def iso_utc(ms: np.ndarray) -> list[str]:
+    text = np.datetime_as_string(ms.astype("datetime64[ms]").astype("datetime64[us]"), unit="us").tolist()
+    return [f"{value[:-7] if value.endswith('.000000') else value}+00:00" for value in text]
+
+
 def funding_rows(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    out = []
-    for row in rows:
-        if not {"symbol", "fundingTime", "fundingRate"} <= set(row):
-            raise ValueError("unexpected funding schema")
-        ms = int(row["fundingTime"])
-        out.append({
-            "symbol": str(row["symbol"]), "funding_time_ms": ms,
-            "funding_time": datetime.fromtimestamp(ms / 1000, UTC).isoformat(),
-            "funding_rate": float(row["fundingRate"]),
-            "mark_price": float(row["markPrice"]) if row.get("markPrice") not in (None, "") else None,
-        })
-    return sorted(out, key=lambda row: row["funding_time_ms"])
+    if any(not {"symbol", "fundingTime", "fundingRate"} <= set(row) for row in rows):
+        raise ValueError("unexpected funding schema")
+    ms = np.array([int(row["fundingTime"]) for row in rows], dtype=np.int64)
+    order = np.argsort(ms, kind="stable").tolist()
+    times = iso_utc(ms[order])
+    return [{
+        "symbol": str(rows[n]["symbol"]), "funding_time_ms": int(ms[n]), "funding_time": when,
+        "funding_rate": float(rows[n]["fundingRate"]),
+        "mark_price": float(rows[n]["markPrice"]) if rows[n].get("markPrice") not in (None, "") else None,
+    } for n, when in zip(order, times)]
 
 
 def oi_rows(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    out = []
-    for row in rows:
-        if not {"symbol", "sumOpenInterest", "sumOpenInterestValue", "timestamp"} <= set(row):
-            raise ValueError("unexpected open-interest schema")
-        ms = int(row["timestamp"])
-        out.append({
-            "symbol": str(row["symbol"]), "timestamp_ms": ms,
-            "timestamp": datetime.fromtimestamp(ms / 1000, UTC).isoformat(),
-            "open_interest": float(row["sumOpenInterest"]),
-            "open_interest_value": float(row["sumOpenInterestValue"]),
-        })
-    return sorted(out, key=lambda row: row["timestamp_ms"])
+    if any(not {"symbol", "sumOpenInterest", "sumOpenInterestValue", "timestamp"} <= set(row) for row in rows):
+        raise ValueError("unexpected open-interest schema")
+    ms = np.array([int(row["timestamp"]) for row in rows], dtype=np.int64)
+    order = np.argsort(ms, kind="stable").tolist()
+    times = iso_utc(ms[order])
+    return [{
+        "symbol": str(rows[n]["symbol"]), "timestamp_ms": int(ms[n]), "timestamp": when,
+        "open_interest": float(rows[n]["sumOpenInterest"]),
+        "open_interest_value": float(rows[n]["sumOpenInterestValue"]),
+    } for n, when in zip(order, times)]
 
 
 def metadata_snapshot(contracts: list[dict[str, Any]], observed_at: str) -> dict[str, Any]:
@@ -179,18 +819,114 @@ def metadata_snapshot(contracts: list[dict[str, Any]], observed_at: str) -> dict
     return {"observed_at": observed_at, "metadata_sha256": digest(dump(normalized)), "contracts": normalized}
 
 
-def update_metadata_history(root: Path, contracts: list[dict[str, Any]], observed_at: str) -> dict[str, Any]:
-    path = root / "metadata-history.json"
-    history = json.loads(path.read_text()) if path.exists() else {"schema_version": 1, "changes": []}
-    snap = metadata_snapshot(contracts, observed_at)
-    if not history["changes"] or history["changes"][-1]["metadata_sha256"] != snap["metadata_sha256"]:
-        history["changes"].append(snap)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_bytes(dump(history))
+class MetadataHistory:
+    """Append-only contract metadata log (metadata-history.jsonl) with an observed_at time index for as_of() lookups."""
+
+    def __init__(self, root: Path) -> None:
+        self.path, self.index_path = root / "metadata-history.jsonl", root / "metadata-history.index.jsonl"
+        self.entries = [json.loads(line) for line in self.index_path.read_text().splitlines()] if self.index_path.exists() else []
+        self.legacy_path = root / "metadata-history.json"
+        self.legacy = json.loads(self.legacy_path.read_text())["changes"] if not self.entries and self.legacy_path.exists() else None
+        if self.legacy is not None:
+            self.entries = [{"observed_at_ms": iso_ms(snap["observed_at"]), "metadata_sha256": snap["metadata_sha256"]} for snap in self.legacy]
+        self.times = np.array([entry["observed_at_ms"] for entry in self.entries], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def version(self) -> dict[str, Any]:
+        return {"change_count": len(self.entries), "last_metadata_sha256": self.entries[-1]["metadata_sha256"] if self.entries else None}
+
+    def _write(self, snap: dict[str, Any]) -> None:
+        line = json.dumps(snap, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode() + b"\n"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as handle:
+            offset = handle.tell()
+            handle.write(line)
+        entry = {"observed_at_ms": iso_ms(snap["observed_at"]), "offset": offset, "length": len(line),
+                 "metadata_sha256": snap["metadata_sha256"]}
+        if len(self.times) and entry["observed_at_ms"] < self.times[-1]:
+            raise ValueError(f"metadata observation out of order: {snap['observed_at']}")
+        with self.index_path.open("a") as handle:
+            handle.write(json.dumps(entry, sort_keys=True) + "\n")
+        self.entries.append(entry)
+        self.times = np.append(self.times, entry["observed_at_ms"])
+
+    def migrate(self) -> None:
+        """Move a legacy metadata-history.json (rewritten whole on every run) into the append-only log."""
+        legacy, self.legacy, self.entries, self.times = self.legacy or [], None, [], np.array([], dtype=np.int64)
+        for snap in legacy:
+            self._write(snap)
+        self.legacy_path.unlink()
+
+    def append(self, contracts: list[dict[str, Any]], observed_at: str) -> bool:
+        if self.legacy is not None:
+            self.migrate()
+        snap = metadata_snapshot(contracts, observed_at)
+        if self.entries and self.entries[-1]["metadata_sha256"] == snap["metadata_sha256"]:
+            return False
+        self._write(snap)
+        return True
+
+    def snapshot(self, position: int) -> dict[str, Any]:
+        if self.legacy is not None:
+            return self.legacy[position]
+        entry = self.entries[position]
+        with self.path.open("rb") as handle:
+            handle.seek(entry["offset"])
+            return json.loads(handle.read(entry["length"]))
+
+    def as_of(self, ts_ms: int) -> dict[str, Any] | None:
+        """Latest snapshot observed at or before ts_ms, or None before the first observation."""
+        position = int(np.searchsorted(self.times, ts_ms, "right")) - 1
+        return self.snapshot(position) if position >= 0 else None
+
+    def contract_types(self, symbol: str, times_ms: np.ndarray, default: str) -> np.ndarray:
+        """Contract type of `symbol` as of each time; bars before the first observation take the earliest one."""
+        out = np.full(len(times_ms), default, dtype=object)
+        if not self.entries:
+            return out
+        positions = np.clip(np.searchsorted(self.times, times_ms, "right") - 1, 0, None)
+        for position in np.unique(positions).tolist():
+            kinds = [row["contract_type"] for row in self.snapshot(position)["contracts"] if row["symbol"] == symbol]
+            if kinds:
+                out[positions == position] = kinds[0]
+        return out
+
+    def delivered(self, active: list[dict[str, Any]], now_ms: int, since_ms: int = 0) -> list[dict[str, Any]]:
+        """Delivery contracts seen in any snapshot that delivered in [since_ms, now_ms] and are no longer active,
+        shaped like exchangeInfo rows with their last observed metadata."""
+        live = {str(meta["symbol"]) for meta in active}
+        seen: dict[str, dict[str, Any]] = {}
+        for position in range(len(self)):
+            for row in self.snapshot(position)["contracts"]:
+                seen[row["symbol"]] = row
+        return [{"symbol": row["symbol"], "pair": row["pair"], "contractType": row["contract_type"], "status": "DELIVERED",
+                 "onboardDate": row["onboard_date_ms"], "deliveryDate": row["delivery_date_ms"], "underlyingType": row["underlying_type"]}
+                for symbol, row in sorted(seen.items())
+                if symbol not in live and row["contract_type"] != "PERPETUAL" and since_ms <= int(row["delivery_date_ms"] or 0) <= now_ms]
+
+
+def update_metadata_history(root: Path, contracts: list[dict[str, Any]], observed_at: str) -> MetadataHistory:
+    history = MetadataHistory(root)
+    history.append(contracts, observed_at)
     return history
 
 
-def current_terms(payloads: dict[str, Any], contracts: list[dict[str, Any]], now: datetime) -> list[dict[str, Any]]:
+def vwap_to_notional(levels: np.ndarray, notional: float) -> float | None:
+    """Average fill price of `notional` quote currency walked through (price, qty) levels; None if the book is too thin."""
+    filled = np.cumsum(levels[:, 0] * levels[:, 1])
+    if not len(filled) or filled[-1] < notional:
+        return None
+    last = int(np.searchsorted(filled, notional))
+    quantity = np.cumsum(levels[:, 1])
+    before_value, before_qty = (float(filled[last - 1]), float(quantity[last - 1])) if last else (0.0, 0.0)
+    return notional / (before_qty + (notional - before_value) / float(levels[last, 0]))
+
+
+def current_terms(payloads: Mapping[str, Any], contracts: list[dict[str, Any]], now: datetime,
+                  notional: float = EXECUTION_NOTIONAL) -> list[dict[str, Any]]:
+    """Term-structure rows; the slippage-adjusted basis sells `notional` into the captured bids (the carry leg)."""
     spot = payloads["spot_book"]
     spot_mid = (float(spot["bidPrice"]) + float(spot["askPrice"])) / 2
     out = []
@@ -201,6 +937,9 @@ def current_terms(payloads: dict[str, Any], contracts: list[dict[str, Any]], now
                                       payloads[f"{prefix}:ticker"], payloads[f"{prefix}:depth"])
         last, mark, index = float(ticker["lastPrice"]), float(premium["markPrice"]), float(premium["indexPrice"])
         gap = (last / spot_mid - 1) * 100
+        bids, asks = book_levels(depth)
+        bid_vwap, ask_vwap = vwap_to_notional(bids, notional), vwap_to_notional(asks, notional)
+        executable = (bid_vwap / spot_mid - 1) * 100 if bid_vwap is not None else None
         item = {
             "observed_at": now.isoformat(), "symbol": symbol, "contract_type": contract_type,
             "status": meta.get("status"), "onboard_date_ms": meta.get("onboardDate"),
@@ -209,8 +948,9 @@ def current_terms(payloads: dict[str, Any], contracts: list[dict[str, Any]], now
             "mark_index_premium_pct": (mark / index - 1) * 100, "raw_price_gap_pct": gap,
             "open_interest": float(oi["openInterest"]), "volume_24h": float(ticker["volume"]),
             "quote_volume_24h": float(ticker["quoteVolume"]),
-            "best_bid": float(depth["bids"][0][0]) if depth.get("bids") else None,
-            "best_ask": float(depth["asks"][0][0]) if depth.get("asks") else None,
+            "best_bid": float(bids[0, 0]) if len(bids) else None, "best_ask": float(asks[0, 0]) if len(asks) else None,
+            "depth_level_count": len(bids) + len(asks), "execution_notional": notional,
+            "bid_vwap": bid_vwap, "ask_vwap": ask_vwap, "slippage_adjusted_basis_pct": executable,
         }
         if contract_type == "PERPETUAL":
             item.update({
@@ -218,6 +958,7 @@ def current_terms(payloads: dict[str, Any], contracts: list[dict[str, Any]], now
                 "last_funding_rate": float(premium["lastFundingRate"]) if premium.get("lastFundingRate") not in (None, "") else None,
                 "next_funding_time_ms": int(premium["nextFundingTime"]) if premium.get("nextFundingTime") else None,
                 "days_to_maturity": None, "delivery_basis_pct": None, "annualized_delivery_basis_pct": None,
+                "annualized_slippage_adjusted_basis_pct": None,
             })
         else:
             delivery_ms = int(meta.get("deliveryDate") or 0)
@@ -230,103 +971,414 @@ def current_terms(payloads: dict[str, Any], contracts: list[dict[str, Any]], now
                 "perpetual_premium_pct": None, "last_funding_rate": None, "next_funding_time_ms": None,
                 "days_to_maturity": dte, "delivery_basis_pct": gap,
                 "annualized_delivery_basis_pct": gap * 365 / dte,
+                "annualized_slippage_adjusted_basis_pct": executable * 365 / dte if executable is not None else None,
             })
         out.append(item)
     return out
 
 
-def daily_rows(payloads: dict[str, Any], contracts: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    spot, index = klines(payloads["spot_klines"]), klines(payloads["index_klines"])
+def daily_rows(payloads: Mapping[str, Any], contracts: list[dict[str, Any]], since_ms: int = 0,
+               history: MetadataHistory | None = None) -> list[dict[str, Any]]:
+    """One row per closed bar and contract; with a history, contract_type is the type as of each bar's close."""
+    spot, index = kline_arrays(payloads["spot_klines"]), kline_arrays(payloads["index_klines"])
     funding = funding_rows(payloads["funding"])
-    by_day: dict[str, list[dict[str, Any]]] = {}
-    for event in funding:
-        by_day.setdefault(event["funding_time"][:10], []).append(event)
-    out = []
+    funding_day = np.array([event["funding_time_ms"] for event in funding], dtype=np.int64) // DAY_MS
+    funding_rate = [event["funding_rate"] for event in funding]
+    base = np.intersect1d(spot["day"], index["day"], assume_unique=True)
+    base = base[base >= since_ms // DAY_MS]
+    blocks = []
     for meta in contracts:
         symbol, contract_type = str(meta["symbol"]), str(meta["contractType"])
         prefix = f"contract:{symbol}"
-        futures, mark = klines(payloads[f"{prefix}:klines"]), klines(payloads[f"{prefix}:mark"])
-        for date in sorted(set(spot) & set(index) & set(futures) & set(mark)):
-            s, i, f, m = spot[date], index[date], futures[date], mark[date]
-            gap = (f["close"] / s["close"] - 1) * 100
-            row = {
-                "date": date, "symbol": symbol, "contract_type": contract_type,
-                "spot_close": s["close"], "contract_close": f["close"], "mark_close": m["close"],
-                "index_close": i["close"], "volume": f["volume"], "quote_volume": f["quote_volume"],
-                "mark_index_premium_pct": (m["close"] / i["close"] - 1) * 100,
-                "raw_price_gap_pct": gap,
-            }
-            if contract_type == "PERPETUAL":
-                events = by_day.get(date, [])
-                row.update({
-                    "perpetual_premium_pct": gap, "funding_event_count": len(events),
-                    "funding_rate_sum": sum(e["funding_rate"] for e in events) if events else None,
-                    "days_to_maturity": None, "delivery_basis_pct": None, "annualized_delivery_basis_pct": None,
-                })
-            else:
-                delivery_ms = int(meta.get("deliveryDate") or 0)
-                if delivery_ms <= 0:
-                    raise ValueError(f"delivery contract lacks deliveryDate: {symbol}")
-                dte = (delivery_ms - f["close_time_ms"]) / 86_400_000
-                if dte <= 0:
-                    continue
-                row.update({
-                    "perpetual_premium_pct": None, "funding_event_count": None, "funding_rate_sum": None,
-                    "days_to_maturity": dte, "delivery_basis_pct": gap,
-                    "annualized_delivery_basis_pct": gap * 365 / dte,
-                })
-            out.append(row)
+        futures, mark = kline_arrays(payloads[f"{prefix}:klines"]), kline_arrays(payloads[f"{prefix}:mark"])
+        days = np.intersect1d(np.intersect1d(base, futures["day"], assume_unique=True), mark["day"], assume_unique=True)
+        s, i, f, m = (series["close"][np.searchsorted(series["day"], days)] for series in (spot, index, futures, mark))
+        at = np.searchsorted(futures["day"], days)
+        gap = (f / s - 1) * 100
+        kinds = history.contract_types(symbol, futures["close_time_ms"][at], contract_type) if history else contract_type
+        block = {
+            "day": days, "symbol": symbol, "contract_type": kinds, "spot_close": s, "contract_close": f,
+            "mark_close": m, "index_close": i, "volume": futures["volume"][at], "quote_volume": futures["quote_volume"][at],
+            "mark_index_premium_pct": (m / i - 1) * 100, "raw_price_gap_pct": gap,
+        }
+        if contract_type == "PERPETUAL":
+            lo, hi = np.searchsorted(funding_day, days, "left"), np.searchsorted(funding_day, days, "right")
+            block.update({
+                "perpetual_premium_pct": gap, "funding_event_count": hi - lo,
+                "funding_rate_sum": [sum(funding_rate[a:b]) if b > a else None for a, b in zip(lo.tolist(), hi.tolist())],
+                "days_to_maturity": None, "delivery_basis_pct": None, "annualized_delivery_basis_pct": None,
+            })
+        else:
+            delivery_ms = int(meta.get("deliveryDate") or 0)
+            if delivery_ms <= 0:
+                raise ValueError(f"delivery contract lacks deliveryDate: {symbol}")
+            dte = (delivery_ms - futures["close_time_ms"][at]) / DAY_MS
+            live = dte > 0
+            block = {key: value[live] if isinstance(value, np.ndarray) else value for key, value in block.items()}
+            gap, dte = gap[live], dte[live]
+            block.update({
+                "perpetual_premium_pct": None, "funding_event_count": None, "funding_rate_sum": None,
+                "days_to_maturity": dte, "delivery_basis_pct": gap, "annualized_delivery_basis_pct": gap * 365 / dte,
+            })
+        blocks.append(block)
+    out = []
+    for block in blocks:
+        count = len(block["day"])
+        dates = np.datetime_as_string(block["day"].astype("datetime64[D]")).tolist()
+        columns = {key: value.tolist() if isinstance(value, np.ndarray) else value if isinstance(value, list) else [value] * count
+                   for key, value in block.items() if key != "day"}
+        out += [{"date": date, **{key: values[n] for key, values in columns.items()}} for n, date in enumerate(dates)]
     return sorted(out, key=lambda row: (row["date"], row["symbol"]))
 
 
-def build(manifest: dict[str, Any], payloads: dict[str, Any], root: Path, api_dir: Path,
-          update_history: bool = True) -> dict[str, Any]:
-    contracts = active_contracts(payloads["exchange"])
-    now = datetime.fromisoformat(str(manifest["retrieved_at"]).replace("Z", "+00:00")).astimezone(UTC)
-    daily = daily_rows(payloads, contracts)
-    funding = funding_rows(payloads["funding"])
-    oi = oi_rows(payloads["oi_history"])
-    term = current_terms(payloads, contracts, now)
-    perp_dates = sorted({row["date"] for row in daily if row["contract_type"] == "PERPETUAL"})
-    delivery_dates = sorted({row["date"] for row in daily if row["contract_type"] != "PERPETUAL"})
+def iso_ms(value: str) -> int:
+    parsed = datetime.fromisoformat(value)
+    return int((parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)).timestamp() * 1000)
+
+
+def columnar_table(view: str, rows: list[dict[str, Any]]) -> pa.Table:
+    derived = {"date_ms": "date", "observed_at_ms": "observed_at"}
+    columns = {}
+    for name, kind in COLUMNAR_SCHEMAS[view]:
+        values = [iso_ms(row[derived[name]]) if name in derived else row.get(name) for row in rows]
+        columns[name] = pa.array(values, type=pa.string() if kind == "dict" else ARROW_TYPES[kind])
+    return pa.table(columns)
+
+
+def write_table(path: Path, view: str, table: pa.Table) -> None:
+    schema = pa.schema([(name, ARROW_TYPES[kind]) for name, kind in COLUMNAR_SCHEMAS[view]])
+    columns = [table.column(name).combine_chunks() for name in schema.names]
+    columns = [column.dictionary_encode() if kind == "dict" else column
+               for column, (_, kind) in zip(columns, COLUMNAR_SCHEMAS[view])]
+    pq.write_table(pa.Table.from_arrays(columns, schema=schema), path, compression="zstd")
+
+
+def write_columnar(path: Path, view: str, rows: list[dict[str, Any]]) -> None:
+    """Write a typed Parquet mirror of a view: *_ms int64, prices float64, symbols dictionary-encoded."""
+    write_table(path, view, columnar_table(view, rows))
+
+
+def read_columnar(path: Path, view: str) -> pa.Table:
+    """Read a Parquet mirror back with dictionary columns decoded, ready to concatenate with columnar_table()."""
+    table = pq.read_table(path)
+    return pa.table({name: table.column(name).combine_chunks().dictionary_decode() if kind == "dict" else table.column(name)
+                     for name, kind in COLUMNAR_SCHEMAS[view]})
+
+
+VIEW_FILES = {
+    "daily": ("daily.json", "daily.parquet"), "delivery_series": ("delivery-series.json", "delivery-series.parquet"),
+    "funding": ("funding.json", "funding.parquet"),
+    "open_interest": ("open-interest.json", "open-interest.parquet"),
+    "term_structure": ("term-structure.json", "term-structure.parquet", "current.json"),
+}
+COVERAGE_FIELDS = {
+    "daily": ("perpetual_first_date", "perpetual_last_date", "perpetual_day_count",
+              "delivery_first_date", "delivery_last_date", "delivery_day_count"),
+    "delivery_series": ("current_quarter_day_count", "next_quarter_day_count", "quarter_roll_count"),
+    "funding": ("funding_event_count", "funding_first_time", "funding_last_time"),
+    "open_interest": ("open_interest_observation_count", "open_interest_first_time", "open_interest_last_time"),
+    "term_structure": ("active_delivery_contract_count",),
+}
+
+
+def view_lineage(manifest: dict[str, Any], contracts: list[dict[str, Any]], mode: str = "pretty",
+                 history: MetadataHistory | None = None, pair: str = PAIR,
+                 delivered: list[dict[str, Any]] | None = None) -> dict[str, dict[str, Any]]:
+    """Evidence SHA-256 chains each view is derived from, plus a digest of the whole lineage entry."""
+    chains = {key: [item["sha256"]] for key, item in manifest["evidence"].items()}
+    chains.update({key: [item["sha256"] for item in chain] for key, chain in manifest.get("segments", {}).items()})
+    prefixes = [f"contract:{meta['symbol']}" for meta in contracts]
+    series = ["spot_klines", "index_klines", "funding",
+              *(f"contract:{meta['symbol']}:{name}" for meta in [*contracts, *(delivered or [])] for name in ("klines", "mark"))]
+    metadata = metadata_snapshot(contracts, "")["metadata_sha256"]
+    inputs = {
+        "daily": series, "delivery_series": series,
+        "funding": ["funding"], "open_interest": ["oi_history"],
+        "term_structure": ["spot_book", *(f"{prefix}:{name}" for prefix in prefixes for name in ("premium", "oi", "ticker", "depth"))],
+    }
+    out = {}
+    for view, keys in inputs.items():
+        entry: dict[str, Any] = {"inputs": {key: chains[pair_key(pair, key)] for key in keys}}
+        if mode != "pretty":
+            entry["output_mode"] = mode
+        if view in {"daily", "delivery_series", "term_structure"}:
+            entry["metadata_sha256"] = metadata
+        if view in {"daily", "delivery_series"} and history:
+            entry["metadata_history"] = history.version()
+        if view == "term_structure":
+            entry["retrieved_at"] = manifest["retrieved_at"]
+        out[view] = {**entry, "lineage_sha256": digest(dump(entry))}
+    return out
+
+
+def plan_views(lineage: dict[str, dict[str, Any]], previous: dict[str, Any] | None, api_dir: Path) -> dict[str, str]:
+    """unchanged: identical inputs; append: daily inputs only extend the previous chains; rebuild: anything else."""
+    plan = {}
+    for view, entry in lineage.items():
+        before = ((previous or {}).get("lineage") or {}).get(view)
+        if not before or not all((api_dir / name).exists() for name in VIEW_FILES[view]):
+            plan[view] = "rebuild"
+        elif before["lineage_sha256"] == entry["lineage_sha256"]:
+            plan[view] = "unchanged"
+        elif view == "daily" and all(before.get(field) == entry.get(field) for field in ("metadata_sha256", "metadata_history", "output_mode")) \
+                and set(before["inputs"]) == set(entry["inputs"]) \
+                and all(chain[:len(before["inputs"][key])] == before["inputs"][key] for key, chain in entry["inputs"].items()):
+            plan[view] = "append"
+        else:
+            plan[view] = "rebuild"
+    return plan
+
+
+def append_records(path: Path, field: str, rows: list[dict[str, Any]], drop: int, mode: str = "pretty") -> None:
+    """Replace the last `drop` (not all) records of a dump()ed {field: [...], "schema_version": 1} file in place."""
+    with path.open("r+b") as handle:
+        text = handle.read()
+        pos = len(text)
+        for _ in range(drop):
+            pos = text.rindex(b"\n    {" if mode == "pretty" else b',{"', 0, pos)
+        body = dump({field: rows, "schema_version": 1}, mode)
+        handle.seek(pos if mode == "pretty" else pos + 1)
+        handle.truncate()
+        handle.write(body[body.index(b"[") + 1:])
+
+
+def daily_coverage(dates: list[str], contract_types: list[str]) -> dict[str, Any]:
+    perp_dates = sorted({date for date, kind in zip(dates, contract_types) if kind == "PERPETUAL"})
+    delivery_dates = sorted({date for date, kind in zip(dates, contract_types) if kind != "PERPETUAL"})
     if not perp_dates:
         raise RuntimeError("no perpetual daily observations built")
-    api_dir.mkdir(parents=True, exist_ok=True)
-    (api_dir / "daily.json").write_bytes(dump({"schema_version": 1, "records": daily}))
-    (api_dir / "funding.json").write_bytes(dump({"schema_version": 1, "events": funding}))
-    (api_dir / "open-interest.json").write_bytes(dump({"schema_version": 1, "retention_note": OI_NOTE, "records": oi}))
-    (api_dir / "term-structure.json").write_bytes(dump({"schema_version": 1, "contracts": term}))
-    (api_dir / "current.json").write_bytes(dump({"schema_version": 1, "observed_at": now.isoformat(), "spot": payloads["spot_book"], "contracts": term}))
-    history = update_metadata_history(root, contracts, now.isoformat()) if update_history else ({"schema_version": 1, "changes": []})
-    coverage = {
+    return {
         "perpetual_first_date": perp_dates[0], "perpetual_last_date": perp_dates[-1], "perpetual_day_count": len(perp_dates),
         "delivery_first_date": delivery_dates[0] if delivery_dates else None,
         "delivery_last_date": delivery_dates[-1] if delivery_dates else None,
-        "delivery_day_count": len(delivery_dates), "funding_event_count": len(funding),
-        "funding_first_time": funding[0]["funding_time"] if funding else None,
-        "funding_last_time": funding[-1]["funding_time"] if funding else None,
-        "open_interest_observation_count": len(oi), "open_interest_first_time": oi[0]["timestamp"] if oi else None,
-        "open_interest_last_time": oi[-1]["timestamp"] if oi else None,
-        "active_contract_count": len(contracts),
-        "active_delivery_contract_count": sum(row["contract_type"] != "PERPETUAL" for row in term),
-        "metadata_change_count": len(history.get("changes", [])), "raw_evidence_count": len(manifest["evidence"]),
+        "delivery_day_count": len(delivery_dates),
+    }
+
+
+def build_daily(payloads: Mapping[str, Any], contracts: list[dict[str, Any]], api_dir: Path, append: bool,
+                mode: str = "pretty", history: MetadataHistory | None = None) -> dict[str, Any]:
+    """Write daily.json/.parquet; in append mode only dates from each symbol's last previous date onward are recomputed."""
+    if append:
+        previous = read_columnar(api_dir / "daily.parquet", "daily")
+        date_ms, symbols = previous.column("date_ms").to_numpy(), np.array(previous.column("symbol").to_pylist())
+        live = np.unique(symbols[np.isin(symbols, [str(meta["symbol"]) for meta in contracts if meta.get("status") != "DELIVERED"])])
+        since_ms = int(min(date_ms[symbols == symbol].max() for symbol in live)) if len(live) else 0
+        kept = date_ms < since_ms
+        tail = daily_rows(payloads, contracts, since_ms, history)
+        if kept.any() and tail:
+            append_records(api_dir / "daily.json", "records", tail, int((~kept).sum()), mode)
+            table = pa.concat_tables([previous.filter(pa.array(kept)), columnar_table("daily", tail)])
+            write_table(api_dir / "daily.parquet", "daily", table)
+            dates = np.datetime_as_string(table.column("date_ms").to_numpy().astype("datetime64[ms]").astype("datetime64[D]")).tolist()
+            return daily_coverage(dates, table.column("contract_type").to_pylist())
+    daily = daily_rows(payloads, contracts, history=history)
+    coverage = daily_coverage([row["date"] for row in daily], [row["contract_type"] for row in daily])
+    (api_dir / "daily.json").write_bytes(dump({"schema_version": 1, "records": daily}, mode))
+    write_columnar(api_dir / "daily.parquet", "daily", daily)
+    return coverage
+
+
+def delivery_series(daily: pa.Table, contracts: list[dict[str, Any]]) -> dict[str, Any]:
+    """Continuous CURRENT_QUARTER/NEXT_QUARTER basis over the whole daily table.
+
+    On each date the live quarterlies are ranked by deliveryDate, so the nearest one is CURRENT_QUARTER whatever
+    label the contract had at the time; a roll is recorded on the first date a series switches symbol.
+    """
+    deliveries = {str(meta["symbol"]): int(meta.get("deliveryDate") or 0) for meta in contracts}
+    table = daily.filter(pa.array(np.isin(np.array(daily.column("contract_type").to_pylist(), dtype=object), QUARTER_SERIES)))
+    date_ms, symbols = table.column("date_ms").to_numpy(), np.array(table.column("symbol").to_pylist(), dtype=object)
+    delivery = np.array([deliveries[symbol] for symbol in symbols.tolist()], dtype=np.int64)
+    order = np.lexsort((delivery, date_ms))
+    _, first, counts = np.unique(date_ms[order], return_index=True, return_counts=True)
+    rank = np.arange(len(order)) - np.repeat(first, counts)
+    order, rank = order[rank < len(QUARTER_SERIES)], rank[rank < len(QUARTER_SERIES)]
+    by_series = np.lexsort((date_ms[order], rank))
+    order, rank = order[by_series], rank[by_series]
+    symbol = symbols[order]
+    previous = np.concatenate([np.array([None], dtype=object), symbol[:-1]])
+    roll = np.concatenate([[False], rank[1:] == rank[:-1]]) & (symbol != previous)
+    columns = {
+        "series": np.array(QUARTER_SERIES, dtype=object)[rank], "symbol": symbol, "delivery_date_ms": delivery[order],
+        **{name: table.column(name).to_numpy()[order] for name in
+           ("spot_close", "contract_close", "days_to_maturity", "delivery_basis_pct", "annualized_delivery_basis_pct")},
+        "roll": roll, "rolled_from": np.where(roll, previous, None),
     }
+    dates = np.datetime_as_string(date_ms[order].astype("datetime64[ms]").astype("datetime64[D]")).tolist()
+    lists = {key: value.tolist() for key, value in columns.items()}
+    records = sorted(({"date": date, **{key: values[n] for key, values in lists.items()}} for n, date in enumerate(dates)),
+                     key=lambda row: (row["date"], row["series"]))
+    rolls = [{"date": row["date"], "series": row["series"], "from_symbol": row["rolled_from"], "to_symbol": row["symbol"]}
+             for row in records if row["roll"]]
+    return {"rolls": rolls, "records": records}
+
+
+def build(manifest: dict[str, Any], payloads: Mapping[str, Any], root: Path, api_dir: Path,
+          update_history: bool = True, dry_run: bool = False, mode: str = "pretty", pair: str = PAIR) -> dict[str, Any]:
+    """Rebuild only views whose evidence lineage changed; with dry_run return the plan without writing."""
+    contracts = active_contracts(payloads["exchange"], pair)
+    now = datetime.fromisoformat(str(manifest["retrieved_at"]).replace("Z", "+00:00")).astimezone(UTC)
+    previous_path = api_dir / "index.json"
+    previous = json.loads(previous_path.read_text()) if previous_path.exists() else None
+    history = MetadataHistory(root)
+    if update_history and not dry_run:
+        history.append(contracts, now.isoformat())
+    delivered = [meta for meta in history.delivered(contracts, int(now.timestamp() * 1000))
+                 if pair_key(pair, f"contract:{meta['symbol']}:klines") in manifest["evidence"]]
+    lineage = view_lineage(manifest, contracts, mode, history, pair, delivered)
+    plan = plan_views(lineage, previous, api_dir)
+    if dry_run:
+        return {"views": plan}
+    api_dir.mkdir(parents=True, exist_ok=True)
+    coverage: dict[str, Any] = {}
+    for view, action in plan.items():
+        if action == "unchanged":
+            coverage.update({field: previous["coverage"][field] for field in COVERAGE_FIELDS[view]})
+        elif view == "daily":
+            coverage.update(build_daily(payloads, contracts + delivered, api_dir, action == "append", mode, history))
+        elif view == "delivery_series":
+            series = delivery_series(read_columnar(api_dir / "daily.parquet", "daily"), contracts + delivered)
+            (api_dir / "delivery-series.json").write_bytes(dump({"schema_version": 1, **series}, mode))
+            write_columnar(api_dir / "delivery-series.parquet", "delivery_series", series["records"])
+            coverage.update({"current_quarter_day_count": sum(row["series"] == "CURRENT_QUARTER" for row in series["records"]),
+                             "next_quarter_day_count": sum(row["series"] == "NEXT_QUARTER" for row in series["records"]),
+                             "quarter_roll_count": len(series["rolls"])})
+        elif view == "funding":
+            funding = funding_rows(payloads["funding"])
+            (api_dir / "funding.json").write_bytes(dump({"schema_version": 1, "events": funding}, mode))
+            write_columnar(api_dir / "funding.parquet", "funding", funding)
+            coverage.update({"funding_event_count": len(funding),
+                             "funding_first_time": funding[0]["funding_time"] if funding else None,
+                             "funding_last_time": funding[-1]["funding_time"] if funding else None})
+        elif view == "open_interest":
+            oi = oi_rows(payloads["oi_history"])
+            (api_dir / "open-interest.json").write_bytes(dump({"schema_version": 1, "retention_note": OI_NOTE, "records": oi}, mode))
+            write_columnar(api_dir / "open-interest.parquet", "open_interest", oi)
+            coverage.update({"open_interest_observation_count": len(oi),
+                             "open_interest_first_time": oi[0]["timestamp"] if oi else None,
+                             "open_interest_last_time": oi[-1]["timestamp"] if oi else None})
+        else:
+            term = current_terms(payloads, contracts, now)
+            (api_dir / "term-structure.json").write_bytes(dump({"schema_version": 1, "contracts": term}, mode))
+            (api_dir / "current.json").write_bytes(dump({"schema_version": 1, "observed_at": now.isoformat(), "spot": payloads["spot_book"], "contracts": term}, mode))
+            write_columnar(api_dir / "term-structure.parquet", "term_structure", term)
+            coverage["active_delivery_contract_count"] = sum(row["contract_type"] != "PERPETUAL" for row in term)
+    coverage.update({
+        "active_contract_count": len(contracts), "delivered_contract_count": len(delivered),
+        "metadata_change_count": len(history), "raw_evidence_count": sum(key == "exchange" or split_pair(key)[0] == pair for key in manifest["evidence"]),
+    })
     index = {
-        "schema_version": 1, "dataset": "BTC Binance derivatives market structure", "venue": "Binance", "pair": PAIR,
-        "retrieved_at": now.isoformat(), "coverage": coverage,
-        "views": {"current": "current.json", "daily": "daily.json", "funding": "funding.json",
+        "schema_version": 1, "dataset": f"{pair.removesuffix('USDT')} Binance derivatives market structure", "venue": "Binance", "pair": pair,
+        "retrieved_at": now.isoformat(), "coverage": coverage, "lineage": lineage,
+        "views": {"current": "current.json", "daily": "daily.json", "delivery_series": "delivery-series.json", "funding": "funding.json",
                   "open_interest": "open-interest.json", "term_structure": "term-structure.json",
-                  "metadata_history": "../../../data/derivatives/metadata-history.json",
+                  "daily_parquet": "daily.parquet", "delivery_series_parquet": "delivery-series.parquet", "funding_parquet": "funding.parquet",
+                  "open_interest_parquet": "open-interest.parquet", "term_structure_parquet": "term-structure.parquet",
+                  "metadata_history": f"../../../data/derivatives/{'' if pair == PAIR else f'pairs/{pair.lower()}/'}metadata-history.jsonl",
                   "raw_manifest": "../../../data/derivatives/raw/latest-manifest.json"},
         "rules": ["PERPETUAL premium/funding and delivery basis are different metrics.",
                   "days_to_maturity and annualized_delivery_basis_pct exist only for delivery contracts.",
+                  "delivered contracts keep their daily rows until deliveryDate; delivery-series ranks live quarterlies by deliveryDate.",
                   "unknown active contract types fail closed.",
                   "raw endpoint bytes are content-addressed by SHA-256 before derived views are written.", OI_NOTE],
     }
-    (api_dir / "index.json").write_bytes(dump(index))
+    (api_dir / "index.json").write_bytes(dump(index, mode))
     return index
 
 
+def build_pairs(manifest: dict[str, Any], payloads: Mapping[str, Any], root: Path, api_dir: Path,
+                **options: Any) -> dict[str, Any]:
+    """Build each collected pair into its own API tree; several pairs also get a combined derivatives-index.json."""
+    pairs = manifest.get("pairs", [PAIR])
+    if pairs == [PAIR]:
+        return build(manifest, payloads, root, api_dir, **options)
+    indexes = {pair: build(manifest, PairPayloads(payloads, pair), pair_root(root, pair), pair_api_dir(api_dir, pair), pair=pair, **options)
+               for pair in pairs}
+    if options.get("dry_run"):
+        return {"views": {pair: index["views"] for pair, index in indexes.items()}}
+    combined = {
+        "schema_version": 1, "venue": "Binance", "retrieved_at": manifest["retrieved_at"],
+        "pairs": {pair: {"index": f"{pair_api_dir(api_dir, pair).name}/index.json", "coverage": index["coverage"]}
+                  for pair, index in indexes.items()},
+    }
+    (api_dir.parent / "derivatives-index.json").write_bytes(dump(combined, options.get("mode", "pretty")))
+    return {"coverage": {pair: index["coverage"] for pair, index in indexes.items()}}
+
+
+def poll_terms(contracts: Mapping[str, list[dict[str, Any]]], max_concurrency: int = 1,
+               client: HttpClient | None = None, depth_limit: int = DEPTH_LIMIT) -> tuple[datetime, dict[str, list[dict[str, Any]]]]:
+    """One watch tick: refetch only the fast endpoints of every pair and derive term-structure rows from them."""
+    jobs = [job for pair, metas in contracts.items() for job in fast_jobs(metas, pair, depth_limit)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(jobs)))) as pool:
+        results = list(pool.map(lambda job: fetch_json(job[1], job[2], job[3], client), jobs))
+    now = datetime.now(UTC)
+    payloads = {key: payload for (key, *_), (payload, *_) in zip(jobs, results)}
+    shas = {key: digest(raw) for (key, *_), (_, raw, *_) in zip(jobs, results)}
+    out = {}
+    for pair, metas in contracts.items():
+        rows = current_terms(PairPayloads(payloads, pair), metas, now)
+        for row in rows:
+            prefix = pair_key(pair, f"contract:{row['symbol']}")
+            row["source_sha256"] = {"spot_book": shas[pair_key(pair, "spot_book")],
+                                    **{name: shas[f"{prefix}:{name}"] for name in ("premium", "oi", "ticker", "depth")}}
+        out[pair] = rows
+    return now, out
+
+
+def append_intraday(api_dir: Path, rows: list[dict[str, Any]], now: datetime,
+                    retention_days: int = INTRADAY_RETENTION_DAYS) -> Path:
+    folder = api_dir / "intraday"
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"term-structure-{now.date().isoformat()}.jsonl"
+    with path.open("a") as handle:
+        handle.writelines(json.dumps(row, sort_keys=True, separators=(",", ":")) + "\n" for row in rows)
+    cutoff = (now - timedelta(days=retention_days)).date().isoformat()
+    for old in folder.glob("term-structure-*.jsonl"):
+        if old.stem.removeprefix("term-structure-") < cutoff:
+            old.unlink()
+    return path
+
+
+def watch(root: Path, api_dir: Path, interval_s: float, lookback_days: int, max_concurrency: int = 1,
+          client: HttpClient | None = None, metadata_refresh_s: float = 3600.0, ticks: int | None = None,
+          mode: str = "pretty", pairs: tuple[str, ...] = (PAIR,), depth_limit: int = DEPTH_LIMIT) -> int:
+    """Keep one pooled client open and append intraday term-structure rows every interval.
+
+    exchangeInfo is re-checked every metadata_refresh_s (or once a delivery contract passes its
+    deliveryDate); klines, funding and the daily views are recollected only when its hash changes.
+    """
+    client = client or HTTP
+
+    def metadata(exchange: dict[str, Any]) -> tuple[dict[str, list[dict[str, Any]]], str]:
+        contracts = {pair: active_contracts(exchange, pair) for pair in pairs}
+        return contracts, metadata_snapshot([meta for metas in contracts.values() for meta in metas], "")["metadata_sha256"]
+
+    def refresh() -> tuple[dict[str, list[dict[str, Any]]], str]:
+        manifest, payloads = collect(root, lookback_days, max_concurrency, client, incremental=True, pairs=pairs,
+                                     depth_limit=depth_limit)
+        build_pairs(manifest, payloads, root, api_dir, mode=mode)
+        return metadata(payloads["exchange"])
+
+    contracts, metadata_sha = refresh()
+    checked, count = time.monotonic(), 0
+    while ticks is None or count < ticks:
+        started = time.monotonic()
+        now_ms = int(time.time() * 1000)
+        expired = any(meta["contractType"] != "PERPETUAL" and int(meta.get("deliveryDate") or 0) <= now_ms
+                      for metas in contracts.values() for meta in metas)
+        if expired or started - checked >= metadata_refresh_s:
+            exchange = fetch_json(FUTURES_BASE, "/fapi/v1/exchangeInfo", client=client)[0]
+            checked = started
+            if metadata(exchange)[1] != metadata_sha:
+                contracts, metadata_sha = refresh()
+        now, rows = poll_terms(contracts, max_concurrency, client, depth_limit)
+        for pair, pair_rows in rows.items():
+            append_intraday(pair_api_dir(api_dir, pair), pair_rows, now)
+        count += 1
+        if ticks is None or count < ticks:
+            time.sleep(max(0.0, interval_s - (time.monotonic() - started)))
+    return count
+
+
 def contract_snapshot(symbol_meta: dict[str, object], spot_price: float, observed_at: datetime) -> dict[str, object]:
     """Backward-compatible current snapshot used by existing tests and callers."""
     symbol = str(symbol_meta["symbol"])
@@ -368,18 +1420,75 @@ def contract_snapshot(symbol_meta: dict[str, object], spot_price: float, observe
 
 
 def main() -> None:
+    global SPOT_BASE, FUTURES_BASE
     parser = argparse.ArgumentParser()
     parser.add_argument("--data-root", type=Path, default=Path("data/derivatives"))
     parser.add_argument("--api-dir", type=Path, default=Path("api/v1/bitcoin-derivatives"))
     parser.add_argument("--lookback-days", type=int, default=100)
     parser.add_argument("--offline", action="store_true")
+    parser.add_argument("--verify-only", action="store_true")
+    parser.add_argument("--repack", action="store_true")
+    parser.add_argument("--pack-compression", choices=["none", "zstd"], default="none")
     parser.add_argument("--no-history-update", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--format", choices=OUTPUT_MODES, default="pretty")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=4)
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--backfill-since", type=lambda value: datetime.fromisoformat(value).replace(tzinfo=UTC))
+    parser.add_argument("--spot-base", default=SPOT_BASE)
+    parser.add_argument("--futures-base", default=FUTURES_BASE)
+    parser.add_argument("--watch", type=float, metavar="INTERVAL")
+    parser.add_argument("--metadata-refresh", type=float, default=3600.0)
+    parser.add_argument("--pairs", type=lambda value: tuple(dict.fromkeys(item.strip().upper() for item in value.split(",") if item.strip())),
+                        default=(PAIR,), help="comma-separated USD-M pairs, e.g. BTCUSDT,ETHUSDT")
+    parser.add_argument("--depth-limit", type=int, choices=[5, 10, 20, 50, 100, 500, 1000], default=DEPTH_LIMIT,
+                        help="order book levels per side; above 5 the book is stored as packed float64")
     args = parser.parse_args()
+    SPOT_BASE, FUTURES_BASE = args.spot_base.rstrip("/"), args.futures_base.rstrip("/")
+    if args.repack:
+        print(json.dumps(open_store(args.data_root).repack(args.pack_compression), sort_keys=True))
+        return
+    if args.verify_only:
+        print(json.dumps(verify_store(args.data_root, args.max_concurrency), sort_keys=True))
+        return
     if args.lookback_days < 90:
         raise ValueError("lookback-days must be at least 90")
-    manifest, payloads = load(args.data_root) if args.offline else collect(args.data_root, args.lookback_days)
-    index = build(manifest, payloads, args.data_root, args.api_dir, update_history=not args.no_history_update)
-    print(json.dumps(index["coverage"], sort_keys=True))
+    if args.max_concurrency < 1:
+        raise ValueError("max-concurrency must be at least 1")
+    if not args.pairs:
+        raise ValueError("--pairs must name at least one pair")
+    if args.incremental and args.backfill_since:
+        raise ValueError("--incremental and --backfill-since are mutually exclusive")
+    if args.format == "orjson" and orjson is None:
+        raise RuntimeError("--format orjson requires the orjson package")
+    if args.watch is not None:
+        if args.watch <= 0:
+            raise ValueError("watch interval must be positive")
+        if args.offline or args.backfill_since:
+            raise ValueError("--watch cannot be combined with --offline or --backfill-since")
+        client = HttpClient(pool_size=args.max_concurrency, max_retries=args.max_retries)
+        try:
+            watch(args.data_root, args.api_dir, args.watch, args.lookback_days, args.max_concurrency, client,
+                  metadata_refresh_s=args.metadata_refresh, mode=args.format, pairs=args.pairs, depth_limit=args.depth_limit)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            client.close()
+        return
+    if args.offline:
+        manifest, payloads = load(args.data_root, args.max_concurrency)
+    else:
+        client = HttpClient(pool_size=args.max_concurrency, max_retries=args.max_retries)
+        try:
+            manifest, payloads = collect(args.data_root, args.lookback_days, args.max_concurrency, client,
+                                         incremental=args.incremental, backfill_since=args.backfill_since, pairs=args.pairs,
+                                         depth_limit=args.depth_limit)
+        finally:
+            client.close()
+    index = build_pairs(manifest, payloads, args.data_root, args.api_dir, update_history=not args.no_history_update,
+                        dry_run=args.dry_run, mode=args.format)
+    print(json.dumps(index["views"] if args.dry_run else index["coverage"], sort_keys=True))
 
 
 if __name__ == "__main__":
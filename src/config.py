@@ -7,6 +7,8 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 RAW_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "raw")
 PROCESSED_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "processed")
 ANALYSIS_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "analysis")
+DERIVATIVES_DATA_DIR = os.path.join(BASE_DIR, "data", "derivatives")
+KLINE_CACHE_DIR = os.path.join(OUTPUT_DIR, "cache", "klines")
 
 def create_output_directories():
     os.makedirs(RAW_OUTPUT_DIR, exist_ok=True)
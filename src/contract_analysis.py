@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 import math
+from bisect import bisect_left, insort
+from collections import deque
+from collections.abc import Mapping
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import numpy as np
 import pandas as pd
 
 from advanced_analysis import BitcoinBasisAnalyzer
 
+if TYPE_CHECKING:
+    from collect_market_structure import MetadataHistory
+
 PERPETUAL_CONTRACT_TYPES = {"PERPETUAL", "PERPETUAL_DELIVERING"}
 DELIVERY_CONTRACT_TYPES = {
     "CURRENT_MONTH",
@@ -143,8 +149,10 @@ class ContractAwareBitcoinBasisAnalyzer(BitcoinBasisAnalyzer):
         futures_df: pd.DataFrame,
         *,
         interval: str,
+        metadata_history: MetadataHistory | None = None,
     ) -> None:
         self.interval = interval
+        self.metadata_history = metadata_history
         self.contract_metadata = contract_metadata_from_frame(futures_df)
         super().__init__(spot_df, futures_df)
         self._attach_contract_and_funding_evidence(futures_df)
@@ -152,7 +160,13 @@ class ContractAwareBitcoinBasisAnalyzer(BitcoinBasisAnalyzer):
     def _attach_contract_and_funding_evidence(self, futures_df: pd.DataFrame) -> None:
         metadata = self.contract_metadata
         self.basis_df["contract_symbol"] = metadata.symbol
-        self.basis_df["contract_type"] = metadata.contract_type
+        if self.metadata_history is not None:
+            observed_ms = observation_times_utc(self.basis_df.index).as_unit("ms").asi8
+            self.basis_df["contract_type"] = self.metadata_history.contract_types(
+                metadata.symbol, observed_ms, metadata.contract_type
+            )
+        else:
+            self.basis_df["contract_type"] = metadata.contract_type
         self.basis_df["contract_status"] = metadata.status
         self.basis_df["delivery_datetime"] = metadata.delivery_datetime
         self.basis_df["annualization_day_count"] = 365.0
@@ -234,3 +248,315 @@ class ContractAwareBitcoinBasisAnalyzer(BitcoinBasisAnalyzer):
             self.basis_df["basis_percent"] / self.basis_df["spot_volatility"]
         )
         return self.basis_df["vol_adjusted_basis"]
+
+    def calculate_rolling_features(
+        self,
+        zscore_window: int = 30,
+        momentum_window: int = 14,
+        vol_window: int = 30,
+        windows: tuple[int, ...] = (),
+    ) -> pd.DataFrame:
+        annualization_factor = periods_per_year(self.interval)
+        self.basis_df["volatility_periods_per_year"] = annualization_factor
+        return super().calculate_rolling_features(
+            zscore_window, momentum_window, vol_window, windows, annualization_factor
+        )
+
+
+class _RollingWindow:
+    """Last ``size`` values with running sums; the newest value can be revised in O(1).
+
+    Non-finite values occupy a slot and make the window incomplete, like a missing
+    value in ``Series.rolling(size)``. Sums are rebuilt from the window every
+    ``size`` pushes so floating-point drift cannot accumulate.
+    """
+
+    def __init__(self, size: int) -> None:
+        if size < 2:
+            raise ValueError(f"Rolling window must be at least 2: {size}")
+        self.size = size
+        self.values: deque[float] = deque()
+        self.total = self.total_sq = 0.0
+        self.missing = 0
+        self.run = 0
+        self._undo: tuple[float | None, int] | None = None
+        self._pushes = 0
+
+    def _add(self, value: float, sign: int) -> None:
+        if math.isfinite(value):
+            self.total += sign * value
+            self.total_sq += sign * value * value
+        else:
+            self.missing += sign
+
+    def push(self, value: float) -> None:
+        evicted = self.values.popleft() if len(self.values) == self.size else None
+        if evicted is not None:
+            self._add(evicted, -1)
+        self._undo = evicted, self.run
+        self.run = self.run + 1 if self.values and value == self.values[-1] else 1
+        self.values.append(value)
+        self._add(value, 1)
+        self._pushes += 1
+        if self._pushes % self.size == 0:
+            finite = [item for item in self.values if math.isfinite(item)]
+            self.total, self.total_sq = math.fsum(finite), math.fsum(item * item for item in finite)
+
+    def revise(self, value: float) -> None:
+        """Replace the newest value, as if it had been pushed instead."""
+        if self._undo is None:
+            raise ValueError("No value to revise")
+        evicted, self.run = self._undo
+        self._add(self.values.pop(), -1)
+        if evicted is not None:
+            self.values.appendleft(evicted)
+            self._add(evicted, 1)
+        self.push(value)
+
+    @property
+    def complete(self) -> bool:
+        return len(self.values) == self.size and not self.missing
+
+    def sum(self) -> float:
+        return self.total if self.complete else math.nan
+
+    def mean(self) -> float:
+        return self.total / self.size if self.complete else math.nan
+
+    def std(self) -> float:
+        if not self.complete:
+            return math.nan
+        if self.run >= self.size:
+            return 0.0
+        variance = (self.total_sq - self.total * self.total / self.size) / (self.size - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class _SortedWindow:
+    """Last ``size`` finite values kept sorted for percentile lookups; non-finite values are skipped."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.values: deque[float] = deque()
+        self.ordered: list[float] = []
+        self._undo: tuple[bool, float | None] | None = None
+
+    def push(self, value: float) -> None:
+        if not math.isfinite(value):
+            self._undo = False, None
+            return
+        evicted = self.values.popleft() if len(self.values) == self.size else None
+        if evicted is not None:
+            del self.ordered[bisect_left(self.ordered, evicted)]
+        self.values.append(value)
+        insort(self.ordered, value)
+        self._undo = True, evicted
+
+    def revise(self, value: float) -> None:
+        if self._undo is None:
+            raise ValueError("No value to revise")
+        pushed, evicted = self._undo
+        if pushed:
+            del self.ordered[bisect_left(self.ordered, self.values.pop())]
+            if evicted is not None:
+                self.values.appendleft(evicted)
+                insort(self.ordered, evicted)
+        self.push(value)
+
+    def percentile(self, q: float) -> float:
+        """``np.percentile`` with linear interpolation over the window."""
+        position = (len(self.ordered) - 1) * q / 100
+        low = math.floor(position)
+        high = min(low + 1, len(self.ordered) - 1)
+        return self.ordered[low] + (self.ordered[high] - self.ordered[low]) * (position - low)
+
+
+def _bar_time(bar: Any) -> pd.Timestamp:
+    if isinstance(bar, Mapping) and "open_time" in bar:
+        value = bar["open_time"]
+    else:
+        value = getattr(bar, "name", None)
+    if value is None:
+        raise ValueError("Bar needs an open_time field or a timestamp name")
+    if isinstance(value, (int, np.integer)):
+        return pd.Timestamp(int(value), unit="ms", tz="UTC")
+    value = pd.Timestamp(value)
+    return value.tz_localize("UTC") if value.tz is None else value.tz_convert("UTC")
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    """Division with NumPy semantics: x/0 is +-inf and 0/0 is NaN."""
+    if denominator != 0:
+        return numerator / denominator
+    return math.nan if numerator == 0 or math.isnan(numerator) else math.copysign(math.inf, numerator)
+
+
+class StreamingBasisAnalyzer:
+    """Incremental counterpart of ``ContractAwareBitcoinBasisAnalyzer`` for live polling.
+
+    ``update`` takes the newest spot/futures bar (and optionally a funding event)
+    and returns that bar's row with O(window) state and no history recomputation.
+    Repeating the latest open time revises the still-open bar instead of adding
+    one. Z-score, momentum and volatility match the batch rolling columns; the
+    regime thresholds are the 33rd/67th percentiles of the trailing
+    ``regime_window`` bars rather than of the whole history.
+    """
+
+    def __init__(
+        self,
+        contract_metadata: ContractMetadata,
+        *,
+        interval: str,
+        zscore_window: int = 30,
+        momentum_window: int = 14,
+        vol_window: int = 30,
+        regime_window: int = 720,
+        zscore_threshold: float = 2.0,
+        funding_interval_hours: float | None = None,
+    ) -> None:
+        if not contract_metadata.is_perpetual and (
+            not contract_metadata.is_delivery or contract_metadata.delivery_datetime is None
+        ):
+            raise ValueError(
+                "Delivery contracts require a supported contract type and delivery datetime"
+            )
+        self.contract_metadata = contract_metadata
+        self.interval = interval
+        self.volatility_periods_per_year = periods_per_year(interval)
+        self.zscore_threshold = zscore_threshold
+        self.funding_interval_hours = funding_interval_hours
+        self._basis = _RollingWindow(zscore_window)
+        self._momentum = _RollingWindow(momentum_window)
+        self._returns = _RollingWindow(vol_window)
+        self._regime = _SortedWindow(regime_window)
+        self._last: tuple[pd.Timestamp, float, float] | None = None
+        self._previous: tuple[float, float] | None = None
+        self._funding_rate = math.nan
+        self._funding_times: list[pd.Timestamp] = []
+        self.last_row: dict[str, Any] | None = None
+
+    @classmethod
+    def from_frames(
+        cls, spot_df: pd.DataFrame, futures_df: pd.DataFrame, *, interval: str, **options: Any
+    ) -> StreamingBasisAnalyzer:
+        """Warm up from the same frames the batch analyzer takes, replaying their common bars."""
+        analyzer = cls(contract_metadata_from_frame(futures_df), interval=interval, **options)
+        index = spot_df.index.intersection(futures_df.index).sort_values()
+        has_funding = "funding_rate" in futures_df
+        for time, spot, futures, funding_rate, funding_time in zip(
+            index,
+            spot_df.loc[index, "close"].to_numpy(dtype=float),
+            futures_df.loc[index, "close"].to_numpy(dtype=float),
+            futures_df.loc[index, "funding_rate"] if has_funding else [None] * len(index),
+            futures_df.loc[index, "funding_time"] if "funding_time" in futures_df else [None] * len(index),
+        ):
+            event = None
+            if has_funding and pd.notna(funding_rate):
+                event = {"funding_rate": funding_rate, "funding_time": funding_time}
+            analyzer.update({"open_time": time, "close": spot}, {"open_time": time, "close": futures}, event)
+        return analyzer
+
+    def _apply_funding(self, event: Mapping[str, Any]) -> None:
+        rate = event.get("funding_rate")
+        self._funding_rate = math.nan if rate is None else float(rate)
+        if event.get("funding_time") is None or pd.isna(event.get("funding_time")):
+            return
+        funding_time = pd.to_datetime(event["funding_time"], utc=True)
+        if not self._funding_times or funding_time > self._funding_times[-1]:
+            self._funding_times = [*self._funding_times[-1:], funding_time]
+
+    def _funding_interval_hours(self) -> float:
+        if self.funding_interval_hours is not None:
+            return self.funding_interval_hours
+        if len(self._funding_times) == 2:
+            return (self._funding_times[1] - self._funding_times[0]).total_seconds() / 3600
+        return math.nan
+
+    def update(
+        self,
+        spot_bar: Mapping[str, Any] | pd.Series,
+        futures_bar: Mapping[str, Any] | pd.Series,
+        funding_event: Mapping[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        time = _bar_time(spot_bar)
+        if _bar_time(futures_bar) != time:
+            raise ValueError("Spot and futures bars must share the same open time")
+        if self._last is not None and time < self._last[0]:
+            raise ValueError(f"Bar at {time} is older than the latest bar {self._last[0]}")
+        revise = self._last is not None and time == self._last[0]
+        if not revise:
+            self._previous = self._last[1:] if self._last is not None else None
+        if funding_event is not None:
+            self._apply_funding(funding_event)
+
+        spot_price = float(spot_bar["close"])
+        futures_price = float(futures_bar["close"])
+        basis = futures_price - spot_price
+        basis_percent = basis / spot_price * 100
+        previous_spot, previous_basis = self._previous or (math.nan, math.nan)
+        change = basis_percent / previous_basis - 1 if previous_basis else math.nan
+        spot_return = spot_price / previous_spot - 1 if previous_spot else math.nan
+        for window, value in (
+            (self._basis, basis_percent),
+            (self._momentum, change),
+            (self._returns, spot_return),
+            (self._regime, basis_percent),
+        ):
+            window.revise(value) if revise else window.push(value)
+        self._last = time, spot_price, basis_percent
+
+        metadata = self.contract_metadata
+        raw_premium = futures_price / spot_price - 1
+        if metadata.is_perpetual:
+            days_to_maturity = annualized_basis = math.nan
+            perpetual_premium_pct = raw_premium * 100
+            method = "not_applicable_perpetual"
+        else:
+            days_to_maturity = (metadata.delivery_datetime - time).total_seconds() / 86_400
+            if days_to_maturity <= 0:
+                raise ValueError("Cannot annualize observations at or after contract delivery")
+            annualized_basis = raw_premium * (365 / days_to_maturity) * 100
+            perpetual_premium_pct = math.nan
+            method = "simple_actual_dte_365"
+
+        funding_interval_hours = self._funding_interval_hours()
+        funding_annualized = (
+            self._funding_rate * 365 * 24 / funding_interval_hours * 100
+            if funding_interval_hours > 0
+            else math.nan
+        )
+        std = self._basis.std()
+        # A window with zero spread holds only the current value, so its z-score is 0/0.
+        zscore = (basis_percent - self._basis.mean()) / std if std else math.nan
+        spot_volatility = self._returns.std() * math.sqrt(self.volatility_periods_per_year)
+        regime = 1
+        if len(self._regime.ordered) >= 3:
+            if basis_percent < self._regime.percentile(33):
+                regime = 0
+            elif basis_percent > self._regime.percentile(67):
+                regime = 2
+        signal = -1 if zscore > self.zscore_threshold else 1 if zscore < -self.zscore_threshold else 0
+
+        self.last_row = {
+            "time": time,
+            "contract_symbol": metadata.symbol,
+            "contract_type": metadata.contract_type,
+            "spot_price": spot_price,
+            "futures_price": futures_price,
+            "basis": basis,
+            "basis_percent": basis_percent,
+            "perpetual_premium_pct": perpetual_premium_pct,
+            "days_to_maturity": days_to_maturity,
+            "annualized_basis": annualized_basis,
+            "annualization_method": method,
+            "funding_rate": self._funding_rate,
+            "funding_interval_hours": funding_interval_hours,
+            "funding_annualized_simple_pct": funding_annualized,
+            "basis_zscore": zscore,
+            "basis_momentum": self._momentum.sum(),
+            "spot_volatility": spot_volatility,
+            "vol_adjusted_basis": _ratio(basis_percent, spot_volatility),
+            "market_regime": regime,
+            "signal": signal,
+        }
+        return self.last_row
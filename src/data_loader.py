@@ -6,12 +6,63 @@ from typing import Any
 import pandas as pd
 from binance.client import Client
 
-from config import create_output_directories
+from config import KLINE_CACHE_DIR, create_output_directories
+from kline_cache import INTERVAL_MS, KlineCache
+from paging import PAGE_LIMIT, PAGE_WEIGHT, RateBudget, fetch_pages, page_windows
 from utils import save_data
 
 api_key = os.getenv("BINANCE_API_KEY")
 api_secret = os.getenv("BINANCE_API_SECRET")
 client = Client(api_key, api_secret)
+kline_cache = KlineCache(KLINE_CACHE_DIR)
+FUNDING_PAGE_MS = (PAGE_LIMIT - 1) * 3_600_000
+
+
+def to_ms(value: Any) -> int:
+    stamp = pd.Timestamp(value)
+    stamp = stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp.tz_convert("UTC")
+    return int(stamp.timestamp() * 1000)
+
+
+def fetch_klines_range(
+    market: str,
+    symbol: str,
+    interval: str,
+    start: Any,
+    end: Any,
+    *,
+    max_workers: int = 4,
+    budget: RateBudget | None = None,
+    cache: KlineCache | None = kline_cache,
+) -> pd.DataFrame:
+    """All klines with open time in [start, end] for market "spot" or "futures", as one contiguous frame.
+
+    Closed bars are read through `cache`, so only ranges never fetched before hit the API.
+    """
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Unsupported kline interval: {interval}")
+    request = client.get_klines if market == "spot" else client.futures_klines
+    step = INTERVAL_MS[interval]
+
+    def fetch_range(lo: int, hi: int) -> list[Any]:
+        return fetch_pages(
+            lambda a, b: request(symbol=symbol, interval=interval, startTime=a, endTime=b, limit=PAGE_LIMIT),
+            page_windows(lo, hi, (PAGE_LIMIT - 1) * step),
+            lambda row: int(row[0]),
+            weight=PAGE_WEIGHT[market],
+            max_workers=max_workers,
+            budget=budget,
+        )
+
+    lo, hi = to_ms(start), to_ms(end)
+    rows = cache.get(market, symbol, interval, lo, hi, step, fetch_range) if cache else fetch_range(lo, hi)
+    frame = _klines_to_frame(rows)
+    if interval not in {"3d", "1w"} and len(frame) > 1:
+        gaps = frame.index.to_series().diff().dropna()
+        missing = int((gaps > pd.Timedelta(milliseconds=step)).sum())
+        if missing:
+            print(f"Warning: {market} {symbol} {interval} klines have {missing} gap(s) in the exchange history.")
+    return frame
 
 
 def _klines_to_frame(rows: list[list[Any]]) -> pd.DataFrame:
@@ -70,12 +121,21 @@ def fetch_contract_metadata(symbol: str) -> dict[str, Any]:
     }
 
 
-def fetch_funding_history(symbol: str, start_time: pd.Timestamp, end_time: pd.Timestamp) -> pd.DataFrame:
-    rows = client.futures_funding_rate(
-        symbol=symbol,
-        startTime=int(pd.Timestamp(start_time, tz="UTC").timestamp() * 1000),
-        endTime=int(pd.Timestamp(end_time, tz="UTC").timestamp() * 1000),
-        limit=1000,
+def fetch_funding_history(
+    symbol: str,
+    start_time: pd.Timestamp,
+    end_time: pd.Timestamp,
+    *,
+    max_workers: int = 4,
+    budget: RateBudget | None = None,
+) -> pd.DataFrame:
+    rows = fetch_pages(
+        lambda lo, hi: client.futures_funding_rate(symbol=symbol, startTime=lo, endTime=hi, limit=PAGE_LIMIT),
+        page_windows(to_ms(start_time), to_ms(end_time), FUNDING_PAGE_MS),
+        lambda row: int(row["fundingTime"]),
+        weight=PAGE_WEIGHT["funding"],
+        max_workers=max_workers,
+        budget=budget,
     )
     if not rows:
         return pd.DataFrame(columns=["funding_time", "funding_rate", "funding_mark_price"])
@@ -91,6 +151,9 @@ def fetch_funding_history(symbol: str, start_time: pd.Timestamp, end_time: pd.Ti
 def attach_contract_evidence(
     futures_df: pd.DataFrame,
     metadata: dict[str, Any],
+    *,
+    max_workers: int = 4,
+    budget: RateBudget | None = None,
 ) -> pd.DataFrame:
     frame = futures_df.copy()
     frame.attrs["contract_metadata"] = dict(metadata)
@@ -106,6 +169,8 @@ def attach_contract_evidence(
             metadata["symbol"],
             frame.index.min(),
             frame["close_time"].max(),
+            max_workers=max_workers,
+            budget=budget,
         )
         if not funding.empty:
             left = frame.reset_index().sort_values("open_time")
@@ -129,27 +194,37 @@ def attach_contract_evidence(
     return frame
 
 
-def fetch_and_save_data(symbol: str, interval: str, limit: int = 1000):
+def fetch_and_save_data(
+    symbol: str,
+    interval: str,
+    limit: int = 1000,
+    start: Any = None,
+    end: Any = None,
+    max_workers: int = 4,
+    budget: RateBudget | None = None,
+    metadata: dict[str, Any] | None = None,
+):
+    """Fetch spot/futures klines in [start, end] page by page; without start, the last `limit` bars.
+
+    Callers running several intervals pass one shared `budget` and the symbol's `metadata` so neither is rebuilt.
+    """
     create_output_directories()
     try:
         normalized_symbol = symbol.upper()
-        spot_klines = client.get_klines(
-            symbol=normalized_symbol,
-            interval=interval,
-            limit=limit,
-        )
-        spot_df = _klines_to_frame(spot_klines)
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Unsupported kline interval: {interval}")
+        end = pd.Timestamp.now(tz="UTC") if end is None else end
+        start = pd.Timestamp(to_ms(end) - limit * INTERVAL_MS[interval], unit="ms", tz="UTC") if start is None else start
+        budget = RateBudget() if budget is None else budget
+        spot_df = fetch_klines_range("spot", normalized_symbol, interval, start, end, max_workers=max_workers, budget=budget)
         save_data(spot_df, "raw", f"{normalized_symbol.lower()}_spot_prices_{interval}")
 
-        metadata = fetch_contract_metadata(normalized_symbol)
-        futures_klines = client.futures_klines(
-            symbol=normalized_symbol,
-            interval=interval,
-            limit=limit,
-        )
+        metadata = fetch_contract_metadata(normalized_symbol) if metadata is None else metadata
         futures_df = attach_contract_evidence(
-            _klines_to_frame(futures_klines),
+            fetch_klines_range("futures", normalized_symbol, interval, start, end, max_workers=max_workers, budget=budget),
             metadata,
+            max_workers=max_workers,
+            budget=budget,
         )
         save_data(futures_df, "raw", f"{normalized_symbol.lower()}_futures_prices_{interval}")
         save_data(
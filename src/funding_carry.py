@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Rolling realized funding carry derived from a funding.json view, updated incrementally."""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from collect_market_structure import DAY_MS, OUTPUT_MODES, dump
+
+WINDOWS_DAYS = (1, 7, 30)
+
+
+def premium_by_date(daily: list[dict[str, Any]]) -> dict[str, float]:
+    """Perpetual mark-index premium of each closed daily bar."""
+    return {row["date"]: row["mark_index_premium_pct"] for row in daily
+            if row["contract_type"] == "PERPETUAL" and row.get("mark_index_premium_pct") is not None}
+
+
+def carry_columns(times: np.ndarray, rates: np.ndarray, at: np.ndarray) -> dict[str, np.ndarray]:
+    """Window sums over (t - window, t] for the events at positions `at`, from one cumulative sum per measure.
+
+    Compounded carry accumulates log1p(rate); windows that start before the first event (plus one funding
+    interval) are incomplete and come out as NaN.
+    """
+    simple = np.concatenate([[0.0], np.cumsum(rates)])
+    growth = np.concatenate([[0.0], np.cumsum(np.log1p(rates))])
+    interval = float(np.median(np.diff(times))) if len(times) > 1 else 0.0
+    out: dict[str, np.ndarray] = {}
+    for days in WINDOWS_DAYS:
+        start = times[at] - days * DAY_MS
+        lo, hi = np.searchsorted(times, start, "right"), at + 1
+        complete = start + interval >= times[0]
+        realized = np.where(complete, simple[hi] - simple[lo], np.nan)
+        out[f"event_count_{days}d"] = hi - lo
+        out[f"realized_{days}d_pct"] = realized * 100
+        out[f"simple_annualized_{days}d_pct"] = realized * 365 / days * 100
+        out[f"compounded_annualized_{days}d_pct"] = np.expm1(np.where(complete, growth[hi] - growth[lo], np.nan) * 365 / days) * 100
+    return out
+
+
+def carry_rows(events: list[dict[str, Any]], premium: dict[str, float], start: int = 0) -> list[dict[str, Any]]:
+    """Carry rows for events[start:]; earlier events only feed the trailing windows."""
+    if start >= len(events):
+        return []
+    times = np.array([event["funding_time_ms"] for event in events], dtype=np.int64)
+    rates = np.array([event["funding_rate"] for event in events], dtype=np.float64)
+    at = np.arange(start, len(events))
+    columns = {key: value.tolist() for key, value in carry_columns(times, rates, at).items()}
+    dates = np.datetime_as_string(times[at].astype("datetime64[ms]").astype("datetime64[D]")).tolist()
+    out = []
+    for n, date in enumerate(dates):
+        event = events[start + n]
+        gap = premium.get(date)
+        row = {"symbol": event["symbol"], "funding_time": event["funding_time"], "funding_time_ms": event["funding_time_ms"],
+               "funding_rate": event["funding_rate"], "mark_index_premium_pct": gap,
+               "funding_premium_divergence_pct": event["funding_rate"] * 100 - gap if gap is not None else None}
+        row.update({key: None if isinstance(values[n], float) and np.isnan(values[n]) else values[n]
+                    for key, values in columns.items()})
+        out.append(row)
+    return out
+
+
+def reusable(previous: dict[str, Any] | None, events: list[dict[str, Any]], premium: dict[str, float]) -> int:
+    """Number of previous rows still valid: their events must be an unchanged prefix, and their stored premium must
+    equal the current one, so rows written before their day closed (or while it was still being revised) are
+    recomputed."""
+    rows = (previous or {}).get("records", [])
+    if len(rows) > len(events) or any((row["funding_time_ms"], row["funding_rate"]) != (event["funding_time_ms"], event["funding_rate"])
+                                      for row, event in zip(rows, events)):
+        return 0
+    pending = [n for n, row in enumerate(rows) if row["mark_index_premium_pct"] != premium.get(row["funding_time"][:10])]
+    return pending[0] if pending else len(rows)
+
+
+def update(api_dir: Path, mode: str = "pretty") -> dict[str, Any]:
+    """Append carry rows for new funding events to funding-carry.json, recomputing nothing already final."""
+    events = json.loads((api_dir / "funding.json").read_text())["events"]
+    premium = premium_by_date(json.loads((api_dir / "daily.json").read_text())["records"])
+    path = api_dir / "funding-carry.json"
+    previous = json.loads(path.read_text()) if path.exists() else None
+    kept = reusable(previous, events, premium)
+    records = (previous["records"][:kept] if kept else []) + carry_rows(events, premium, kept)
+    latest = records[-1] if records else {}
+    view = {
+        "schema_version": 1, "windows_days": list(WINDOWS_DAYS), "records": records,
+        "latest": {key: latest.get(key) for key in ("funding_time", *(f"{kind}_{days}d_pct" for days in WINDOWS_DAYS
+                                                                       for kind in ("simple_annualized", "compounded_annualized")))},
+        "rules": ["realized_Nd_pct sums funding rates of events in (t - N days, t].",
+                  "simple annualizes the window sum by 365/N; compounded annualizes prod(1 + rate) by 365/N.",
+                  "windows reaching before the first funding event are null.",
+                  "mark_index_premium_pct is the perpetual's daily-close premium on the event's UTC date."],
+    }
+    path.write_bytes(dump(view, mode))
+    return {"funding_carry_count": len(records), "recomputed_count": len(records) - kept}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api-dir", type=Path, default=Path("api/v1/bitcoin-derivatives"))
+    parser.add_argument("--format", choices=OUTPUT_MODES, default="pretty")
+    args = parser.parse_args()
+    print(json.dumps(update(args.api_dir, args.format), sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
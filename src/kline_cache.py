@@ -0,0 +1,106 @@
+"""On-disk cache of closed klines per (market, symbol, interval) that only fetches ranges it has not seen."""
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+
+KLINE_COLUMNS = [
+    "open_time", "open", "high", "low", "close", "volume", "close_time", "quote_asset_volume",
+    "number_of_trades", "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume", "ignore",
+]
+INT_COLUMNS = {"open_time", "close_time", "number_of_trades"}
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000, "8h": 28_800_000, "12h": 43_200_000,
+    "1d": 86_400_000, "3d": 259_200_000, "1w": 604_800_000,
+}
+
+
+def merge_ranges(ranges: list[list[int]]) -> list[list[int]]:
+    merged: list[list[int]] = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+def missing_ranges(covered: list[list[int]], lo: int, hi: int) -> list[tuple[int, int]]:
+    """Parts of [lo, hi] not inside any covered [a, b] range."""
+    gaps, cursor = [], lo
+    for a, b in merge_ranges(covered):
+        if b < cursor or a > hi:
+            continue
+        if a > cursor:
+            gaps.append((cursor, a - 1))
+        cursor = max(cursor, b + 1)
+    if cursor <= hi:
+        gaps.append((cursor, hi))
+    return gaps
+
+
+class KlineCache:
+    """Parquet of raw kline rows plus the open-time ranges already fetched, one pair of files per series.
+
+    Only bars that have closed (open_time <= now - interval) are cached; the open bar is fetched on every call.
+    """
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+
+    def paths(self, market: str, symbol: str, interval: str) -> tuple[Path, Path]:
+        folder = self.root / market / symbol.upper()
+        return folder / f"{interval}.parquet", folder / f"{interval}.coverage.json"
+
+    def load(self, market: str, symbol: str, interval: str) -> tuple[pd.DataFrame, list[list[int]]]:
+        rows_path, coverage_path = self.paths(market, symbol, interval)
+        if not rows_path.exists() or not coverage_path.exists():
+            return pd.DataFrame(columns=KLINE_COLUMNS), []
+        return pd.read_parquet(rows_path), json.loads(coverage_path.read_text())["ranges"]
+
+    def save(self, market: str, symbol: str, interval: str, frame: pd.DataFrame, covered: list[list[int]]) -> None:
+        rows_path, coverage_path = self.paths(market, symbol, interval)
+        rows_path.parent.mkdir(parents=True, exist_ok=True)
+        frame.to_parquet(rows_path, index=False)
+        coverage_path.write_text(json.dumps({"ranges": covered}) + "\n")
+
+    def get(
+        self,
+        market: str,
+        symbol: str,
+        interval: str,
+        start_ms: int,
+        end_ms: int,
+        interval_ms: int,
+        fetch_range: Callable[[int, int], list[list[Any]]],
+        now_ms: int | None = None,
+    ) -> list[list[Any]]:
+        """Raw kline rows with open_time in [start_ms, end_ms]; fetch_range(lo, hi) is called only for gaps."""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        # Snap to the bar grid so runs within the same bar find no new gap to fetch.
+        settled = min(end_ms, (now_ms - interval_ms) // interval_ms * interval_ms)
+        cached, covered = self.load(market, symbol, interval)
+        fetched = []
+        gaps = missing_ranges(covered, start_ms, settled) if start_ms <= settled else []
+        for lo, hi in gaps:
+            fetched += fetch_range(lo, hi)
+        if gaps:
+            new = pd.DataFrame(fetched, columns=KLINE_COLUMNS).astype({name: "int64" for name in INT_COLUMNS})
+            new = new[new["close_time"] < now_ms].astype({name: str for name in KLINE_COLUMNS if name not in INT_COLUMNS})
+            frames = [frame for frame in (cached, new) if not frame.empty]
+            cached = pd.concat(frames, ignore_index=True) if frames else new
+            cached = cached.drop_duplicates("open_time", keep="last").sort_values("open_time", ignore_index=True)
+            covered = merge_ranges(covered + [[lo, hi] for lo, hi in gaps])
+            self.save(market, symbol, interval, cached, covered)
+        window = cached[(cached["open_time"] >= start_ms) & (cached["open_time"] <= end_ms)]
+        rows = [[int(value) if name in INT_COLUMNS else value for name, value in zip(KLINE_COLUMNS, row)]
+                for row in window.itertuples(index=False, name=None)]
+        if end_ms > settled:
+            latest = max(start_ms, settled + 1)
+            rows += [row for row in fetch_range(latest, end_ms) if int(row[0]) > (rows[-1][0] if rows else -1)]
+        return rows
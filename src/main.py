@@ -1,68 +1,114 @@
+import argparse
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import pandas as pd
 from binance.client import Client
-from data_loader import fetch_and_save_data
+from data_loader import RateBudget, fetch_and_save_data, fetch_contract_metadata
 # Import the new advanced analysis function
-from analysis import run_advanced_analysis
+from analysis import analysis_task, init_worker
 # Keep plot import, but comment out the call for now
 # from plot import plot_and_save_data
-from config import create_output_directories
+from config import DERIVATIVES_DATA_DIR, create_output_directories
+from collect_market_structure import MetadataHistory, pair_root
 import datetime
+import pathlib
 # Import the report generator function (ensure correct filename)
 from reportgenerator import generate_html_report # Corrected import path
 import webbrowser
 
-def run_pipeline(interval):
-    """指定された時間間隔でデータ取得から高度な分析までを実行するパイプライン"""
-    interval_str = interval.replace('m', 'min').replace('h', 'hour').replace('d', 'day').replace('w', 'week')
-    print(f"\n===== Pipeline Start: Interval {interval_str} =====")
+DEFAULT_SYMBOLS = ("BTCUSDT",)
+DEFAULT_INTERVALS = (Client.KLINE_INTERVAL_1HOUR, Client.KLINE_INTERVAL_1DAY)
 
-    # 1. データ取得と保存
-    print(f"--- Step 1: Fetching and Saving Data ---")
-    spot_df, futures_df = fetch_and_save_data(symbol='BTCUSDT', interval=interval)
+def contract_metadata(symbol):
+    """symbolのcontract metadata (取得失敗時はNoneを返し、そのsymbolのtaskをskipする)"""
+    try:
+        return fetch_contract_metadata(symbol)
+    except Exception as e:
+        print(f"Skipped {symbol}: Failed to fetch contract metadata: {e}")
+        return None
 
-    if spot_df is None or spot_df.empty or futures_df is None or futures_df.empty:
-        print("Pipeline stopped: Failed to fetch or data is empty.")
-        print(f"===== Pipeline End: Interval {interval_str} =====")
-        return
+def load_metadata_history(symbol, data_dir=DERIVATIVES_DATA_DIR):
+    """symbol自身の収集済みcontract metadata履歴 (四半期rollを跨ぐbarのcontract type付与に使用、未収集ならNone)"""
+    history = MetadataHistory(pair_root(pathlib.Path(data_dir), symbol))
+    return history if len(history) else None
 
-    print(f"Spot data rows: {len(spot_df)}")
-    print(f"Futures data rows: {len(futures_df)}")
+def run_matrix(symbols, intervals, data_dir=DERIVATIVES_DATA_DIR, fetch_workers=4, analysis_workers=None):
+    """symbols × intervals のパイプラインをまとめて実行し、stage別の所要時間を返す
 
-    # 2. 高度なベーシス分析の実行
-    print(f"\n--- Step 2: Running Advanced Analysis ---")
-    # Replace old calls with the new function
-    stats, analyzed_df = run_advanced_analysis(spot_df, futures_df, interval)
+    取得 (I/O) はthread poolで並列化し、rate budgetとsymbol毎のcontract metadata・metadata履歴を全taskで共有する。
+    取得が終わったtaskから順に、分析・保存・プロット (CPU) をprocess poolへ投入する。
+    """
+    tasks = list(dict.fromkeys((symbol.upper(), interval) for symbol in symbols for interval in intervals))
+    budget = RateBudget()
+    timings = []
+    started = time.perf_counter()
 
-    if stats is None or analyzed_df is None or analyzed_df.empty:
-        print("Pipeline stopped: Advanced analysis failed or resulted in empty data.")
-        print(f"===== Pipeline End: Interval {interval_str} =====")
-        return
+    with ThreadPoolExecutor(max_workers=fetch_workers) as io_pool:
+        clock = time.perf_counter()
+        symbols = list(dict.fromkeys(symbol for symbol, _ in tasks))
+        metadata = dict(zip(symbols, io_pool.map(contract_metadata, symbols)))
+        tasks = [task for task in tasks if metadata[task[0]] is not None]
+        histories = {symbol: load_metadata_history(symbol, data_dir) for symbol in symbols}
+        timings.append({"symbol": "*", "interval": "*", "stage": "metadata", "seconds": time.perf_counter() - clock})
 
-    print(f"Advanced analysis complete. Analyzed data rows: {len(analyzed_df)}")
-    if not stats.empty:
-        print(f"Basic Statistics Summary:\n{stats.head()}") # Print head of stats
+        def fetch(task):
+            symbol, interval = task
+            clock = time.perf_counter()
+            spot_df, futures_df = fetch_and_save_data(symbol, interval, budget=budget, metadata=metadata[symbol])
+            return task, spot_df, futures_df, time.perf_counter() - clock
 
-    # 3. プロット (一時的にコメントアウト)
-    # print(f"\n--- Step 3: Plotting Data (Skipped) ---")
-    # plot_and_save_data(interval=interval)
+        with ProcessPoolExecutor(max_workers=analysis_workers, initializer=init_worker) as cpu_pool:
+            pending = []
+            for done in as_completed([io_pool.submit(fetch, task) for task in tasks]):
+                (symbol, interval), spot_df, futures_df, seconds = done.result()
+                timings.append({"symbol": symbol, "interval": interval, "stage": "fetch", "seconds": seconds})
+                if spot_df is None or spot_df.empty or futures_df is None or futures_df.empty:
+                    print(f"Skipped {symbol} {interval}: Failed to fetch or data is empty.")
+                    continue
+                print(f"Fetched {symbol} {interval}: spot {len(spot_df)} rows, futures {len(futures_df)} rows")
+                pending.append(cpu_pool.submit(analysis_task, symbol, interval, spot_df, futures_df, histories[symbol]))
+            for done in as_completed(pending):
+                result = done.result()
+                print(f"Analyzed {result['symbol']} {result['interval']}: {result['rows']} rows" if result["ok"]
+                      else f"Analysis failed for {result['symbol']} {result['interval']}")
+                timings.extend({"symbol": result["symbol"], "interval": result["interval"], "stage": stage, "seconds": seconds}
+                               for stage, seconds in result["timings"].items())
 
-    print(f"===== Pipeline End: Interval {interval_str} =====")
+    timings.append({"symbol": "*", "interval": "*", "stage": "wall", "seconds": time.perf_counter() - started})
+    return pd.DataFrame(timings, columns=["symbol", "interval", "stage", "seconds"])
 
-def main():
-    """メイン処理: 各時間間隔でパイプラインを実行し、レポートを生成"""
+def format_timings(timings):
+    """task毎・stage毎の所要時間 (秒) の表"""
+    table = timings.pivot_table(index=["symbol", "interval"], columns="stage", values="seconds", aggfunc="sum", sort=False)
+    stages = [stage for stage in ("metadata", "fetch", "analyze", "save", "plot", "report", "wall") if stage in table.columns]
+    return table[stages].round(2).to_string(na_rep="-")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="symbols × intervals のベーシス分析パイプライン")
+    parser.add_argument("--symbols", nargs="+", default=list(DEFAULT_SYMBOLS))
+    parser.add_argument("--intervals", nargs="+", default=list(DEFAULT_INTERVALS))
+    parser.add_argument("--fetch-workers", type=int, default=4, help="取得を並列実行するthread数")
+    parser.add_argument("--analysis-workers", type=int, default=None, help="分析・プロットを実行するprocess数 (既定はCPU数)")
+    parser.add_argument("--no-report", action="store_true", help="HTMLレポートを生成しない")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """メイン処理: symbols × intervals でパイプラインを実行し、レポートを生成"""
+    args = parse_args(argv)
     create_output_directories()
 
     print("Starting main process...")
-    # 1時間足データの処理
-    run_pipeline(Client.KLINE_INTERVAL_1HOUR)
-
-    # 日足データの処理
-    run_pipeline(Client.KLINE_INTERVAL_1DAY)
+    timings = run_matrix(args.symbols, args.intervals, DERIVATIVES_DATA_DIR, args.fetch_workers, args.analysis_workers)
 
     print("\n--- All pipeline processes completed ---")
+    if args.no_report:
+        print(f"\n--- Stage timings (seconds) ---\n{format_timings(timings)}")
+        return
 
     # 4. HTMLレポート生成 (現時点では古いデータ構造を期待している可能性あり)
     print("\n--- Step 4: Generating HTML Report ---")
+    clock = time.perf_counter()
     try:
         html_file_path = generate_html_report()
         if html_file_path:
@@ -74,6 +120,8 @@ def main():
             print("HTML report generation failed, cannot open.")
     except Exception as e:
         print(f"Error generating or opening HTML report: {e}")
+    report = pd.DataFrame([{"symbol": "*", "interval": "*", "stage": "report", "seconds": time.perf_counter() - clock}])
+    print(f"\n--- Stage timings (seconds) ---\n{format_timings(pd.concat([timings, report], ignore_index=True))}")
 
 if __name__ == "__main__":
     main()
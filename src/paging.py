@@ -0,0 +1,70 @@
+"""Concurrent, budgeted fetching of time-ranged API pages (klines, funding) with full-page splitting."""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+PAGE_LIMIT = 1000
+# Request weight of one 1000-row page and the per-minute budget kept below Binance's IP limits.
+PAGE_WEIGHT = {"spot": 2, "futures": 10, "funding": 1}
+WEIGHT_BUDGET_PER_MINUTE = 1200
+
+
+class RateBudget:
+    """Shared request-weight budget per rolling minute; workers block until their page fits."""
+
+    def __init__(self, weight_per_minute: int = WEIGHT_BUDGET_PER_MINUTE) -> None:
+        self.weight_per_minute = weight_per_minute
+        self._spent: list[tuple[float, int]] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, weight: int) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._spent = [(at, used) for at, used in self._spent if now - at < 60]
+                if sum(used for _, used in self._spent) + weight <= self.weight_per_minute:
+                    self._spent.append((now, weight))
+                    return
+                wait = 60 - (now - self._spent[0][0])
+            time.sleep(max(wait, 0.01))
+
+
+def page_windows(start_ms: int, end_ms: int, span_ms: int) -> list[tuple[int, int]]:
+    """Closed [start, end] windows of span_ms covering the range without overlap.
+
+    Use a span of (limit - 1) steps so a complete window never fills a page and only a truncated one is split.
+    """
+    return [(lo, min(lo + span_ms, end_ms + 1) - 1) for lo in range(start_ms, end_ms + 1, span_ms)]
+
+
+def fetch_pages(
+    fetch: Callable[[int, int], list[Any]],
+    windows: list[tuple[int, int]],
+    row_time: Callable[[Any], int],
+    *,
+    limit: int = PAGE_LIMIT,
+    weight: int = 1,
+    max_workers: int = 4,
+    budget: RateBudget | None = None,
+) -> list[Any]:
+    """Fetch windows concurrently, split any page that came back full, and return rows deduplicated by time."""
+    budget = budget or RateBudget()
+
+    def fetch_window(window: tuple[int, int]) -> list[Any]:
+        lo, hi = window
+        budget.acquire(weight)
+        rows = fetch(lo, hi)
+        if len(rows) >= limit and row_time(rows[-1]) < hi:
+            if hi - lo < 2:
+                raise RuntimeError(f"page cannot be split further: {lo}-{hi}")
+            middle = (lo + hi) // 2
+            return fetch_window((lo, middle)) + fetch_window((middle + 1, hi))
+        return rows
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        pages = list(pool.map(fetch_window, windows))
+    unique = {row_time(row): row for page in pages for row in page}
+    return [unique[key] for key in sorted(unique)]
@@ -1,38 +1,98 @@
 import os
+import shutil
+from pathlib import Path
+
 import pandas as pd
 import pyarrow
 from config import RAW_OUTPUT_DIR, PROCESSED_OUTPUT_DIR, ANALYSIS_OUTPUT_DIR
 
+OUTPUT_DIRS = {"raw": RAW_OUTPUT_DIR, "processed": PROCESSED_OUTPUT_DIR, "analysis": ANALYSIS_OUTPUT_DIR}
+LATEST_FILE = "_latest.parquet"
+
+
+def dataset_dir(data_type, filename):
+    """時系列storeのdataset directory (<type>/<filename>/date=YYYY-MM-DD/part.parquet)"""
+    if data_type not in OUTPUT_DIRS:
+        raise ValueError(f"Unknown data_type: {data_type}")
+    return Path(OUTPUT_DIRS[data_type]) / filename
+
+
+def write_partitions(df, path):
+    """DatetimeIndexのUTC日付ごとにpartitionを書き、最終行を_latest.parquetに保存する"""
+    path = Path(path)
+    keys = df.index.strftime("%Y-%m-%d")
+    names = set(keys)
+    path.mkdir(parents=True, exist_ok=True)
+    for key, part in df.groupby(keys, sort=True):
+        folder = path / f"date={key}"
+        folder.mkdir(exist_ok=True)
+        part.to_parquet(folder / "part.parquet")
+    for stale in path.glob("date=*"):
+        if stale.name.removeprefix("date=") not in names:
+            shutil.rmtree(stale)
+    df.sort_index().iloc[-1:].to_parquet(path / LATEST_FILE)
+
+
+def read_partitions(path, start=None, end=None, columns=None):
+    """期間外のpartitionは開かずに読み、列はcolumnsだけをmemory-mapで読み込む"""
+    path = Path(path)
+    lo = pd.Timestamp(start).strftime("%Y-%m-%d") if start is not None else None
+    hi = pd.Timestamp(end).strftime("%Y-%m-%d") if end is not None else None
+    parts = []
+    for folder in sorted(path.glob("date=*")):
+        key = folder.name.removeprefix("date=")
+        if (lo is None or key >= lo) and (hi is None or key <= hi):
+            parts.append(pd.read_parquet(folder / "part.parquet", columns=columns, memory_map=True))
+    if not parts:
+        return None
+    df = pd.concat(parts).sort_index()
+    if start is not None or end is not None:
+        df = df.loc[pd.Timestamp(start) if start is not None else None:pd.Timestamp(end) if end is not None else None]
+    return df
+
+
+def read_latest(path, columns=None):
+    """datasetの最終行だけを読む (_latest.parquetが無い単一fileは全体を読んで最終行を返す)"""
+    path = Path(path)
+    if path.is_dir():
+        latest = path / LATEST_FILE
+        if latest.exists():
+            return pd.read_parquet(latest, columns=columns, memory_map=True)
+        folders = sorted(path.glob("date=*"))
+        return pd.read_parquet(folders[-1] / "part.parquet", columns=columns).sort_index().iloc[-1:] if folders else None
+    return pd.read_parquet(path, columns=columns).sort_index().iloc[-1:]
+
+
 def save_data(df, data_type, filename):
-    """データをファイルに保存する関数"""
+    """データをファイルに保存する関数 (DatetimeIndexのdataは日付partitionのstoreへ)"""
     try:
-        if data_type == "raw":
-            filepath = os.path.join(RAW_OUTPUT_DIR, f"{filename}.parquet")
-        elif data_type == "processed":
-            filepath = os.path.join(PROCESSED_OUTPUT_DIR, f"{filename}.parquet")
-        elif data_type == "analysis":
-            filepath = os.path.join(ANALYSIS_OUTPUT_DIR, f"{filename}.parquet")
-        else:
+        if data_type not in OUTPUT_DIRS:
             print(f"Error: Unknown data_type: {data_type}")
             return
-        df.to_parquet(filepath)
+        if isinstance(df.index, pd.DatetimeIndex) and not df.empty:
+            filepath = dataset_dir(data_type, filename)
+            write_partitions(df, filepath)
+        else:
+            filepath = os.path.join(OUTPUT_DIRS[data_type], f"{filename}.parquet")
+            df.to_parquet(filepath)
         print(f"Data successfully saved to {filepath}")
     except Exception as e:
         print(f"Error saving data: {e}")
 
-def load_data(data_type, filename):
-    """ファイルからデータを読み込む関数"""
+def load_data(data_type, filename, start=None, end=None, columns=None):
+    """ファイルからデータを読み込む関数 (start/endで期間、columnsで列を絞り込み)"""
+    filepath = None
     try:
-        if data_type == "raw":
-            filepath = os.path.join(RAW_OUTPUT_DIR, f"{filename}.parquet")
-        elif data_type == "processed":
-            filepath = os.path.join(PROCESSED_OUTPUT_DIR, f"{filename}.parquet")
-        elif data_type == "analysis":
-            filepath = os.path.join(ANALYSIS_OUTPUT_DIR, f"{filename}.parquet")
-        else:
+        if data_type not in OUTPUT_DIRS:
             print(f"Error: Unknown data_type: {data_type}")
             return None
-        df = pd.read_parquet(filepath)
+        folder = dataset_dir(data_type, filename)
+        if folder.is_dir():
+            return read_partitions(folder, start, end, columns)
+        filepath = os.path.join(OUTPUT_DIRS[data_type], f"{filename}.parquet")
+        df = pd.read_parquet(filepath, columns=columns)
+        if start is not None or end is not None:
+            df = df.sort_index().loc[pd.Timestamp(start) if start is not None else None:pd.Timestamp(end) if end is not None else None]
         return df
     except FileNotFoundError:
         print(f"File not found: {filepath}")
@@ -41,6 +101,18 @@ def load_data(data_type, filename):
         print(f"Error loading data: {e}")
         return None
 
+def load_latest(data_type, filename, columns=None):
+    """最新行だけを読み込む関数"""
+    try:
+        folder = dataset_dir(data_type, filename)
+        return read_latest(folder if folder.is_dir() else folder.with_suffix(".parquet"), columns)
+    except FileNotFoundError:
+        print(f"File not found: {filename}")
+        return None
+    except Exception as e:
+        print(f"Error loading latest data: {e}")
+        return None
+
 def align_timestamps(spot_df, futures_df):
     """現物と先物のタイムスタンプを揃える関数"""
     merged_df = pd.merge(
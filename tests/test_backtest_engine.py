@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import sys
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from advanced_analysis import BitcoinBasisAnalyzer  # noqa: E402
+from backtest_engine import RESULT_COLUMNS, sweep  # noqa: E402
+
+
+def frames(count: int = 600) -> tuple[pd.DataFrame, pd.DataFrame]:
+    index = pd.date_range("2026-01-01", periods=count, freq="h")
+    rng = np.random.default_rng(5)
+    spot = 60_000 * np.exp(np.cumsum(rng.normal(0, 5e-3, count)))
+    futures = spot * (1 + rng.normal(5e-4, 1e-4, count))
+    return pd.DataFrame({"close": spot}, index=index), pd.DataFrame({"close": futures}, index=index)
+
+
+class BacktestEngineTests(unittest.TestCase):
+    def test_grid_matches_one_backtest_per_combination(self):
+        spot, futures = frames()
+        analyzer = BitcoinBasisAnalyzer(spot, futures)
+        before = analyzer.basis_df.copy()
+
+        results = analyzer.sweep_basis_strategy([2.0, 0.5, 1.0], [10, 30], [0.0, 0.002])
+
+        pd.testing.assert_frame_equal(analyzer.basis_df, before)
+        self.assertEqual(list(results.columns), RESULT_COLUMNS)
+        self.assertEqual(len(results), 12)
+        self.assertEqual(results["zscore_threshold"].tolist()[:3], [0.5, 0.5, 1.0])
+        for row in results.itertuples():
+            single = BitcoinBasisAnalyzer(spot, futures)
+            single.calculate_basis_zscore(window=row.zscore_window)
+            single.generate_trading_signals(row.zscore_threshold)
+            with contextlib.redirect_stdout(io.StringIO()):
+                backtest = single.backtest_basis_strategy(transaction_cost=row.transaction_cost)
+            net = backtest["net_return"].fillna(0)
+            trades = single.basis_df["signal"].diff().fillna(0) != 0
+            equity = backtest["equity"] / 10_000
+            self.assertAlmostEqual(row.total_return, equity.iloc[-1] - 1, delta=1e-9 * max(1, abs(row.total_return)))
+            self.assertEqual(row.trade_count, trades.sum())
+            self.assertAlmostEqual(row.win_rate, (net[trades] > 0).sum() / max(trades.sum(), 1))
+            self.assertAlmostEqual(row.sharpe, net.mean() / net.std() * np.sqrt(252))
+            self.assertAlmostEqual(row.max_drawdown, (1 - equity / equity.cummax()).max())
+        single_window = analyzer.sweep_basis_strategy([2.0, 0.5, 1.0], [30], [0.0, 0.002])
+        pd.testing.assert_frame_equal(single_window, results[results["zscore_window"] == 30].reset_index(drop=True))
+
+    def test_chunked_and_pooled_sweeps_agree(self):
+        spot, futures = frames(300)
+        basis_df = BitcoinBasisAnalyzer(spot, futures).basis_df
+        thresholds = np.linspace(0.25, 2.5, 10)
+        serial = sweep(basis_df, thresholds, [5, 20], [0.0, 0.001], max_workers=1)
+        with mock.patch("backtest_engine.CHUNK_CELLS", 300 * 2 * 3):
+            pooled = sweep(basis_df, thresholds, [5, 20], [0.0, 0.001], max_workers=2)
+        pd.testing.assert_frame_equal(serial, pooled)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import collect_market_structure as cms  # noqa: E402
+from binance_standin import Recording, make_server, scale_series  # noqa: E402
+
+DAY_MS = cms.DAY_MS
+LAST_DAY = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+
+
+def recorded_market(base, path, params=None, client=None):
+    params = params or {}
+    start = -(-int(params.get("startTime", 0)) // DAY_MS) * DAY_MS
+    if path == "/fapi/v1/exchangeInfo":
+        payload = {"symbols": [{"symbol": "BTCUSDT", "pair": "BTCUSDT", "status": "TRADING",
+                                "contractType": "PERPETUAL", "deliveryDate": 0, "onboardDate": 0}]}
+    elif path.lower().endswith("klines"):
+        days = range(start, LAST_DAY + 1, DAY_MS)
+        payload = [[day, "0", "0", "0", str(100 + day // DAY_MS % 7), "1", day + DAY_MS - 1, "100"] for day in days]
+    elif path == "/fapi/v1/fundingRate":
+        times = range(start, LAST_DAY + DAY_MS, DAY_MS // 3)
+        payload = [{"symbol": "BTCUSDT", "fundingTime": ms, "fundingRate": "0.0001", "markPrice": "100"} for ms in times]
+    else:
+        payload = {"symbol": params.get("symbol")}
+    raw = json.dumps(payload).encode()
+    return payload, raw, f"{base}{path}?{urlencode(params)}", {"retries": 0, "latency_ms": 0.0, "bytes": len(raw)}
+
+
+class BinanceStandinTests(unittest.TestCase):
+    def test_collect_replays_through_standin_with_rate_limits(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            recorded, replayed = Path(tmp) / "recorded", Path(tmp) / "replayed"
+            with patch.object(cms, "fetch_json", side_effect=recorded_market):
+                _, expected = cms.collect(recorded, 100)
+            server = make_server(Recording(recorded), rate_limit_every=4)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            base = f"http://127.0.0.1:{server.server_address[1]}"
+            client = cms.HttpClient(pool_size=2, backoff_s=0.001)
+            try:
+                with patch.object(cms, "SPOT_BASE", base), patch.object(cms, "FUTURES_BASE", base):
+                    manifest, payloads = cms.collect(replayed, 100, max_concurrency=2, client=client)
+            finally:
+                client.close()
+                server.shutdown()
+                server.server_close()
+            self.assertEqual(payloads, expected)
+            self.assertGreater(manifest["network"]["retry_count"], 0)
+            self.assertTrue(manifest["evidence"]["spot_klines"]["source_url"].startswith(base))
+
+    def test_scaled_series_pages_back_years(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            with patch.object(cms, "fetch_json", side_effect=recorded_market):
+                cms.collect(root, 100)
+            recording = Recording(root, scale_years=3)
+            first = json.loads(recording.respond("/api/v3/klines", {"symbol": "BTCUSDT", "interval": "1d", "startTime": "0", "limit": "1000"}))
+            self.assertEqual(len(first), 1000)
+            self.assertLessEqual(first[0][0], LAST_DAY - 3 * 365 * DAY_MS)
+            self.assertEqual({b[0] - a[0] for a, b in zip(first, first[1:])}, {DAY_MS})
+            latest = json.loads(recording.respond("/api/v3/klines", {"symbol": "BTCUSDT", "interval": "1d", "limit": "5"}))
+            self.assertEqual(latest[-1][0], LAST_DAY)
+            funding = recording.series[("/fapi/v1/fundingRate", (("symbol", "BTCUSDT"),))]
+            self.assertEqual({b["fundingTime"] - a["fundingTime"] for a, b in zip(funding, funding[1:])}, {DAY_MS // 3})
+        self.assertEqual(scale_series("klines", [[0, "1"]], 5), [[0, "1"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from carry_backtest import carry_pnl, summarize  # noqa: E402
+
+HOUR = pd.Timedelta(hours=1)
+
+
+def bars(count: int, seed: int = 1) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    index = pd.date_range("2026-01-01", periods=count, freq="h", name="open_time")
+    rng = np.random.default_rng(seed)
+    spot = 60_000 * np.exp(np.cumsum(rng.normal(0, 5e-3, count)))
+    futures = spot * (1 + rng.normal(5e-4, 2e-4, count))
+    funding = pd.DataFrame({
+        "funding_time": pd.date_range("2026-01-01 00:00:00.004", periods=count // 8 + 1, freq="8h"),
+        "funding_rate": rng.normal(1e-4, 5e-5, count // 8 + 1),
+        "funding_mark_price": np.nan,
+    })
+    futures_df = pd.DataFrame({"close": futures, "close_time": index + HOUR - pd.Timedelta(milliseconds=1)}, index=index)
+    return pd.DataFrame({"close": spot}, index=index), futures_df, funding
+
+
+class CarryBacktestTests(unittest.TestCase):
+    def test_flat_prices_earn_exactly_the_funding_paid_to_the_short(self):
+        index = pd.date_range("2026-01-01", periods=48, freq="h")
+        spot = pd.DataFrame({"close": 100.0}, index=index)
+        futures = pd.DataFrame({"close": 101.0}, index=index)
+        funding = pd.DataFrame({"funding_time": pd.date_range("2026-01-01", periods=7, freq="8h"),
+                                "funding_rate": 0.0001, "funding_mark_price": 100.5})
+
+        pnl = carry_pnl(spot, futures, funding, notional=1_000.0, fee_rate=0.0005)
+
+        # The 00:00 event precedes the entry close at 01:00; 08:00 through 48:00 (the last close) are realized.
+        self.assertEqual(pnl["funding_event_count"].sum(), 6)
+        self.assertEqual(pnl["funding_event_count"].loc["2026-01-01 07:00"], 1)
+        self.assertAlmostEqual(pnl["basis_pnl"].abs().sum(), 0.0)
+        fees = 2 * 0.0005 * 10 * (100 + 101)
+        self.assertAlmostEqual(pnl["cumulative_pnl"].iloc[-1], 6 * 10 * 0.0001 * 100.5 - fees)
+        summary = summarize(pnl, 1_000.0)
+        self.assertAlmostEqual(summary["funding_pnl"], 0.603)
+        self.assertAlmostEqual(summary["fees"], fees)
+
+    def test_sorted_merge_matches_a_per_event_loop(self):
+        spot, futures, funding = bars(500)
+        pnl = carry_pnl(spot, futures, funding)
+
+        units = 10_000.0 / spot["close"].iloc[0]
+        expected = np.zeros(len(spot))
+        closes = futures["close_time"] + pd.Timedelta(milliseconds=1)
+        for event in funding.itertuples():
+            if event.funding_time <= closes.iloc[0] or event.funding_time > closes.iloc[-1]:
+                continue
+            slot = int(np.argmax(closes.to_numpy() >= event.funding_time.to_datetime64()))
+            expected[slot] += units * event.funding_rate * futures["close"].iloc[slot]
+        np.testing.assert_allclose(pnl["funding_pnl"].to_numpy(), expected)
+        hedge = units * ((spot["close"] - spot["close"].iloc[0]) - (futures["close"] - futures["close"].iloc[0]))
+        np.testing.assert_allclose(pnl["cumulative_pnl"], hedge.to_numpy() + expected.cumsum())
+
+    def test_every_funding_event_inside_a_daily_bar_is_realized(self):
+        index = pd.date_range("2026-01-01", periods=10, freq="D")
+        spot = pd.DataFrame({"close": 100.0}, index=index)
+        futures = pd.DataFrame({"close": 100.0, "close_time": index + pd.Timedelta(days=1, milliseconds=-1)}, index=index)
+        funding = pd.DataFrame({"funding_time": pd.date_range("2026-01-01", "2026-01-11", freq="8h"),
+                                "funding_rate": 0.0001, "funding_mark_price": np.nan})
+
+        pnl = carry_pnl(spot, futures, funding, notional=1_000.0)
+
+        # Entry is the first bar's close (01-02 00:00); each later day's (open, close] holds three 8h events.
+        self.assertEqual(pnl["funding_event_count"].tolist(), [0] + [3] * 9)
+        self.assertAlmostEqual(pnl["cumulative_pnl"].iloc[-1], 27 * 10 * 0.0001 * 100.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import math
 import sys
+import tempfile
 import unittest
 from pathlib import Path
 
@@ -11,8 +12,10 @@ import pandas as pd
 ROOT = Path(__file__).parents[1]
 sys.path.insert(0, str(ROOT / "src"))
 
+from collect_market_structure import MetadataHistory  # noqa: E402
 from contract_analysis import (  # noqa: E402
     ContractAwareBitcoinBasisAnalyzer,
+    StreamingBasisAnalyzer,
     periods_per_year,
 )
 
@@ -139,6 +142,85 @@ class ContractAwareBasisTests(unittest.TestCase):
             expected,
         )
 
+    def test_rolling_features_match_separate_pandas_passes(self) -> None:
+        index = pd.date_range("2026-08-01", periods=500, freq="min")
+        spot, futures = self.frames(index=index, contract_type="PERPETUAL")
+        rng = np.random.default_rng(7)
+        spot["close"] = 60_000 * np.exp(np.cumsum(rng.normal(0, 5e-4, len(index))))
+        futures["close"] = spot["close"] * (1 + rng.normal(5e-4, 3e-4, len(index)))
+        futures.iloc[200, futures.columns.get_loc("close")] = np.nan
+        spot.iloc[100:110, spot.columns.get_loc("close")] = spot["close"].iloc[100]
+        expected = ContractAwareBitcoinBasisAnalyzer(spot, futures, interval="1m")
+        expected.calculate_basis_zscore()
+        expected.calculate_basis_momentum()
+        expected.calculate_volatility_adjusted_basis()
+        analyzer = ContractAwareBitcoinBasisAnalyzer(spot, futures, interval="1m")
+
+        block = analyzer.calculate_rolling_features(windows=(5, 60))
+
+        for column in ("basis_zscore", "basis_momentum", "spot_volatility", "vol_adjusted_basis"):
+            pd.testing.assert_series_equal(
+                analyzer.basis_df[column], expected.basis_df[column], rtol=1e-7
+            )
+        basis = analyzer.basis_df["basis_percent"]
+        for window in (5, 60):
+            pd.testing.assert_series_equal(
+                block[f"basis_mean_{window}"], basis.rolling(window).mean(), check_names=False
+            )
+            pd.testing.assert_series_equal(
+                block[f"basis_std_{window}"], basis.rolling(window).std(), check_names=False
+            )
+        self.assertIn("spot_volatility_60", analyzer.basis_df)
+        self.assertTrue(analyzer.basis_df["spot_volatility_5"].iloc[105:110].eq(0).all())
+        default = ContractAwareBitcoinBasisAnalyzer(spot, futures, interval="1m")
+        default.calculate_rolling_features()
+        for column in ("basis_zscore", "basis_momentum", "spot_volatility", "vol_adjusted_basis"):
+            pd.testing.assert_series_equal(default.basis_df[column], expected.basis_df[column])
+
+    def test_streaming_updates_match_batch_rows_and_revise_open_bar(self) -> None:
+        index = pd.date_range("2026-08-01", periods=300, freq="h", tz="UTC")
+        spot, futures = self.frames(
+            index=index,
+            contract_type="CURRENT_QUARTER",
+            delivery=pd.Timestamp("2026-12-25T08:00:00Z"),
+        )
+        rng = np.random.default_rng(11)
+        spot["close"] = 60_000 * np.exp(np.cumsum(rng.normal(0, 5e-3, len(index))))
+        futures["close"] = spot["close"] * (1 + rng.normal(5e-4, 3e-4, len(index)))
+        batch = ContractAwareBitcoinBasisAnalyzer(spot, futures, interval="1h")
+        batch.calculate_annualized_basis()
+        batch.calculate_rolling_features()
+        batch.detect_market_regime()
+        batch.generate_trading_signals()
+
+        streaming = StreamingBasisAnalyzer.from_frames(
+            spot.iloc[:-1], futures.iloc[:-1], interval="1h", regime_window=len(index)
+        )
+        time = index[-1]
+        streaming.update({"open_time": time, "close": 1.0}, {"open_time": time, "close": 2.0})
+        row = streaming.update(
+            {"open_time": time, "close": spot["close"].iloc[-1]},
+            pd.Series({"close": futures["close"].iloc[-1]}, name=time),
+            {"funding_rate": 0.0001, "funding_time": time},
+        )
+
+        expected = batch.basis_df.iloc[-1]
+        for column in (
+            "basis_percent",
+            "annualized_basis",
+            "days_to_maturity",
+            "basis_zscore",
+            "basis_momentum",
+            "spot_volatility",
+            "vol_adjusted_basis",
+        ):
+            self.assertAlmostEqual(row[column], expected[column], delta=1e-9 * max(1.0, abs(expected[column])))
+        self.assertEqual(row["market_regime"], expected["market_regime"])
+        self.assertEqual(row["signal"], expected["signal"])
+        self.assertEqual(row["funding_rate"], 0.0001)
+        with self.assertRaises(ValueError):
+            streaming.update({"open_time": index[0], "close": 1.0}, {"open_time": index[0], "close": 1.0})
+
     def test_interval_specific_periods_per_year(self) -> None:
         self.assertEqual(periods_per_year("1m"), 365 * 24 * 60)
         self.assertEqual(periods_per_year("1h"), 365 * 24)
@@ -153,6 +235,30 @@ class ContractAwareBasisTests(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "Unsupported or missing"):
             ContractAwareBitcoinBasisAnalyzer(spot, futures, interval="1h")
 
+    def test_metadata_history_labels_bars_with_contract_type_as_of_each_bar(self) -> None:
+        index = pd.date_range("2026-08-01", periods=4, freq="D")
+        spot, futures = self.frames(
+            index=index,
+            contract_type="CURRENT_QUARTER",
+            delivery=pd.Timestamp("2026-12-25T08:00:00Z"),
+        )
+        contract = {"symbol": "BTCUSDT", "pair": "BTCUSDT", "status": "TRADING"}
+        with tempfile.TemporaryDirectory() as tmp:
+            history = MetadataHistory(Path(tmp))
+            history.append([{**contract, "contractType": "NEXT_QUARTER"}], "2026-07-01T00:00:00+00:00")
+            history.append([{**contract, "contractType": "CURRENT_QUARTER"}], "2026-08-02T12:00:00+00:00")
+            analyzer = ContractAwareBitcoinBasisAnalyzer(
+                spot,
+                futures,
+                interval="1d",
+                metadata_history=history,
+            )
+        self.assertEqual(
+            analyzer.basis_df["contract_type"].tolist(),
+            ["NEXT_QUARTER", "NEXT_QUARTER", "CURRENT_QUARTER", "CURRENT_QUARTER"],
+        )
+        self.assertEqual(analyzer.contract_metadata.contract_type, "CURRENT_QUARTER")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+import math
+import sys
+import tempfile
+import unittest
+from datetime import UTC, datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from collect_market_structure import DAY_MS, dump  # noqa: E402
+from funding_carry import carry_rows, update  # noqa: E402
+
+START = 1_767_225_600_000
+
+
+def utc(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, UTC)
+
+
+def funding_events(count: int) -> list[dict]:
+    times = [START + n * DAY_MS // 3 for n in range(count)]
+    return [{"symbol": "BTCUSDT", "funding_time_ms": ms, "funding_time": utc(ms).isoformat(),
+             "funding_rate": 0.0001 * (n % 5 - 1), "mark_price": 100.0} for n, ms in enumerate(times)]
+
+
+def write_views(api: Path, events: list[dict], days: int, last_premium: float | None = None) -> None:
+    daily = [{"date": utc(START + n * DAY_MS).date().isoformat(), "contract_type": "PERPETUAL",
+              "mark_index_premium_pct": 0.001 * n} for n in range(days)]
+    if last_premium is not None:
+        daily[-1]["mark_index_premium_pct"] = last_premium
+    (api / "funding.json").write_bytes(dump({"schema_version": 1, "events": events}))
+    (api / "daily.json").write_bytes(dump({"schema_version": 1, "records": daily}))
+
+
+class FundingCarryTests(unittest.TestCase):
+    def test_windows_match_a_direct_sum(self):
+        events = funding_events(120)
+        rows = carry_rows(events, {})
+        self.assertIsNone(rows[10]["realized_7d_pct"])
+        row, window = rows[100], [event["funding_rate"] for event in events[100 - 20:101]]
+        self.assertEqual(row["event_count_7d"], 21)
+        self.assertAlmostEqual(row["realized_7d_pct"], sum(window) * 100)
+        self.assertAlmostEqual(row["simple_annualized_7d_pct"], sum(window) * 365 / 7 * 100)
+        self.assertAlmostEqual(row["compounded_annualized_7d_pct"],
+                               (math.prod(1 + rate for rate in window) ** (365 / 7) - 1) * 100)
+        self.assertEqual(row["event_count_1d"], 3)
+
+    def test_incremental_update_matches_full_rebuild(self):
+        events = funding_events(150)
+        with tempfile.TemporaryDirectory() as tmp:
+            api, fresh = Path(tmp) / "api", Path(tmp) / "fresh"
+            api.mkdir(), fresh.mkdir()
+            write_views(api, events[:90], 29)
+            self.assertEqual(update(api)["recomputed_count"], 90)
+            write_views(api, events, 49)
+            summary = update(api)
+            self.assertEqual(summary["funding_carry_count"], 150)
+            self.assertLess(summary["recomputed_count"], 150 - 80)
+            write_views(fresh, events, 49)
+            update(fresh)
+            self.assertEqual((api / "funding-carry.json").read_bytes(), (fresh / "funding-carry.json").read_bytes())
+            view = json.loads((api / "funding-carry.json").read_text())
+            self.assertAlmostEqual(view["records"][3]["funding_premium_divergence_pct"], events[3]["funding_rate"] * 100 - 0.001)
+            write_views(api, events[30:], 49)
+            self.assertEqual(update(api)["recomputed_count"], 120)
+
+    def test_revised_premium_of_the_open_day_is_recomputed(self):
+        events = funding_events(60)
+        with tempfile.TemporaryDirectory() as tmp:
+            api, fresh = Path(tmp) / "api", Path(tmp) / "fresh"
+            api.mkdir(), fresh.mkdir()
+            write_views(api, events, 20, last_premium=0.5)
+            update(api)
+            write_views(api, events, 20)
+            self.assertEqual(update(api)["recomputed_count"], 3)
+            write_views(fresh, events, 20)
+            update(fresh)
+            self.assertEqual((api / "funding-carry.json").read_bytes(), (fresh / "funding-carry.json").read_bytes())
+            self.assertEqual(update(api)["recomputed_count"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from kline_cache import INTERVAL_MS, KlineCache, missing_ranges  # noqa: E402
+
+HOUR = INTERVAL_MS["1h"]
+START = 1_767_225_600_000
+
+
+class FakeExchange:
+    """Hourly klines whose latest bar is still open at `now`; records every requested range."""
+
+    def __init__(self, now: int) -> None:
+        self.now, self.calls = now, []
+
+    def fetch(self, lo: int, hi: int) -> list[list]:
+        self.calls.append((lo, hi))
+        first = -(-lo // HOUR) * HOUR
+        return [[t, "1", "2", "0.5", str(t // HOUR % 7 if t + HOUR <= self.now else "open"), "10", t + HOUR - 1,
+                 "10", 3, "5", "5", "0"] for t in range(first, min(hi, self.now) + 1, HOUR)]
+
+
+class KlineCacheTests(unittest.TestCase):
+    def test_missing_ranges(self):
+        self.assertEqual(missing_ranges([], 0, 9), [(0, 9)])
+        self.assertEqual(missing_ranges([[3, 4], [5, 6]], 0, 9), [(0, 2), (7, 9)])
+        self.assertEqual(missing_ranges([[0, 20]], 5, 9), [])
+
+    def test_only_gaps_are_fetched_and_open_bar_is_never_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache, now = KlineCache(tmp), START + 48 * HOUR + 1_000
+            exchange = FakeExchange(now)
+            first = cache.get("spot", "BTCUSDT", "1h", START + 24 * HOUR, now, HOUR, exchange.fetch, now_ms=now)
+            self.assertEqual(len(first), 25)
+            self.assertEqual(first[-1][4], "open")
+            self.assertEqual(exchange.calls, [(START + 24 * HOUR, START + 47 * HOUR), (START + 47 * HOUR + 1, now)])
+
+            exchange.calls.clear()
+            again = cache.get("spot", "BTCUSDT", "1h", START, now, HOUR, exchange.fetch, now_ms=now)
+            self.assertEqual(exchange.calls, [(START, START + 24 * HOUR - 1), (START + 47 * HOUR + 1, now)])
+            self.assertEqual([row[0] for row in again], list(range(START, START + 49 * HOUR, HOUR)))
+            self.assertEqual(again[24:], first)
+
+            later, exchange.calls = now + HOUR, []
+            exchange.now = later
+            rows = cache.get("spot", "BTCUSDT", "1h", START, later, HOUR, exchange.fetch, now_ms=later)
+            self.assertEqual(exchange.calls, [(START + 47 * HOUR + 1, START + 48 * HOUR), (START + 48 * HOUR + 1, later)])
+            self.assertEqual(rows[48][4], str((START + 48 * HOUR) // HOUR % 7))
+            self.assertEqual(rows[-1][4], "open")
+            self.assertIsInstance(rows[0][0], int)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,84 @@
+import json
 import tempfile
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from datetime import UTC, datetime
 from pathlib import Path
 from unittest.mock import patch
+from urllib.parse import urlencode
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from src.collect_market_structure import (
+    HttpClient,
+    MetadataHistory,
     active_contracts,
+    build,
+    build_pairs,
+    capture_many,
+    collect,
     contract_snapshot,
     daily_rows,
+    dump,
+    load,
+    metadata_snapshot,
+    open_store,
+    orjson,
     update_metadata_history,
+    vwap_to_notional,
+    verify_store,
+    watch,
+    write_columnar,
 )
 
+DAY_MS = 86_400_000
+
+
+def fake_market(last_day_ms, calls=None, fail_on=None, pairs=("BTCUSDT",), funding_ms=DAY_MS // 3):
+    perpetuals = [{"symbol": pair, "pair": pair, "status": "TRADING",
+                   "contractType": "PERPETUAL", "deliveryDate": 0, "onboardDate": 0} for pair in pairs]
+
+    def fetch(base, path, params=None, client=None):
+        params = params or {}
+        if calls is not None:
+            calls.append((path, params.get("startTime")))
+        if fail_on and fail_on(path, params):
+            raise OSError("connection reset")
+        start = -(-int(params.get("startTime", 0)) // DAY_MS) * DAY_MS
+        last_day_ms_ = min(last_day_ms, int(params.get("endTime", last_day_ms)))
+        if path == "/fapi/v1/exchangeInfo":
+            payload = {"symbols": perpetuals}
+        elif path.lower().endswith("klines"):
+            days = list(range(start, last_day_ms_ + 1, DAY_MS))[: params["limit"]]
+            payload = [[day, "0", "0", "0", str(100 + day // DAY_MS % 7), "1", day + DAY_MS - 1, "100"] for day in days]
+        elif path == "/fapi/v1/fundingRate":
+            end = min(last_day_ms + DAY_MS, int(params.get("endTime", last_day_ms + DAY_MS)) + 1)
+            first = -(-int(params.get("startTime", 0)) // funding_ms) * funding_ms
+            times = list(range(first, end, funding_ms))[: params["limit"]]
+            payload = [{"symbol": params["symbol"], "fundingTime": ms, "fundingRate": "0.0001", "markPrice": "100"} for ms in times]
+        elif path == "/futures/data/openInterestHist":
+            payload = []
+        elif path == "/api/v3/ticker/bookTicker":
+            payload = {"bidPrice": "99", "askPrice": "101"}
+        elif path == "/fapi/v1/premiumIndex":
+            payload = {"markPrice": "101", "indexPrice": "100", "lastFundingRate": "0.0001", "nextFundingTime": last_day_ms + DAY_MS}
+        elif path == "/fapi/v1/openInterest":
+            payload = {"openInterest": "10"}
+        elif path == "/fapi/v1/ticker/24hr":
+            payload = {"lastPrice": "102", "volume": "5", "quoteVolume": "510"}
+        elif path == "/fapi/v1/depth":
+            payload = {"bids": [["101.5", "1"]], "asks": [["102.5", "1"]]}
+        else:
+            payload = {}
+        raw = json.dumps(payload).encode()
+        return payload, raw, f"{base}{path}?{urlencode(params)}", {"retries": 0, "latency_ms": 0.0, "bytes": len(raw)}
+
+    return fetch
+
 
 class MarketStructureCollectorTest(unittest.TestCase):
     def test_unknown_active_contract_type_fails_closed(self):
@@ -97,9 +165,37 @@ class MarketStructureCollectorTest(unittest.TestCase):
                 }
             ]
             third = update_metadata_history(root, changed, "2026-01-03T00:00:00+00:00")
-        self.assertEqual(len(first["changes"]), 1)
-        self.assertEqual(len(second["changes"]), 1)
-        self.assertEqual(len(third["changes"]), 2)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(len(third), 2)
+
+    def test_metadata_history_as_of_labels_bars_across_a_roll(self):
+        days = [1_767_225_600_000 + n * DAY_MS for n in range(3)]
+        before = [{"symbol": "BTCUSDT", "pair": "BTCUSDT", "contractType": "PERPETUAL", "deliveryDate": 0},
+                  {"symbol": "BTCUSDT_260102", "pair": "BTCUSDT", "contractType": "CURRENT_QUARTER", "deliveryDate": days[1]},
+                  {"symbol": "BTCUSDT_260327", "pair": "BTCUSDT", "contractType": "NEXT_QUARTER", "deliveryDate": days[2] * 2}]
+        after = [before[0], {**before[2], "contractType": "CURRENT_QUARTER"}]
+        bars = [[day, "0", "0", "0", "100", "1", day + DAY_MS - 1, "10"] for day in days]
+        payloads = {"spot_klines": bars, "index_klines": bars, "funding": [],
+                    "contract:BTCUSDT:klines": bars, "contract:BTCUSDT:mark": bars,
+                    "contract:BTCUSDT_260327:klines": bars, "contract:BTCUSDT_260327:mark": bars}
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "metadata-history.json").write_bytes(dump({"schema_version": 1, "changes": [
+                metadata_snapshot(before, "2026-01-01T12:00:00+00:00")]}))
+            legacy = MetadataHistory(root)
+            self.assertEqual((len(legacy), legacy.as_of(days[1])["contracts"][1]["symbol"]), (1, "BTCUSDT_260102"))
+            self.assertFalse((root / "metadata-history.jsonl").exists())
+            self.assertTrue(legacy.append(after, "2026-01-03T09:00:00+00:00"))
+            self.assertFalse((root / "metadata-history.json").exists())
+            history = MetadataHistory(root)
+            self.assertEqual(len(history), 2)
+            self.assertIsNone(history.as_of(days[0]))
+            self.assertEqual(len(history.as_of(days[2] + DAY_MS - 1)["contracts"]), 2)
+            rows = daily_rows(payloads, after, history=history)
+        quarter = [row["contract_type"] for row in rows if row["symbol"] == "BTCUSDT_260327"]
+        self.assertEqual(quarter, ["NEXT_QUARTER", "NEXT_QUARTER", "CURRENT_QUARTER"])
+        self.assertEqual({row["contract_type"] for row in rows if row["symbol"] == "BTCUSDT"}, {"PERPETUAL"})
 
     def test_expired_delivery_contract_rejected(self):
         payloads = iter(
@@ -133,6 +229,423 @@ class MarketStructureCollectorTest(unittest.TestCase):
             with self.assertRaisesRegex(ValueError, "expired delivery contract"):
                 contract_snapshot(meta, 100.0, datetime(2026, 1, 1, tzinfo=UTC))
 
+    def test_concurrent_capture_is_order_independent(self):
+        jobs = [(f"key:{n}", "https://example.test", f"/p/{n}", {"n": n}) for n in range(8)]
+
+        def fake_fetch_json(base, path, params=None, client=None):
+            time.sleep((8 - params["n"]) * 0.005)
+            raw = f'{{"n": {params["n"]}}}'.encode()
+            return {"n": params["n"]}, raw, f"{base}{path}", {}
+
+        results = []
+        with tempfile.TemporaryDirectory() as tmp, patch(
+            "src.collect_market_structure.fetch_json", side_effect=fake_fetch_json
+        ):
+            for concurrency in (1, 8):
+                evidence, payloads = {}, {}
+                capture_many(evidence, payloads, Path(tmp), jobs, concurrency)
+                results.append((dump(evidence), list(evidence), payloads))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][1], [job[0] for job in jobs])
+
+    def test_http_client_retries_rate_limit_over_one_connection(self):
+        calls = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                calls.append(self.client_address)
+                status = 429 if len(calls) == 1 else 200
+                body = b'{"ok": true}'
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-MBX-USED-WEIGHT-1M", "7")
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        client = HttpClient(pool_size=1, backoff_s=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/fapi/v1/ping"
+            raw, stats = client.get(url)
+            client.get(url)
+        finally:
+            client.close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(raw, b'{"ok": true}')
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["used_weight_1m"], 7)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(set(calls)), 1)
+
+    def test_incremental_collect_fetches_only_new_bars(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day)):
+                collect(root, 100, incremental=True)
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day + DAY_MS)):
+                manifest, payloads = collect(root, 100, incremental=True)
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day + DAY_MS)):
+                _, full = collect(Path(tmp) / "full", 100)
+            reloaded = dict(load(root)[1])
+            delta = json.loads(Path(manifest["evidence"]["spot_klines"]["path"]).read_bytes())
+        self.assertEqual([row[0] for row in delta], [last_day + DAY_MS])
+        self.assertEqual(len(manifest["segments"]["spot_klines"]), 2)
+        self.assertEqual(len(manifest["segments"]["funding"]), 2)
+        self.assertEqual(payloads["spot_klines"], full["spot_klines"])
+        self.assertEqual(payloads["funding"], full["funding"])
+        self.assertEqual(reloaded["contract:BTCUSDT:mark"], full["contract:BTCUSDT:mark"])
+
+    def test_backfill_pages_history_and_resumes_from_checkpoint(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+        since = datetime.fromtimestamp((last_day - 1500 * DAY_MS) / 1000, UTC)
+        since_ms = int(since.timestamp() * 1000)
+        calls = []
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            broken = fake_market(last_day, calls, lambda path, params: path == "/fapi/v1/fundingRate"
+                                 and params["startTime"] > since_ms + 600 * DAY_MS)
+            with patch("src.collect_market_structure.fetch_json", side_effect=broken):
+                with self.assertRaises(OSError):
+                    collect(root, 100, max_concurrency=1, backfill_since=since)
+            self.assertTrue((root / "raw" / "backfill-checkpoint.json").exists())
+            calls.clear()
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day, calls)):
+                manifest, payloads = collect(root, 100, max_concurrency=4, backfill_since=since)
+            reloaded = dict(load(root)[1])
+            self.assertFalse((root / "raw" / "backfill-checkpoint.json").exists())
+        spot_pages = [call for call in calls if call[0] == "/api/v3/klines"]
+        self.assertEqual(len(spot_pages), 1)
+        self.assertEqual(len(manifest["segments"]["spot_klines"]), 2)
+        self.assertEqual(len(payloads["spot_klines"]), 1501)
+        self.assertEqual(payloads["spot_klines"][0][0], since_ms)
+        times = [row["fundingTime"] for row in payloads["funding"]]
+        self.assertEqual(times, sorted(set(times)))
+        self.assertEqual(len(times), 1501 * 3)
+        self.assertEqual(reloaded["funding"], payloads["funding"])
+
+    def test_backfill_splits_full_funding_pages_for_sub_8h_funding(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+        since = datetime.fromtimestamp((last_day - 400 * DAY_MS) / 1000, UTC)
+        for hours in (4, 1):
+            with self.subTest(hours=hours), tempfile.TemporaryDirectory() as tmp:
+                calls, step = [], hours * 3_600_000
+                with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day, calls, funding_ms=step)):
+                    manifest, payloads = collect(Path(tmp), 100, max_concurrency=4, backfill_since=since)
+                    reloaded = dict(load(Path(tmp))[1])
+                times = [row["fundingTime"] for row in payloads["funding"]]
+                first = -(-int(since.timestamp() * 1000) // step) * step
+                self.assertEqual(times, list(range(first, last_day + DAY_MS, step)))
+                self.assertEqual(reloaded["funding"], payloads["funding"])
+                funding_calls = [call for call in calls if call[0] == "/fapi/v1/fundingRate"]
+                segments = manifest["segments"]["funding"]
+                if hours == 4:
+                    # Two 999-event backfill pages plus the incremental tail, none of them full.
+                    self.assertEqual((len(funding_calls), len(segments)), (3, 3))
+                else:
+                    self.assertGreater(len(segments), 3)
+
+    def test_columnar_mirror_uses_typed_columns(self):
+        rows = [
+            {"symbol": "BTCUSDT", "funding_time_ms": 1_767_225_600_001, "funding_time": "2026-01-01T00:00:00.001000+00:00",
+             "funding_rate": 0.0001, "mark_price": None},
+            {"symbol": "BTCUSDT", "funding_time_ms": 1_767_254_400_000, "funding_time": "2026-01-01T08:00:00+00:00",
+             "funding_rate": -0.0002, "mark_price": 101.5},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "funding.parquet"
+            write_columnar(path, "funding", rows)
+            table = pq.read_table(path, memory_map=True)
+        self.assertEqual(table.schema.field("funding_time_ms").type, pa.int64())
+        self.assertEqual(table.schema.field("funding_rate").type, pa.float64())
+        self.assertTrue(pa.types.is_dictionary(table.schema.field("symbol").type))
+        self.assertEqual(table.column("mark_price").to_pylist(), [None, 101.5])
+        self.assertEqual(table.column("symbol").to_pylist(), ["BTCUSDT", "BTCUSDT"])
+
+    def test_columnar_daily_rows_align_series_and_drop_expired_bars(self):
+        days = [1_767_225_600_000 + n * DAY_MS for n in range(3)]
+
+        def bars(closes, skip=()):
+            return [[day, "0", "0", "0", str(close), "1", day + DAY_MS - 1, "10"]
+                    for day, close in zip(days, closes) if day not in skip]
+
+        payloads = {
+            "spot_klines": bars([100, 200, 300]) + [[days[0], "0", "0", "0", "110", "1", days[0] + DAY_MS - 1, "10"]],
+            "index_klines": bars([100, 200, 300]),
+            "funding": [
+                {"symbol": "BTCUSDT", "fundingTime": days[0] + 8 * 3_600_000, "fundingRate": "0.0002"},
+                {"symbol": "BTCUSDT", "fundingTime": days[0] + 1, "fundingRate": "0.0001"},
+            ],
+            "contract:BTCUSDT:klines": bars([111, 202, 303]),
+            "contract:BTCUSDT:mark": bars([111, 202, 303], skip={days[1]}),
+            "contract:BTCUSDT_260102:klines": bars([121, 212, 313]),
+            "contract:BTCUSDT_260102:mark": bars([121, 212, 313]),
+        }
+        contracts = [
+            {"symbol": "BTCUSDT", "contractType": "PERPETUAL", "deliveryDate": 0},
+            {"symbol": "BTCUSDT_260102", "contractType": "CURRENT_QUARTER", "deliveryDate": days[2]},
+        ]
+        rows = daily_rows(payloads, contracts)
+        self.assertEqual([(row["date"], row["symbol"]) for row in rows], [
+            ("2026-01-01", "BTCUSDT"), ("2026-01-01", "BTCUSDT_260102"),
+            ("2026-01-02", "BTCUSDT_260102"), ("2026-01-03", "BTCUSDT"),
+        ])
+        self.assertEqual(rows[0]["spot_close"], 110.0)
+        self.assertEqual(rows[0]["funding_event_count"], 2)
+        self.assertEqual(rows[0]["funding_rate_sum"], sum([0.0001, 0.0002]))
+        self.assertIsNone(rows[3]["funding_rate_sum"])
+        self.assertEqual(rows[3]["funding_event_count"], 0)
+        gap = (212.0 / 200.0 - 1) * 100
+        self.assertEqual(rows[2]["days_to_maturity"], 1 / DAY_MS)
+        self.assertEqual(rows[2]["annualized_delivery_basis_pct"], gap * 365 / (1 / DAY_MS))
+
+    def test_load_verifies_hashes_before_lazy_decoding(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day)):
+                manifest, payloads = collect(root, 100, incremental=True)
+            _, lazy = load(root)
+            self.assertEqual(set(lazy), set(payloads))
+            self.assertEqual(lazy["spot_klines"], payloads["spot_klines"])
+            self.assertEqual(verify_store(root)["referenced_object_count"], len(lazy.objects()))
+            Path(manifest["evidence"]["funding"]["path"]).write_bytes(b"[]")
+            with self.assertRaisesRegex(ValueError, "hash mismatch: funding"):
+                load(root)
+            with self.assertRaisesRegex(ValueError, "hash mismatch"):
+                verify_store(root)
+
+    def test_repack_moves_objects_into_compressed_pack(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day)):
+                manifest, payloads = collect(root, 100, incremental=True)
+                loose = len(list((root / "raw").glob("[om]*/*.json")))
+                summary = open_store(root).repack("zstd")
+                self.assertEqual(summary["repacked_object_count"], loose)
+                self.assertEqual(list((root / "raw").glob("[om]*/*.json")), [])
+                self.assertLess((root / "raw" / "pack" / "objects.pack").stat().st_size,
+                                sum(len(dump(payload)) for payload in payloads.values()))
+                self.assertEqual(dict(load(root)[1]), payloads)
+                self.assertEqual(verify_store(root)["packed_object_count"], loose)
+                collect(root, 100, incremental=True)
+            self.assertEqual(list((root / "raw").glob("[om]*/*.json")), [])
+            packed = open_store(root).index
+            self.assertIn(manifest["evidence"]["funding"]["sha256"], packed)
+            self.assertEqual(len(packed), len((root / "raw" / "pack" / "objects.idx").read_text().splitlines()))
+            verify_store(root)
+
+    def test_interrupted_repack_keeps_loose_objects(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            store = open_store(root)
+            raw = dump({"evidence": [1, 2, 3]})
+            sha = store.put(raw)
+            with patch("src.collect_market_structure.os.fsync", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    store.repack()
+            self.assertTrue(store.loose_path(sha).exists())
+            self.assertEqual(store.get(sha), raw)
+            self.assertEqual(store.repack()["packed_object_count"], 1)
+            self.assertFalse(store.loose_path(sha).exists())
+            self.assertEqual(store.get(sha), raw)
+
+    def test_watch_polls_fast_endpoints_until_metadata_changes(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+        calls = []
+        with tempfile.TemporaryDirectory() as tmp:
+            root, api = Path(tmp) / "data", Path(tmp) / "api"
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day, calls)), \
+                    patch("src.collect_market_structure.time.sleep") as sleep:
+                self.assertEqual(watch(root, api, 5.0, 100, metadata_refresh_s=0.0, ticks=3), 3)
+            self.assertEqual(sleep.call_count, 2)
+            paths = [path for path, _ in calls]
+            self.assertEqual(paths.count("/fapi/v1/exchangeInfo"), 4)
+            self.assertEqual(paths.count("/fapi/v1/premiumIndex"), 4)
+            self.assertEqual(paths.count("/api/v3/klines"), 1)
+            self.assertEqual(paths.count("/fapi/v1/fundingRate"), 1)
+            [intraday] = (api / "intraday").glob("term-structure-*.jsonl")
+            rows = [json.loads(line) for line in intraday.read_text().splitlines()]
+            self.assertEqual([row["symbol"] for row in rows], ["BTCUSDT"] * 3)
+            self.assertEqual(rows[0]["spot_mid"], 100.0)
+            self.assertAlmostEqual(rows[0]["perpetual_premium_pct"], 2.0)
+            self.assertEqual(set(rows[0]["source_sha256"]), {"spot_book", "premium", "oi", "ticker", "depth"})
+            self.assertTrue((api / "term-structure.json").exists())
+
+    def test_build_appends_new_dates_and_skips_unchanged_views(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 3 * DAY_MS
+        with tempfile.TemporaryDirectory() as tmp:
+            root, api, fresh = Path(tmp) / "data", Path(tmp) / "api", Path(tmp) / "fresh"
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day)):
+                build(*collect(root, 100, incremental=True), root, api)
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day + DAY_MS)):
+                manifest, payloads = collect(root, 100, incremental=True)
+            plan = build(manifest, payloads, root, api, dry_run=True)["views"]
+            self.assertEqual(plan, {"daily": "append", "delivery_series": "rebuild", "funding": "rebuild",
+                                   "open_interest": "unchanged", "term_structure": "rebuild"})
+            index = build(manifest, payloads, root, api)
+            build(manifest, payloads, root, fresh)
+            for name in ("daily.json", "daily.parquet", "delivery-series.json", "funding.json", "index.json"):
+                self.assertEqual((api / name).read_bytes(), (fresh / name).read_bytes(), name)
+            self.assertEqual(index["coverage"]["perpetual_last_date"],
+                             datetime.fromtimestamp((last_day + DAY_MS) / 1000, UTC).date().isoformat())
+            self.assertEqual(index["lineage"]["daily"]["inputs"]["spot_klines"],
+                             [item["sha256"] for item in manifest["segments"]["spot_klines"]])
+            written = (api / "daily.json").stat().st_mtime_ns
+            self.assertEqual(set(build(manifest, payloads, root, api, dry_run=True)["views"].values()), {"unchanged"})
+            build(manifest, payloads, root, api)
+            self.assertEqual((api / "daily.json").stat().st_mtime_ns, written)
+            self.assertEqual((api / "index.json").read_bytes(), (fresh / "index.json").read_bytes())
+
+    def test_compact_output_modes_append_and_keep_metadata_hash(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 3 * DAY_MS
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp) / "data"
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day)):
+                first = collect(root, 100, incremental=True)
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day + DAY_MS)):
+                second = collect(root, 100, incremental=True)
+            build(*second, root, Path(tmp) / "pretty")
+            pretty = json.loads((Path(tmp) / "pretty" / "daily.json").read_text())
+            for mode in ("compact", "orjson"):
+                with self.subTest(mode=mode):
+                    if mode == "orjson" and orjson is None:
+                        self.skipTest("orjson is not installed")
+                    api, fresh = Path(tmp) / mode, Path(tmp) / f"{mode}-fresh"
+                    build(*first, root, api, mode=mode)
+                    self.assertEqual(build(*second, root, api, dry_run=True, mode=mode)["views"]["daily"], "append")
+                    build(*second, root, api, mode=mode)
+                    build(*second, root, fresh, mode=mode)
+                    for name in ("daily.json", "index.json", "current.json"):
+                        self.assertEqual((api / name).read_bytes(), (fresh / name).read_bytes(), name)
+                    self.assertEqual(json.loads((api / "daily.json").read_text()), pretty)
+                    self.assertLess((api / "daily.json").stat().st_size, (Path(tmp) / "pretty" / "daily.json").stat().st_size)
+                    self.assertEqual(build(*second, root, api, dry_run=True)["views"]["daily"], "rebuild")
+            self.assertEqual(len((root / "metadata-history.jsonl").read_text().splitlines()), 1)
+        self.assertEqual(dump({"b": 1, "a": [1.5, "x"]}, "compact"), b'{"a":[1.5,"x"],"b":1}\n')
+
+    def test_multi_pair_collect_shares_exchange_info_and_writes_pair_trees(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+        calls = []
+        pairs = ("BTCUSDT", "ETHUSDT")
+        with tempfile.TemporaryDirectory() as tmp:
+            root, api = Path(tmp) / "data", Path(tmp) / "api" / "bitcoin-derivatives"
+            with patch("src.collect_market_structure.fetch_json", side_effect=fake_market(last_day, calls, pairs=pairs)):
+                manifest, payloads = collect(root, 100, max_concurrency=4, pairs=pairs)
+            self.assertEqual([path for path, _ in calls].count("/fapi/v1/exchangeInfo"), 1)
+            self.assertEqual(manifest["pairs"], list(pairs))
+            self.assertIn("spot_klines", manifest["evidence"])
+            self.assertIn("ETHUSDT:contract:ETHUSDT:klines", manifest["evidence"])
+            self.assertEqual({row["symbol"] for row in payloads["ETHUSDT:funding"]}, {"ETHUSDT"})
+            summary = build_pairs(manifest, payloads, root, api)
+            self.assertEqual(set(summary["coverage"]), set(pairs))
+            eth = json.loads((api.parent / "ethusdt-derivatives" / "index.json").read_text())
+            btc = json.loads((api / "index.json").read_text())
+            self.assertEqual((eth["pair"], btc["pair"]), ("ETHUSDT", "BTCUSDT"))
+            self.assertEqual(eth["dataset"], "ETH Binance derivatives market structure")
+            self.assertEqual(eth["coverage"]["raw_evidence_count"] + btc["coverage"]["raw_evidence_count"],
+                             len(manifest["evidence"]) + 1)
+            self.assertTrue((root / "pairs" / "ethusdt" / "metadata-history.jsonl").exists())
+            combined = json.loads((api.parent / "derivatives-index.json").read_text())
+            self.assertEqual(combined["pairs"]["ETHUSDT"]["index"], "ethusdt-derivatives/index.json")
+            rebuilt = Path(tmp) / "rebuilt" / "bitcoin-derivatives"
+            build_pairs(*load(root), root, rebuilt)
+            for tree in ("bitcoin-derivatives", "ethusdt-derivatives"):
+                self.assertEqual((api.parent / tree / "daily.json").read_bytes(), (rebuilt.parent / tree / "daily.json").read_bytes())
+
+    def test_delivered_quarter_is_kept_and_rolled_into_continuous_series(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+        roll_day = last_day - 10 * DAY_MS
+        perpetual = {"symbol": "BTCUSDT", "pair": "BTCUSDT", "status": "TRADING", "contractType": "PERPETUAL", "deliveryDate": 0}
+        old, near, far = ({"symbol": symbol, "pair": "BTCUSDT", "status": "TRADING", "contractType": kind,
+                           "deliveryDate": delivery, "onboardDate": 0}
+                          for symbol, kind, delivery in (("BTCUSDT_OLD", "CURRENT_QUARTER", roll_day + 8 * 3_600_000),
+                                                         ("BTCUSDT_NEAR", "NEXT_QUARTER", last_day + 80 * DAY_MS),
+                                                         ("BTCUSDT_FAR", "NEXT_QUARTER", last_day + 170 * DAY_MS)))
+        listed = [perpetual, {**near, "contractType": "CURRENT_QUARTER"}, far]
+        calls = []
+        market = fake_market(last_day, calls)
+
+        def fetch(base, path, params=None, client=None):
+            if path != "/fapi/v1/exchangeInfo":
+                return market(base, path, params, client)
+            raw = json.dumps({"symbols": listed}).encode()
+            return {"symbols": listed}, raw, f"{base}{path}", {"retries": 0, "latency_ms": 0.0, "bytes": len(raw)}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root, api = Path(tmp) / "data", Path(tmp) / "api"
+            observed = datetime.fromtimestamp((roll_day - 20 * DAY_MS) / 1000, UTC).isoformat()
+            update_metadata_history(root, [perpetual, old, near], observed)
+            with patch("src.collect_market_structure.fetch_json", side_effect=fetch):
+                index = build(*collect(root, 100, incremental=True), root, api)
+                self.assertEqual([path for path, _ in calls].count("/fapi/v1/klines"), 4)
+                calls.clear()
+                manifest, _ = collect(root, 100, incremental=True)
+            self.assertEqual([path for path, _ in calls].count("/fapi/v1/klines"), 3)
+            self.assertIn("contract:BTCUSDT_OLD:klines", manifest["segments"])
+            self.assertEqual(index["coverage"]["delivered_contract_count"], 1)
+            daily = json.loads((api / "daily.json").read_text())["records"]
+            expired = [row for row in daily if row["symbol"] == "BTCUSDT_OLD"]
+            self.assertEqual(expired[-1]["date"], datetime.fromtimestamp((roll_day - DAY_MS) / 1000, UTC).date().isoformat())
+            self.assertEqual({row["contract_type"] for row in expired}, {"CURRENT_QUARTER"})
+            series = json.loads((api / "delivery-series.json").read_text())
+            roll_date = datetime.fromtimestamp(roll_day / 1000, UTC).date().isoformat()
+            self.assertEqual(series["rolls"], [
+                {"date": roll_date, "from_symbol": "BTCUSDT_OLD", "series": "CURRENT_QUARTER", "to_symbol": "BTCUSDT_NEAR"},
+                {"date": roll_date, "from_symbol": "BTCUSDT_NEAR", "series": "NEXT_QUARTER", "to_symbol": "BTCUSDT_FAR"}])
+            current = [row for row in series["records"] if row["series"] == "CURRENT_QUARTER"]
+            self.assertEqual(len({row["date"] for row in current}), len(current))
+            self.assertEqual(index["coverage"]["quarter_roll_count"], 2)
+            table = pq.read_table(api / "delivery-series.parquet")
+            self.assertEqual(table.num_rows, len(series["records"]))
+            self.assertEqual(table.column("roll").to_pylist().count(True), 2)
+
+    def test_deep_depth_is_packed_and_prices_notional_execution(self):
+        last_day = int(time.time() * 1000) // DAY_MS * DAY_MS - 2 * DAY_MS
+        market = fake_market(last_day)
+        book = {"lastUpdateId": 7, "E": 1, "T": 2, "bids": [["101.5", "500"], ["101.0", "1000"]], "asks": [["102.5", "2000"]]}
+
+        def fetch(base, path, params=None, client=None):
+            if path != "/fapi/v1/depth":
+                return market(base, path, params, client)
+            raw = json.dumps(book).encode()
+            return book, raw, f"{base}{path}?{urlencode(params)}", {"retries": 0, "latency_ms": 0.0, "bytes": len(raw)}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root, api, rebuilt = Path(tmp) / "data", Path(tmp) / "api", Path(tmp) / "rebuilt"
+            with patch("src.collect_market_structure.fetch_json", side_effect=fetch):
+                manifest, payloads = collect(root, 100, depth_limit=100)
+            item = manifest["evidence"]["contract:BTCUSDT:depth"]
+            self.assertEqual((item["encoding"], manifest["depth_limit"]), ("depth-f64", 100))
+            self.assertTrue(item["path"].endswith(".f64"))
+            self.assertEqual(Path(item["path"]).stat().st_size, 40 + 3 * 16)
+            np.testing.assert_array_equal(payloads["contract:BTCUSDT:depth"]["bids"], [[101.5, 500], [101.0, 1000]])
+            build(manifest, payloads, root, api)
+            build(*load(root), root, rebuilt, update_history=False)
+            self.assertEqual((api / "term-structure.json").read_bytes(), (rebuilt / "term-structure.json").read_bytes())
+            [row] = json.loads((api / "term-structure.json").read_text())["contracts"]
+            self.assertAlmostEqual(row["bid_vwap"], 100_000 / (500 + 49_250 / 101.0))
+            self.assertAlmostEqual(row["slippage_adjusted_basis_pct"], (row["bid_vwap"] / 100 - 1) * 100)
+            self.assertEqual((row["ask_vwap"], row["depth_level_count"]), (102.5, 3))
+            loose = list((root / "raw").glob("[dmo]*/*.*"))
+            self.assertEqual(open_store(root).repack()["repacked_object_count"], len(loose))
+            self.assertFalse(list((root / "raw" / "depth").glob("*.f64")))
+            verify_store(root)
+            np.testing.assert_array_equal(load(root)[1]["contract:BTCUSDT:depth"]["asks"], [[102.5, 2000]])
+        self.assertIsNone(vwap_to_notional(np.array([[100.0, 1.0]]), 1_000.0))
+        self.assertEqual(vwap_to_notional(np.empty((0, 2)), 1.0), None)
+
 
 if __name__ == "__main__":
     unittest.main()
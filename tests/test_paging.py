@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import paging  # noqa: E402
+from paging import RateBudget, fetch_pages, page_windows  # noqa: E402
+
+STEP = 3_600_000
+START = 1_767_225_600_000
+LIMIT = 10
+
+
+class FakeKlines:
+    """Hourly bars from START; like Binance, a request returns at most LIMIT rows from the start of its range."""
+
+    def __init__(self, count: int) -> None:
+        self.times, self.calls = [START + n * STEP for n in range(count)], []
+
+    def fetch(self, lo: int, hi: int) -> list[list[int]]:
+        self.calls.append((lo, hi))
+        return [[t, t // STEP] for t in self.times if lo <= t <= hi][:LIMIT]
+
+
+def fetch(exchange: FakeKlines, windows: list[tuple[int, int]], **kwargs) -> list[list[int]]:
+    return fetch_pages(exchange.fetch, windows, lambda row: row[0], limit=LIMIT, max_workers=2,
+                       budget=RateBudget(10**9), **kwargs)
+
+
+class PagingTests(unittest.TestCase):
+    def test_complete_pages_take_one_request_each(self):
+        exchange = FakeKlines(3 * (LIMIT - 1))
+        end = exchange.times[-1]
+        windows = page_windows(START, end, (LIMIT - 1) * STEP)
+        self.assertEqual(len(windows), 3)
+        rows = fetch(exchange, windows)
+        self.assertEqual([row[0] for row in rows], exchange.times)
+        self.assertEqual(sorted(exchange.calls), windows)
+
+    def test_truncated_pages_are_split_until_complete(self):
+        exchange = FakeKlines(45)
+        rows = fetch(exchange, page_windows(START, exchange.times[-1], 4 * LIMIT * STEP))
+        self.assertEqual([row[0] for row in rows], exchange.times)
+        self.assertGreater(len(exchange.calls), 2)
+        with self.assertRaisesRegex(RuntimeError, "cannot be split"):
+            fetch_pages(lambda lo, hi: [[lo]] * LIMIT, [(0, 1)], lambda row: row[0] - 1, limit=LIMIT,
+                        budget=RateBudget(10**9))
+
+    def test_overlapping_pages_are_deduplicated_in_time_order(self):
+        exchange = FakeKlines(8)
+        rows = fetch(exchange, [(START + 4 * STEP, START + 7 * STEP), (START, START + 5 * STEP)])
+        self.assertEqual([row[0] for row in rows], exchange.times)
+
+    def test_rate_budget_waits_for_the_oldest_spend_to_leave_the_minute(self):
+        clock = [100.0]
+        sleeps = []
+
+        def sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        budget = RateBudget(10)
+        with mock.patch.object(paging.time, "monotonic", lambda: clock[0]), \
+                mock.patch.object(paging.time, "sleep", sleep):
+            budget.acquire(6)
+            clock[0] += 20
+            budget.acquire(4)
+            self.assertEqual(sleeps, [])
+            budget.acquire(5)
+        self.assertEqual(sleeps, [40.0])
+        self.assertEqual(clock[0], 160.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from carry_monitor import dataframe_latest_rows  # noqa: E402
+from utils import read_latest, read_partitions, write_partitions  # noqa: E402
+
+
+def hourly(hours: int, start: str = "2026-01-01") -> pd.DataFrame:
+    index = pd.date_range(start, periods=hours, freq="h", name="timestamp")
+    return pd.DataFrame({"basis": np.arange(hours, dtype=float), "regime": ["calm"] * hours}, index=index)
+
+
+class TimeSeriesStoreTests(unittest.TestCase):
+    def test_partitions_prune_by_time_and_project_columns(self):
+        frame = hourly(72)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "advanced_basis_data_1hour"
+            write_partitions(frame, path)
+            self.assertEqual(sorted(folder.name for folder in path.glob("date=*")),
+                             ["date=2026-01-01", "date=2026-01-02", "date=2026-01-03"])
+            pd.testing.assert_frame_equal(read_partitions(path), frame, check_freq=False)
+            window = read_partitions(path, "2026-01-02 06:00", "2026-01-02 08:00", columns=["basis"])
+            self.assertEqual(list(window.columns), ["basis"])
+            self.assertEqual(window["basis"].tolist(), [30.0, 31.0, 32.0])
+            write_partitions(hourly(30, "2026-01-02"), path)
+            self.assertFalse((path / "date=2026-01-01").exists())
+
+    def test_latest_row_comes_from_the_tail_file(self):
+        frame = hourly(50)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "store"
+            write_partitions(frame, path)
+            (path / "date=2026-01-01" / "part.parquet").unlink()
+            latest = read_latest(path)
+            self.assertEqual(len(latest), 1)
+            [row] = dataframe_latest_rows(latest)
+            self.assertEqual(row["basis"], 49.0)
+            flat = Path(tmp) / "flat.parquet"
+            frame.to_parquet(flat)
+            self.assertEqual(read_latest(flat, columns=["basis"])["basis"].tolist(), [49.0])
+
+
+if __name__ == "__main__":
+    unittest.main()